@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+
+class FakeElevationHandler(BaseHTTPRequestHandler):
+    """Handler of the fake Open-Meteo elevation endpoint, answering each request after the latency of the server with
+    a deterministic elevation per coordinate"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        latitudes = np.array(query['latitude'][0].split(','), dtype=float)
+        longitudes = np.array(query['longitude'][0].split(','), dtype=float)
+        elevations = np.round(1000 * (1 + np.sin(np.radians(latitudes * 7)) * np.cos(np.radians(longitudes * 5))), 1)
+        body = json.dumps({'elevation': elevations.tolist()}).encode()
+
+        with self.server.lock:
+            self.server.request_no = self.server.request_no + 1
+        time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOpenMeteoServer:
+    """ Local stand-in for the Open-Meteo elevation API, such that elevation extraction is benchmarked without
+    network access or request quota.
+
+    Usable as a context manager, serving requests on a background thread for the duration of the context.
+
+    Args:
+        latency (float): Seconds each request is delayed by, simulating the API response time
+    """
+
+    def __init__(self, latency=0.0):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeElevationHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.latency = latency
+        self.server.request_no = 0
+
+    @property
+    def endpoint(self) -> str:
+        """string: The elevation endpoint of the server"""
+        return 'http://127.0.0.1:%s/v1/elevation' % self.server.server_address[1]
+
+    @property
+    def request_no(self) -> int:
+        """int: The number of requests received"""
+        return self.server.request_no
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,55 @@
+import sys
+from timeit import timeit
+
+import numpy as np
+import pandas as pd
+
+from src.data.DataCleanPipeline import Pipeline
+
+time_zones = ['Australia/Sydney', 'Europe/Madrid', 'Europe/Berlin', 'Pacific/Auckland', 'America/Denver',
+              'Africa/Windhoek', 'Australia/Melbourne', 'Africa/Johannesburg', 'America/New_York', 'Asia/Kolkata']
+"""list: Time zones sampled for the synthetic observations"""
+row_counts = [1000, 10000, 100000]
+"""list: Number of observations per benchmark run"""
+repeats = 3
+"""int: Number of timed repetitions per conversion path"""
+
+
+def generate_observations(rows: int, seed=0) -> pd.DataFrame:
+    """Method generates observations containing the time_observed_at and time_zone columns in the raw data format.
+
+    Args:
+        rows (int): The number of observations to generate
+        seed (int): Random seed, ensuring identical observations between runs
+
+    Returns:
+        A DataFrame of synthetic observations
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2020-01-01', tz='UTC').value
+    end = pd.Timestamp('2023-01-01', tz='UTC').value
+    times = pd.to_datetime(rng.integers(start, end, rows), utc=True).floor('s')
+    return pd.DataFrame({'time_observed_at': times.strftime('%Y-%m-%d %H:%M:%S UTC'),
+                         'time_zone': rng.choice(time_zones, rows)})
+
+
+def benchmark(rows: int):
+    """Method times the apply-based and vectorized local time conversions, verifying identical output.
+
+    Args:
+        rows (int): The number of observations to benchmark
+    """
+    df = generate_observations(rows)
+    apply_times = Pipeline.convert_local_times_apply(df)
+    vectorized_times = Pipeline.convert_local_times_vectorized(df)
+    assert apply_times.equals(vectorized_times), "Vectorized conversion deviates from the apply conversion"
+
+    apply_duration = timeit(lambda: Pipeline.convert_local_times_apply(df), number=repeats) / repeats
+    vectorized_duration = timeit(lambda: Pipeline.convert_local_times_vectorized(df), number=repeats) / repeats
+    sys.stdout.write('rows: %s ... apply: %.4fs ... vectorized: %.4fs ... speedup: %.1fx\n' % (
+        rows, apply_duration, vectorized_duration, apply_duration / vectorized_duration))
+
+
+if __name__ == "__main__":
+    for row_count in row_counts:
+        benchmark(row_count)
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+raw_data_columns = ['id', 'observed_on', 'latitude', 'longitude', 'time_observed_at', 'time_zone', 'quality_grade',
+                    'license', 'url', 'image_url', 'description', 'positional_accuracy', 'public_positional_accuracy',
+                    'geoprivacy', 'taxon_geoprivacy', 'scientific_name', 'common_name', 'taxon_id']
+"""list: Columns of the raw iNaturalist observation exports"""
+hotspots = [(-33.87, 151.21, 'Sydney', 1.5), (-37.81, 144.96, 'Melbourne', 1.5), (-27.47, 153.03, 'Brisbane', 2.0),
+            (-41.29, 174.78, 'Wellington', 1.0), (-36.85, 174.76, 'Auckland', 1.0), (40.42, -3.70, 'Madrid', 2.0),
+            (52.52, 13.40, 'Berlin', 2.0), (51.51, -0.13, 'London', 1.5), (48.86, 2.35, 'Paris', 2.0),
+            (37.77, -122.42, 'Pacific Time (US & Canada)', 3.0), (40.71, -74.01, 'Eastern Time (US & Canada)', 3.0),
+            (44.43, -110.59, 'Mountain Time (US & Canada)', 2.5), (19.43, -99.13, 'America/Mexico_City', 2.0),
+            (-22.57, 17.08, 'Africa/Windhoek', 3.0), (-33.92, 18.42, 'Africa/Johannesburg', 1.0),
+            (-1.29, 36.82, 'Africa/Nairobi', 3.0), (28.61, 77.21, 'Asia/Kolkata', 3.0), (35.68, 139.69, 'Tokyo', 1.5),
+            (-23.55, -46.63, 'Brasilia', 3.0), (-3.47, -62.22, 'America/Manaus', 5.0)]
+"""list: Observation hotspots (latitude, longitude, raw time zone, spread in degrees) around which coordinates
+cluster. Raw time zones follow the export, mixing Rails and IANA time zone names."""
+hotspot_weights = 1 / np.arange(1, len(hotspots) + 1)
+"""ndarray: Relative observation frequency of the hotspots (Zipf distributed)"""
+descriptions = ['Seen on the morning walk', 'Foraging near the creek', 'Two individuals, possibly a pair',
+                'Photographed from the car', 'Juvenile', 'Under a log in the garden', 'Calling loudly at dusk',
+                'Large group near the water', 'First sighting this year!', 'Resting in the shade']
+"""list: Descriptions of good quality observations"""
+bad_descriptions = ['Road kill on the highway', 'Found dead on the sidewalk', 'Scat on the trail', 'Blurry photo',
+                    'Tracks in the mud', 'Remains of prey', 'Caught in pitfall trap', 'Squashed by a car']
+"""list: Descriptions containing keywords of probable bad quality observations"""
+licenses = ['CC-BY-NC', 'CC-BY', 'CC0', 'CC-BY-SA', 'CC-BY-NC-SA', 'CC-BY-NC-ND', None]
+"""list: Observation licenses (None is all rights reserved)"""
+license_weights = [0.6, 0.1, 0.08, 0.04, 0.04, 0.04, 0.1]
+"""list: Relative frequency of the licenses"""
+quality_grades = ['research', 'needs_id', 'casual']
+"""list: iNaturalist quality grades"""
+taxa = 5000
+"""int: Number of distinct taxa observed"""
+start_time = pd.Timestamp('2015-01-01', tz='UTC')
+"""Timestamp: Earliest observation time"""
+end_time = pd.Timestamp('2023-01-01', tz='UTC')
+"""Timestamp: Latest observation time"""
+chunk_size = 1000000
+"""int: Number of observations generated (and written) at once"""
+
+
+def generate_observations(rows: int, seed=0, description_fraction=0.3, bad_fraction=0.05, duplicate_fraction=0.01,
+                          invalid_fraction=0.002) -> pd.DataFrame:
+    """Method generates synthetic observations in the format of the raw iNaturalist exports.
+
+    Coordinates cluster around the hotspots (Zipf weighted, normally distributed around each hotspot), with the raw
+    time zone of the hotspot. Taxa follow a Zipf distribution. A fraction of the observations duplicate earlier ids,
+    have malformed dates or missing times, and carry descriptions indicating bad quality observations.
+
+    Args:
+        rows (int): The number of observations to generate
+        seed (int): Random seed, ensuring identical observations between runs
+        description_fraction (float): Fraction of observations with a description
+        bad_fraction (float): Fraction of observations with a description indicating a bad quality observation
+        duplicate_fraction (float): Fraction of observations repeating the id of another observation
+        invalid_fraction (float): Fraction of observations with a malformed date, and (separately) a missing time
+
+    Returns:
+        A DataFrame of synthetic raw observations
+    """
+    rng = np.random.default_rng(seed)
+    ids = rng.permutation(np.arange(1, rows + 1, dtype=np.int64) * 7 + 10000000)
+    duplicates = rng.random(rows) < duplicate_fraction
+    ids[duplicates] = rng.choice(ids, duplicates.sum())
+
+    hotspot = rng.choice(len(hotspots), rows, p=hotspot_weights / hotspot_weights.sum())
+    centers = np.array([(lat, lng, spread) for lat, lng, _, spread in hotspots])[hotspot]
+    latitudes = np.clip(centers[:, 0] + rng.normal(0, 1, rows) * centers[:, 2], -89.9, 89.9)
+    longitudes = (centers[:, 1] + rng.normal(0, 1, rows) * centers[:, 2] + 180) % 360 - 180
+    time_zones = np.array([time_zone for _, _, time_zone, _ in hotspots], dtype=object)[hotspot]
+
+    times = rng.integers(start_time.value // 10 ** 9, end_time.value // 10 ** 9, rows).astype('datetime64[s]')
+    observed_on = times.astype('datetime64[D]').astype(str).astype(object)
+    time_observed_at = (pd.Series(times.astype(str)).str.replace('T', ' ', regex=False) + ' UTC').to_numpy(object)
+    observed_on[rng.random(rows) < invalid_fraction] = '202g-08-02'
+    time_observed_at[rng.random(rows) < invalid_fraction] = None
+
+    description = np.full(rows, None, dtype=object)
+    described = rng.random(rows) < description_fraction
+    description[described] = rng.choice(descriptions, described.sum())
+    bad = rng.random(rows) < bad_fraction
+    description[bad] = rng.choice(bad_descriptions, bad.sum())
+
+    taxon = rng.zipf(1.3, rows) % taxa
+    photo_ids = rng.integers(1000000, 300000000, rows)
+    accuracy = np.maximum(1, rng.lognormal(2.5, 1.5, rows)).astype(np.int64)
+    obscured = rng.random(rows) < 0.05
+    geoprivacy = np.where(obscured, 'obscured', np.where(rng.random(rows) < 0.3, 'open', None))
+
+    return pd.DataFrame({'id': ids,
+                         'observed_on': observed_on,
+                         'latitude': latitudes,
+                         'longitude': longitudes,
+                         'time_observed_at': time_observed_at,
+                         'time_zone': time_zones,
+                         'quality_grade': rng.choice(quality_grades, rows, p=[0.7, 0.25, 0.05]),
+                         'license': rng.choice(np.array(licenses, dtype=object), rows, p=license_weights),
+                         'url': 'https://www.inaturalist.org/observations/' + pd.Series(ids).astype(str),
+                         'image_url': 'https://inaturalist-open-data.s3.amazonaws.com/photos/' +
+                                      pd.Series(photo_ids).astype(str) + '/medium.jpg',
+                         'description': description,
+                         'positional_accuracy': accuracy,
+                         'public_positional_accuracy': np.where(obscured, accuracy + 20000, accuracy),
+                         'geoprivacy': geoprivacy,
+                         'taxon_geoprivacy': np.where(rng.random(rows) < 0.1, 'open', None),
+                         'scientific_name': 'Genus' + pd.Series(taxon // 10).astype(str) + ' species' +
+                                            pd.Series(taxon).astype(str),
+                         'common_name': 'Common taxon ' + pd.Series(taxon).astype(str),
+                         'taxon_id': taxon + 40000},
+                        columns=raw_data_columns)
+
+
+def write_observations(file, rows: int, seed=0):
+    """Method writes synthetic raw observations to a CSV file, generated in chunks of chunk_size observations such
+    that large datasets (for example 10 million observations) are generated in bounded memory.
+
+    Each chunk is generated from its own seed (derived from seed), such that the file is identical between runs.
+
+    Args:
+        file (str): Path of the CSV file to be written
+        rows (int): The number of observations to generate
+        seed (int): Random seed
+    """
+    for chunk_no, start in enumerate(range(0, rows, chunk_size)):
+        chunk = generate_observations(min(chunk_size, rows - start), seed=[seed, chunk_no])
+        chunk['id'] = chunk['id'] + start * 7  # Ids unique across chunks
+        chunk.to_csv(file, mode='w' if chunk_no == 0 else 'a', header=chunk_no == 0, index=False)
@@ -0,0 +1,212 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.FakeOpenMeteoServer import FakeOpenMeteoServer
+from benchmarks.ObservationGenerator import generate_observations, write_observations
+from src.data.DataCleanPipeline import Pipeline
+from src.data.TimezoneResolver import TimezoneResolver
+from src.features import Elevation, OpenMeteoApiTimer
+from src.features.ElevationCache import ElevationCache
+from src.features.RateLimiter import RateLimiter
+
+row_counts = [10000, 1000000, 10000000]
+"""list: Number of observations of the benchmark runs (10k, 1M, 10M)"""
+results_path = os.path.dirname(os.path.abspath(__file__)) + '/results/'
+"""string: Directory of the JSON benchmark results, one file per run"""
+elevation_concurrency = 4
+"""int: Number of requests kept in flight by the elevation benchmark"""
+elevation_requests_per_second = 1000
+"""float: Request rate permitted by the elevation benchmark (the fake server imposes no limits)"""
+
+
+def benchmark_cleaning(rows: int, seed=0, workers=1, stream=False, profile_memory=False) -> dict:
+    """Method times the cleaning pipeline (activate_flow) on synthetic raw observations, stage by stage.
+
+    The observations are written to a temporary raw data directory (not timed), and cleaned into a temporary interim
+    data directory, such that the project data is never touched.
+
+    Args:
+        rows (int): The number of raw observations
+        seed (int): Random seed of the synthetic observations
+        workers (int): Number of pipeline worker processes
+        stream (bool): Flag to stream the raw observations in chunks
+        profile_memory (bool): Flag to trace the peak memory of each stage (of the parent process)
+
+    Returns:
+        The benchmark result, including the stage summary of the pipeline profiler
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        write_observations(os.path.join(directory, 'observations.csv'), rows, seed=seed)
+
+        pipeline = Pipeline(datasets=['observations.csv'], workers=workers, stream=stream)
+        pipeline.profiler.trace_memory = profile_memory
+        pipeline.resource_path = directory + '/'
+        pipeline.write_path = directory + '/'
+        pipeline.storage = pipeline.storage.__class__(pipeline.write_path)
+        pipeline.interim_exists = pipeline.bad_data_exists = False
+        pipeline.timezone_resolver = TimezoneResolver(grid_size=Pipeline.timezone_grid_size,
+                                                      cache_file=directory + '/' + Pipeline.timezone_cache_file)
+
+        start = time.perf_counter()
+        pipeline.activate_flow()
+        seconds = time.perf_counter() - start
+        interim_rows = len(pipeline.storage.read(Pipeline.interim_dataset, columns=['observed_on']).index)
+
+    stages = pipeline.profiler.summary().reset_index()
+    return {'benchmark': 'cleaning', 'rows': rows, 'seed': seed, 'workers': workers, 'stream': stream,
+            'seconds': seconds, 'rows_per_second': rows / seconds, 'interim_rows': interim_rows,
+            'stages': json.loads(stages.to_json(orient='records'))}
+
+
+def benchmark_elevation(rows: int, seed=0, latency=0.0) -> dict:
+    """Method times the elevation extraction (elevation_feature_extraction) of synthetic observations against a local
+    fake Open-Meteo server.
+
+    The elevation cache, checkpoints and request quota are redirected to a temporary directory, and restored after
+    the run. The request limits are raised such that the fake server latency (and the extraction itself) is measured.
+
+    Args:
+        rows (int): The number of observations
+        seed (int): Random seed of the synthetic observations
+        latency (float): Seconds each request is delayed by the fake server
+
+    Returns:
+        The benchmark result
+    """
+    df = generate_observations(rows, seed=seed, duplicate_fraction=0)[['id', 'latitude', 'longitude']]
+    df = df.set_index('id')
+    configuration = {name: getattr(Elevation, name) for name in
+                     ['elevation_cache_file', 'legacy_store_file', 'dem_path', 'open_meteo_endpoint', 'client',
+                      'concurrency', 'elevation_cache', 'batch_limit', 'current_batch_no', 'root_path', 'data_path']}
+    rate_limiter = OpenMeteoApiTimer.rate_limiter
+
+    with tempfile.TemporaryDirectory() as directory, FakeOpenMeteoServer(latency=latency) as server:
+        Elevation.elevation_cache_file = os.path.join(directory, 'coordinate_elevations.bin')
+        Elevation.legacy_store_file = os.path.join(directory, 'coordinate_elevation_store.txt')
+        Elevation.dem_path = directory
+        Elevation.root_path, Elevation.data_path = directory, '/'
+        Elevation.open_meteo_endpoint = server.endpoint
+        Elevation.client = None
+        Elevation.concurrency = elevation_concurrency
+        Elevation.elevation_cache = ElevationCache()
+        Elevation.batch_limit = sys.maxsize
+        Elevation.current_batch_no = 0
+        OpenMeteoApiTimer.rate_limiter = RateLimiter(requests_per_second=elevation_requests_per_second,
+                                                     requests_per_day=sys.maxsize)
+        try:
+            start = time.perf_counter()
+            df = Elevation.elevation_feature_extraction(df)
+            seconds = time.perf_counter() - start
+        finally:
+            if Elevation.client is not None:
+                Elevation.client.close()
+            for name, value in configuration.items():
+                setattr(Elevation, name, value)
+            OpenMeteoApiTimer.rate_limiter = rate_limiter
+
+    return {'benchmark': 'elevation', 'rows': rows, 'seed': seed, 'latency': latency, 'seconds': seconds,
+            'rows_per_second': rows / seconds, 'requests': server.request_no,
+            'resolved_rows': int(df['elevation'].notna().sum())}
+
+
+def run_environment() -> dict:
+    """Method describes the environment of a benchmark run (time, commit, Python, NumPy and pandas versions)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'time': datetime.now(timezone.utc).isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def previous_result(result: dict):
+    """Method loads the latest stored result of the same benchmark, number of rows and configuration (seed, workers,
+    streaming and latency), for comparison
+
+    Returns:
+        The previous result, or None if no comparable result is stored
+    """
+    configuration = ['seed', 'workers', 'stream', 'latency']
+    for file in sorted(glob.glob(results_path + '%s_%s_*.json' % (result['benchmark'], result['rows'])), reverse=True):
+        with open(file) as f:
+            previous = json.loads(f.read())
+        if all(previous.get(name) == result.get(name) for name in configuration):
+            return previous
+    return None
+
+
+def write_result(result: dict) -> str:
+    """Method stores a benchmark result as JSON within the results directory
+
+    Returns:
+        The path of the stored result
+    """
+    os.makedirs(results_path, exist_ok=True)
+    stamp = result['environment']['time'].replace(':', '').replace('-', '').replace('+0000', 'Z')
+    file = results_path + '%s_%s_%s.json' % (result['benchmark'], result['rows'], stamp)
+    with open(file, 'w') as f:
+        f.write(json.dumps(result, indent=2))
+    return file
+
+
+def compare_results(result: dict, previous: dict) -> str:
+    """Method renders the speedup of a result relative to a previous result, in total and per stage
+
+    Returns:
+        A line per timing, of the previous and current seconds and the speedup (previous / current)
+    """
+    timings = [('total', previous['seconds'], result['seconds'])]
+    previous_stages = {stage['stage']: stage['seconds'] for stage in previous.get('stages', [])}
+    timings = timings + [(stage['stage'], previous_stages[stage['stage']], stage['seconds'])
+                         for stage in result.get('stages', []) if stage['stage'] in previous_stages]
+
+    lines = ['%s (%s rows) compared to %s:' % (result['benchmark'], result['rows'], previous['environment']['commit'])]
+    for name, previous_seconds, seconds in timings:
+        lines.append('  %s: %.4fs -> %.4fs ... speedup: %.2fx' % (name, previous_seconds, seconds,
+                                                                  previous_seconds / seconds if seconds > 0 else 0))
+    return '\n'.join(lines) + '\n'
+
+
+def record(result: dict):
+    """Method stores a benchmark result, reporting the comparison to the previous result of the benchmark"""
+    result['environment'] = run_environment()
+    previous = previous_result(result)
+    file = write_result(result)
+    sys.stdout.write('\n%s: %.2fs ... %.1f rows/s ... written to %s\n' % (result['benchmark'], result['seconds'],
+                                                                          result['rows_per_second'], file))
+    if previous is not None:
+        sys.stdout.write(compare_results(result, previous))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the cleaning and elevation pipelines on synthetic data')
+    parser.add_argument('rows', type=int, nargs='*', default=row_counts[:1],
+                        help='Numbers of observations (for example 10000 1000000 10000000)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help='Cleaning pipeline worker processes')
+    parser.add_argument('--stream', action='store_true', help='Stream raw observations in chunks')
+    parser.add_argument('--profile-memory', action='store_true', help='Trace the peak memory of each stage')
+    parser.add_argument('--latency', type=float, default=0.0, help='Fake Open-Meteo response latency in seconds')
+    parser.add_argument('--skip-cleaning', action='store_true')
+    parser.add_argument('--skip-elevation', action='store_true')
+    arguments = parser.parse_args()
+
+    for row_count in arguments.rows:
+        if not arguments.skip_cleaning:
+            record(benchmark_cleaning(row_count, seed=arguments.seed, workers=arguments.workers,
+                                      stream=arguments.stream, profile_memory=arguments.profile_memory))
+        if not arguments.skip_elevation:
+            record(benchmark_elevation(row_count, seed=arguments.seed, latency=arguments.latency))
@@ -0,0 +1,100 @@
+import re
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+description_indicators = ['dead', 'road kill', 'road', 'scat', 'poo', 'killed', 'spoor', 'road-kill', 'remains',
+                          'body', 'deceased', 'prey', 'fatality', 'tracks', 'trapped', 'bad', 'roadkilled', 'roadkill',
+                          'poop', 'crushed', 'kill', 'squashed', 'terrible', 'caught', 'pool', 'blurry', 'destroyed',
+                          'sidewalk', 'grounded']
+"""list: Default description keywords indicating probable bad quality images"""
+
+
+class BadObservationClassifier:
+    """ Classifier identifying probable bad quality observations from keywords within their descriptions.
+
+    The keywords are compiled once into a single case-insensitive, word-boundary regex pattern, structured as a trie
+    of the keywords (see keyword_trie_pattern()). Keywords therefore only match whole words ('pool' is not matched by
+    'poo', nor 'broad' by 'road').
+    Descriptions are scanned in bulk: A batch of descriptions is joined into a single text, scanned in one pass, and
+    each match is mapped back to its description through the description offsets.
+
+    Per-keyword hit counts (the number of observations containing each keyword) accumulate in hit_counts for auditing.
+
+    Args:
+        keywords (list): Keywords indicating bad quality observations. The default description_indicators if None.
+    """
+
+    separator = '\n'
+    """string: Separator joining descriptions, which is a word boundary"""
+
+    def __init__(self, keywords=None):
+        self.keywords = description_indicators if keywords is None else keywords
+        self.pattern = re.compile(r'\b' + keyword_trie_pattern(self.keywords) + r'\b', re.IGNORECASE)
+        self.hit_counts = Counter()
+
+    def classify(self, descriptions: pd.Series) -> np.ndarray:
+        """ Method identifies the descriptions containing any keyword, updating the keyword hit counts.
+
+        Args:
+            descriptions (Series): Observation descriptions. Missing descriptions never match.
+
+        Returns:
+            A boolean array, True where the corresponding description contains a keyword
+        """
+        texts = descriptions.fillna('').astype(str).tolist()
+        matches = np.zeros(len(texts), dtype=bool)
+        if not texts:
+            return matches
+
+        found = [(match.start(), match.group()) for match in self.pattern.finditer(self.separator.join(texts))]
+        if not found:
+            return matches
+
+        starts, keywords = zip(*found)
+        description_ends = np.cumsum([len(text) + len(self.separator) for text in texts])
+        rows = np.searchsorted(description_ends, starts, side='right')  # Description of each match
+        matches[rows] = True
+
+        hits = pd.DataFrame({'row': rows, 'keyword': keywords})
+        hits['keyword'] = hits['keyword'].str.lower()
+        self.hit_counts.update(hits.drop_duplicates()['keyword'].value_counts().to_dict())
+        return matches
+
+    def pop_hit_counts(self) -> Counter:
+        """ Method returns the keyword hit counts accumulated since the previous call, resetting them"""
+        hit_counts = self.hit_counts
+        self.hit_counts = Counter()
+        return hit_counts
+
+
+def keyword_trie_pattern(keywords) -> str:
+    """Method builds a regex pattern matching any of the keywords, structured as a trie of the keywords.
+
+    Keywords sharing a prefix share a single branch (for example 'road(?:(?:\\ kill|\\-kill|kill(?:ed)?))?'), such that
+    the regex engine attempts a single branch per character, instead of every keyword at each position.
+    Longer keywords are preferred over their prefixes, falling back to the prefix if the longer keyword fails to match.
+
+    Args:
+        keywords (list): The keywords to match
+
+    Returns:
+        The (uncompiled) regex pattern
+    """
+    trie = dict()
+    for keyword in keywords:
+        node = trie
+        for character in keyword.lower():
+            node = node.setdefault(character, dict())
+        node[''] = dict()  # End of keyword marker
+
+    def branch(node) -> str:
+        if list(node) == ['']:
+            return ''
+        alternatives = [re.escape(character) + branch(child) for character, child in sorted(node.items())
+                        if character != '']
+        pattern = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        return '(?:' + pattern + ')?' if '' in node else pattern
+
+    return branch(trie)
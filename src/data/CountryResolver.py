@@ -0,0 +1,199 @@
+import json
+
+import numpy as np
+
+
+class CountryResolver:
+    """ Offline resolver determining the countries of observations in bulk, from country boundaries (GeoJSON).
+
+    Country boundaries are read from a GeoJSON FeatureCollection of Polygon and MultiPolygon features (for example
+    Natural Earth admin 0 countries), with the country name in the name_property of each feature.
+    Points are located through a vectorized point-in-polygon test (even-odd ray casting, such that holes are
+    respected). Boundary edges are indexed by latitude band, such that each point is only tested against the edges
+    within its band.
+
+    Coordinates are bucketed into square grid cells of grid_size degrees. Cells crossed by no boundary edge (the
+    bounding box of no edge overlaps the cell) lie entirely within a single country (or none), and are resolved once,
+    at their center. Coordinates within boundary cells are rounded to point_decimals decimal places, deduplicated, and
+    resolved once per rounded coordinate. Both cell and point results are cached for the lifetime of the resolver.
+
+    Args:
+        boundaries_file (str): Path to the GeoJSON country boundaries
+        name_property (str): Feature property containing the country name
+        grid_size (float): The width and height of each grid cell in degrees
+        point_decimals (int): Decimal places to round coordinates within boundary cells to (4 decimals is approx. 11m)
+        fallback (function): Optional function resolving the countries of coordinates outside all boundaries, taking
+            latitude and longitude arrays, and returning an array of country names (for example Nominatim lookups).
+    """
+
+    max_comparisons = 5000000
+    """int: Maximum number of point-edge comparisons evaluated at once, limiting memory usage"""
+
+    def __init__(self, boundaries_file, name_property='name', grid_size=0.5, point_decimals=4, fallback=None):
+        self.grid_size = grid_size
+        self.point_decimals = point_decimals
+        self.fallback = fallback
+        self.cell_columns = int(np.ceil(360 / grid_size)) + 1
+        self.point_scale = 10 ** point_decimals
+        self.point_columns = 360 * self.point_scale + 1
+        self.cells = dict()
+        self.points = dict()
+
+        self.names, self.edges, self.edge_countries = load_boundaries(boundaries_file, name_property)
+        self.index_bands()
+        self.index_boundary_cells()
+
+    def index_bands(self):
+        """ Method indexes the boundary edges by the latitude bands (grid rows) they span, ordered by country within
+        each band"""
+        rows = np.floor((np.stack([self.edges[:, 1], self.edges[:, 3]]) + 90) / self.grid_size).astype(np.int64)
+        first_rows, last_rows = rows.min(axis=0), rows.max(axis=0)
+        counts = last_rows - first_rows + 1
+        edges = np.repeat(np.arange(self.edges.shape[0]), counts)
+        bands = np.repeat(first_rows, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+        order = np.lexsort((self.edge_countries[edges], bands))
+        self.band_edges = edges[order]
+        self.band_keys = bands[order]
+
+    def index_boundary_cells(self):
+        """ Method determines the grid cells overlapped by the bounding box of any boundary edge"""
+        cells = np.floor((self.edges + [180, 90, 180, 90]) / self.grid_size).astype(np.int64)
+        first_columns, last_columns = np.minimum(cells[:, 0], cells[:, 2]), np.maximum(cells[:, 0], cells[:, 2])
+        first_rows, last_rows = np.minimum(cells[:, 1], cells[:, 3]), np.maximum(cells[:, 1], cells[:, 3])
+        widths, heights = last_columns - first_columns + 1, last_rows - first_rows + 1
+
+        counts = widths * heights
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        rows = np.repeat(first_rows, counts) + offsets // np.repeat(widths, counts)
+        columns = np.repeat(first_columns, counts) + offsets % np.repeat(widths, counts)
+        self.boundary_cells = np.unique(rows * self.cell_columns + columns)
+
+    def resolve(self, latitudes, longitudes) -> np.ndarray:
+        """ Method resolves the countries of the given coordinates.
+
+        Args:
+            latitudes (array-like): Float latitudes of the observations
+            longitudes (array-like): Float longitudes corresponding to the latitudes
+
+        Returns:
+            An object array of country names aligned to the given coordinates, None where no country is found
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        countries = np.full(latitudes.shape[0], -1, dtype=np.int64)
+        if latitudes.shape[0] == 0:
+            return np.empty(0, dtype=object)
+
+        rows = np.floor((latitudes + 90) / self.grid_size).astype(np.int64)
+        columns = np.floor((longitudes + 180) / self.grid_size).astype(np.int64)
+        unique_cells, inverse = np.unique(rows * self.cell_columns + columns, return_inverse=True)
+        boundary = np.isin(unique_cells, self.boundary_cells, assume_unique=True)
+
+        interior_cells = unique_cells[~boundary]
+        uncached = np.array([cell not in self.cells for cell in interior_cells.tolist()], dtype=bool)
+        if uncached.any():  # Resolve interior cells at their centers
+            new_cells = interior_cells[uncached]
+            center_latitudes = (new_cells // self.cell_columns + 0.5) * self.grid_size - 90
+            center_longitudes = (new_cells % self.cell_columns + 0.5) * self.grid_size - 180
+            self.cells.update(zip(new_cells.tolist(), self.locate(center_latitudes, center_longitudes).tolist()))
+
+        cell_countries = np.full(unique_cells.shape[0], -1, dtype=np.int64)
+        cell_countries[~boundary] = [self.cells[cell] for cell in interior_cells.tolist()]
+        countries[:] = cell_countries[inverse]
+
+        in_boundary_cell = boundary[inverse]
+        if in_boundary_cell.any():  # Resolve the unique (rounded) coordinates of boundary cells individually
+            point_latitudes = np.round(latitudes[in_boundary_cell] * self.point_scale).astype(np.int64)
+            point_longitudes = np.round(longitudes[in_boundary_cell] * self.point_scale).astype(np.int64)
+            point_keys = (point_latitudes + 90 * self.point_scale) * self.point_columns + \
+                (point_longitudes + 180 * self.point_scale)
+            unique_points, point_inverse = np.unique(point_keys, return_inverse=True)
+
+            uncached = np.array([point not in self.points for point in unique_points.tolist()], dtype=bool)
+            if uncached.any():
+                new_points = unique_points[uncached]
+                new_latitudes = (new_points // self.point_columns - 90 * self.point_scale) / self.point_scale
+                new_longitudes = (new_points % self.point_columns - 180 * self.point_scale) / self.point_scale
+                self.points.update(zip(new_points.tolist(), self.locate(new_latitudes, new_longitudes).tolist()))
+
+            point_countries = np.array([self.points[point] for point in unique_points.tolist()], dtype=np.int64)
+            countries[in_boundary_cell] = point_countries[point_inverse]
+
+        names = np.empty(countries.shape[0], dtype=object)
+        found = countries >= 0
+        names[found] = self.names[countries[found]]
+        if self.fallback is not None and not found.all():  # Resolve coordinates outside all boundaries
+            names[~found] = self.fallback(latitudes[~found], longitudes[~found])
+        return names
+
+    def locate(self, latitudes, longitudes) -> np.ndarray:
+        """ Method performs the point-in-polygon test of coordinates against the country boundaries
+
+        Returns:
+            An int64 array of country positions (within names), -1 where the coordinate lies outside all boundaries
+        """
+        countries = np.full(latitudes.shape[0], -1, dtype=np.int64)
+        bands = np.floor((latitudes + 90) / self.grid_size).astype(np.int64)
+        band_starts = np.searchsorted(self.band_keys, bands, side='left')
+        band_stops = np.searchsorted(self.band_keys, bands, side='right')
+
+        order = np.argsort(bands, kind='stable')
+        group_starts = np.flatnonzero(np.diff(bands[order])) + 1
+        for points in np.split(order, group_starts):  # Points grouped by band
+            start, stop = band_starts[points[0]], band_stops[points[0]]
+            if start == stop:
+                continue
+
+            edges = self.edges[self.band_edges[start:stop]]
+            edge_countries = self.edge_countries[self.band_edges[start:stop]]
+            country_starts = np.flatnonzero(np.r_[True, edge_countries[1:] != edge_countries[:-1]])
+            chunk_size = max(1, self.max_comparisons // edges.shape[0])
+
+            for chunk in range(0, points.shape[0], chunk_size):
+                chunk_points = points[chunk:chunk + chunk_size]
+                x, y = longitudes[chunk_points, None], latitudes[chunk_points, None]
+                spans = (edges[:, 1] > y) != (edges[:, 3] > y)  # Edges spanning the latitude of the point
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    crossing_x = edges[:, 0] + (y - edges[:, 1]) * (edges[:, 2] - edges[:, 0]) / \
+                                 (edges[:, 3] - edges[:, 1])
+                crossings = spans & (x < crossing_x)  # Eastward ray crossings
+
+                inside = np.logical_xor.reduceat(crossings, country_starts, axis=1)  # Odd crossings per country
+                located = inside.any(axis=1)
+                countries[chunk_points[located]] = edge_countries[country_starts[inside[located].argmax(axis=1)]]
+        return countries
+
+
+def load_boundaries(boundaries_file, name_property='name') -> tuple:
+    """Method reads the polygon edges of GeoJSON country boundaries
+
+    Args:
+        boundaries_file (str): Path to the GeoJSON FeatureCollection of Polygon and MultiPolygon features
+        name_property (str): Feature property containing the country name
+
+    Returns:
+        An object array of the country names, an (n, 4) array of the edges (longitude, latitude of both end points)
+        of all rings, and the country position (within names) of each edge
+    """
+    with open(boundaries_file) as f:
+        features = json.loads(f.read())['features']
+
+    names, edges, edge_countries = [], [], []
+    for feature in features:
+        geometry = feature['geometry']
+        if geometry is None or geometry['type'] not in ['Polygon', 'MultiPolygon']:
+            continue
+        polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+
+        for polygon in polygons:
+            for ring in polygon:
+                ring = np.asarray(ring, dtype=float)[:, :2]
+                ring_edges = np.hstack([ring, np.roll(ring, -1, axis=0)])  # Closes rings that are not closed
+                edges.append(ring_edges[(ring_edges[:, :2] != ring_edges[:, 2:]).any(axis=1)])
+                edge_countries.append(np.full(edges[-1].shape[0], len(names)))
+        names.append(feature['properties'][name_property])
+
+    if not edges:
+        return np.array(names, dtype=object), np.empty((0, 4)), np.empty(0, dtype=np.int64)
+    return np.array(names, dtype=object), np.vstack(edges), np.concatenate(edge_countries)
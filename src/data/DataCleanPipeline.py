@@ -1,13 +1,25 @@
+import numpy as np
 import pandas as pd
 import os
 import sys
-from timezonefinder import TimezoneFinder
 import pytz
 from geopy.geocoders import Nominatim
 from geopy.extra.rate_limiter import RateLimiter
 from functools import partial
+from collections import Counter, deque
+from multiprocessing import Pool
 from Config import root_dir
 from datetime import datetime
+from src.data.CountryResolver import CountryResolver
+from src.data.BadObservationClassifier import BadObservationClassifier, description_indicators
+from src.data.IdIndex import IdIndex
+from src.data.ObservationSchema import ObservationSchema, concat_observations
+from src.data.RawManifest import RawManifest
+from src.data.Storage import CsvStorage
+from src.data.TimeModel import localize, parse_dates, parse_local_times, parse_utc_times, format_local_times
+from src.data.TimezoneResolver import TimezoneResolver
+from src.visualization.ProgressTracker import ProgressTracker
+from src.visualization.StageProfiler import StageProfiler
 
 
 class Pipeline:
@@ -19,69 +31,344 @@ class Pipeline:
         datasets (list): A list of individual observation csv files to be aggregated as raw data
         resource_path (str): Path to raw data resources, from project root directory
         write_path (str): Path to interim data resources, from project root directory
+        storage (CsvStorage): Storage backend of the interim data resources (CsvStorage or ParquetStorage)
         interim_exists (bool): A flag representing if an existing interim_data.csv file exists in the project.
         row_sum (int): Contains the sum of aggregate observations. Value only initialized after dataset aggregation.
         start_time (DateTime): Records the start time of pipeline processing
+        progress (ProgressTracker): Progress of the observations batched (or streamed), drawn unless testing
+        profiler (StageProfiler): Wall time, rows in and out, and (optionally) peak memory of each stage per batch
         TEST (bool): A flag indicating values should be initialized for testing purposes.
         test_df (DataFrame): A direct dataframe insert for pipeline testing purposes
+        timezone_resolver (TimezoneResolver): Grid-cached time zone resolver shared by all batches
+        country_resolver (CountryResolver): Offline country resolver, None if no country boundaries are available
+        bad_observation_classifier (BadObservationClassifier): Keyword classifier of bad quality observations
+        schema (ObservationSchema): Compact dtype schema applied to raw observations at ingestion
+        workers (int): Number of worker processes cleaning batches in parallel. A value of 1 cleans sequentially.
+        stream (bool): A flag indicating raw observations are streamed in chunks, instead of aggregated in memory.
+        incremental (bool): A flag indicating only new (or modified) raw files under resource_path are processed,
+            discovered through the raw file manifest instead of the datasets given.
+        manifest (RawManifest): Manifest of the ingested raw files, None unless incremental.
+        seen_ids (IdIndex): Ids of all streamed observations, utilized to remove duplicates across chunks.
+        processed_ids (IdIndex): Ids of observations already written to interim or bad quality data (streaming only).
+        unindexed_rows (Counter): Number of rows per dataset handed to the storage backend, but not yet indexed
+        batch_positions (ndarray): Precomputed (start, stop) positions of the batches within df_whole
+        batch_cursor (int): Position within batch_positions of the next batch
     """
 
-    interim_file = "interim_observations.csv"
-    """string: Specification of the file to write data to after cleaning process."""
-    bad_file = 'bad_quality.csv'
+    interim_dataset = "interim_observations"
+    """string: Specification of the dataset to write data to after cleaning process."""
+    bad_dataset = 'bad_quality'
+    """string: Specification of the dataset to write bad quality observations to."""
+    raw_manifest_file = 'raw_manifest.json'
+    """string: File (within the interim data directory) of the manifest of ingested raw files (incremental runs)."""
+    processed_index_suffix = '_ids.bin'
+    """string: Suffix of the files (within the interim data directory) indexing the ids written to each dataset."""
+    pending_index_suffix = '_ids.pending'
+    """string: Suffix of the files (within the interim data directory) marking datasets with rows that are not yet
+    indexed, such as rows written by an interrupted run before their ids were indexed."""
+    keyword_hits_file = 'bad_keyword_hits.csv'
+    """string: File (within the interim data directory) of the bad observation keyword hit counts of the latest run."""
+    invalid_values_file = 'invalid_raw_values.csv'
+    """string: File (within the interim data directory) of the invalid raw values reported at ingestion in the latest run."""
+    stage_profile_file = 'stage_profile.csv'
+    """string: File (within the interim data directory) of the per-batch stage profiling samples of the latest run."""
+    profile_memory = False
+    """bool: Flag to trace the peak memory of each stage (tracemalloc), at a considerable runtime cost."""
+    bad_observation_keywords = description_indicators
+    """list: Description keywords indicating probable bad quality observations."""
+    timezone_cache_file = 'timezone_cache.json'
+    """string: File (within the interim data directory) persisting the time zone grid cache between runs."""
+    timezone_grid_size = 0.1
+    """float: Size in degrees of the grid cells on which resolved time zones are cached."""
+    country_boundaries_file = 'countries.geojson'
+    """string: GeoJSON country boundaries (within the external data directory). Countries are only resolved if present."""
+    country_name_property = 'name'
+    """string: Feature property of the country boundaries containing the country name."""
+    country_grid_size = 0.5
+    """float: Size in degrees of the grid cells on which countries away from boundaries are resolved once."""
+    nominatim_country_fallback = False
+    """bool: Flag to reverse geocode (Nominatim) coordinates outside all country boundaries, e.g. coastal points."""
     batch_size = 1000
     """int: Size of individual batches that aggregate observations are broken down into."""
-
-    def __init__(self, datasets=['observations_sample.csv'], test_df=None):
+    vectorized_local_times = True
+    """bool: Flag to convert UTC to local times per time zone group, instead of the row-wise apply conversion."""
+    batches_in_flight = 2
+    """int: Number of batches per worker process submitted ahead of writing, when cleaning in parallel."""
+    chunk_size = 100000
+    """int: Number of raw observations read per chunk, when streaming observations."""
+    working_columns = ['observed_on', 'latitude', 'longitude', 'time_observed_at', 'time_zone']
+    """list: Columns used for computation, which require values."""
+
+    def __init__(self, datasets=['observations_sample.csv'], test_df=None, workers=1, stream=False,
+                 storage=CsvStorage, incremental=False):
         if test_df is None:
             self.df_whole = pd.DataFrame()
             self.df = pd.DataFrame()
             self.datasets = datasets
             self.resource_path = root_dir() + "/data/raw/"
             self.write_path = root_dir() + "/data/interim/"
-            self.interim_exists = os.path.isfile(self.write_path + self.interim_file)
-            self.bad_data_exists = os.path.isfile(self.write_path + self.bad_file)
+            self.storage = storage(self.write_path)
+            self.interim_exists = self.storage.exists(self.interim_dataset)
+            self.bad_data_exists = self.storage.exists(self.bad_dataset)
             self.row_sum = 0
             self.TEST = False
+            self.timezone_resolver = TimezoneResolver(grid_size=self.timezone_grid_size,
+                                                      cache_file=self.write_path + self.timezone_cache_file)
+            self.country_resolver = self.create_country_resolver(root_dir() + '/data/external/')
         else:
             self.df_whole = test_df.copy(deep=True)
             self.TEST = True
             self.row_sum = len(self.df_whole.index)
-
+            self.timezone_resolver = TimezoneResolver(grid_size=self.timezone_grid_size)
+            self.country_resolver = None
+
+        self.bad_observation_classifier = BadObservationClassifier(self.bad_observation_keywords)
+        self.schema = ObservationSchema()
+        self.workers = workers
+        self.stream = stream
+        self.incremental = incremental and not self.TEST
+        self.manifest = None
+        self.seen_ids = IdIndex()
+        self.batch_positions = None
+        self.batch_cursor = 0
+        self.processed_ids = None
+        self.unindexed_rows = Counter()
         self.start_time = datetime.now()
+        self.progress = ProgressTracker(label='observations', output=None if self.TEST else sys.stdout)
+        self.profiler = StageProfiler(trace_memory=self.profile_memory)
 
     def activate_flow(self):
         """ Method details and executes the flow of the cleaning pipeline"""
 
-        self.aggregate_observations()  # Aggregate all observation files
+        if self.incremental:
+            self.run_stage(self.discover_raw_files)  # Only new or modified raw files are processed
+            if not self.datasets:
+                sys.stdout.write('No new raw observation files within %s\n' % self.resource_path)
+                self.record_manifest()  # Persists refreshed entries of touched, but unmodified files
+                return
+
+        if not self.stream:  # Streamed chunks are aggregated, deduplicated, and continued in stream_observations()
+            self.run_stage(self.aggregate_observations, self.whole_rows)  # Aggregate all observation files
+
+            self.run_stage(self.enforce_unique_ids, self.whole_rows)  # No duplicate observations
+
+            self.run_stage(self.continuation, self.whole_rows)  # Continuation from interrupt/ start from scratch
+
+            self.run_stage(self.remove_na_working_columns, self.whole_rows)  # Remove NaN in computation columns
+
+            if self.df_whole.empty:  # All observations of the datasets were processed before (or are incomplete)
+                self.record_manifest()
+                return
+
+        if self.workers > 1:
+            self.parallel_flow()  # Clean batches within worker processes
+        else:
+            for batch in self.generate_batches():  # Batching loop
+                self.df = batch
+                self.profiler.next_batch()
+
+                bad_df = self.clean_batch()  # Clean the current batch
+
+                self.run_stage(partial(self.write_bad_data, bad_df), lambda: len(bad_df.index))  # Write bad data
+
+                self.run_stage(self.write_interim_data, self.batch_rows)  # Write to interim data
+
+        self.run_stage(self.flush_storage)  # Write the rows buffered by the storage backend
+
+        self.timezone_resolver.save_cache()  # Persist time zone cache for subsequent runs
+
+        self.write_keyword_hits()  # Write bad observation keyword hit counts for auditing
+
+        self.progress.finish()
+
+        self.write_invalid_values()  # Report invalid raw values for auditing
+
+        self.write_stage_profile()  # Report and export the stage profile
 
-        self.enforce_unique_ids()  # No duplicate observations
+        self.record_manifest()  # Processed files are only recorded once completely written
 
-        self.continuation()  # Continuation from interrupt/ start from scratch
+    def record_manifest(self):
+        """ Method records the datasets of an incremental run as ingested within the raw file manifest, and persists
+        the manifest. The datasets must be completely processed (or contain no further observations to process)."""
+        if self.manifest is not None:
+            self.manifest.record(self.datasets)
+            self.manifest.save()
 
-        self.remove_na_working_columns()  # Remove any NaN types from columns undergoing computation
+    def clean_batch(self):
+        """ Method performs the cleaning stages on the current batch df, without writing to file.
 
-        while self.batching():  # Batching loop
-            self.bad_data_separation()  # Detect bad quality observations from batch
+        Returns:
+            The formatted bad quality observations separated from the batch. The cleaned batch remains in df.
+        """
+        bad_df = self.format_bad_data(self.run_stage(self.identify_bad_observations, self.batch_rows))  # Bad quality
+
+        self.run_stage(self.format_observation_dates, self.batch_rows)  # Format sighting dates
+
+        self.run_stage(self.generate_local_times, self.batch_rows)  # Generate local observation times
+
+        if self.country_resolver is not None:
+            self.run_stage(self.coordinate_to_country, self.batch_rows)  # Resolve observation countries offline
+
+        self.run_stage(self.remove_peripheral_columns, self.batch_rows)  # Remove peripheral columns
+
+        return bad_df
+
+    def run_stage(self, stage, rows=None):
+        """ Method executes a stage of the pipeline, recording its profile
 
-            self.format_observation_dates()  # Format sighting dates
+        Args:
+            stage (function): The stage method (or partial), profiled under its method name
+            rows (function): Function returning the current number of rows of the stage (batch_rows or whole_rows)
+
+        Returns:
+            The return value of the stage
+        """
+        name = stage.func.__name__ if isinstance(stage, partial) else stage.__name__
+        with self.profiler.stage(name, rows):
+            return stage()
+
+    def batch_rows(self) -> int:
+        """ Method returns the number of rows of the current batch"""
+        return len(self.df.index)
+
+    def whole_rows(self) -> int:
+        """ Method returns the number of aggregated rows"""
+        return len(self.df_whole.index)
+
+    def parallel_flow(self):
+        """ Method distributes batches to a pool of worker processes, cleaning them in parallel.
+
+        Each worker initializes a single Pipeline (and TimezoneFinder) on start-up, reused for all of its batches, with
+        the cleaning settings of this pipeline (see worker_settings()).
+        This (parent) process remains the single writer: Results are written in batch order, such that the interim
+        and bad quality files are identical to a sequential run.
+        At most workers * batches_in_flight batches are submitted ahead of the writer, bounding memory usage.
+        Time zones resolved by the workers are merged into the parent resolver in order to be persisted.
+        """
+        pending = deque()
+        with Pool(processes=self.workers, initializer=initialize_worker, initargs=(self.worker_settings(),)) as pool:
+            for batch in self.generate_batches():
+                pending.append(pool.apply_async(clean_batch_worker, (batch,)))
+                if len(pending) >= self.workers * self.batches_in_flight:
+                    self.write_batch_results(*pending.popleft().get())
+
+            while pending:
+                self.write_batch_results(*pending.popleft().get())
+
+    def worker_settings(self) -> dict:
+        """ Method collects the cleaning settings of this pipeline, applied to the pipelines of the worker processes
+        (see initialize_worker()), such that settings changed on this instance also hold in parallel mode
+
+        Returns:
+            A (picklable) dict of the settings
+        """
+        return {'vectorized_local_times': self.vectorized_local_times,
+                'working_columns': self.working_columns,
+                'bad_observation_keywords': self.bad_observation_classifier.keywords,
+                'country_resolver': self.country_resolver,
+                'timezone_grid_size': self.timezone_resolver.grid_size,
+                'timezone_point_decimals': self.timezone_resolver.point_decimals,
+                'timezone_cache_file': self.timezone_resolver.cache_file,
+                'trace_memory': self.profiler.trace_memory}
+
+    def generate_batches(self):
+        """ Generator yielding the batches created by batching().
+
+        When streaming, each chunk of stream_observations() is batched in turn.
+        """
+        if not self.stream:
+            while self.batching():
+                yield self.df
+            return
 
-            self.generate_local_times()  # Generate local observation times
+        for chunk in self.stream_observations():
+            self.df_whole = chunk
+            while self.batching():
+                yield self.df
 
-            self.remove_peripheral_columns()  # Remove peripheral columns
+    def write_batch_results(self, df, bad_df, timezone_entries, keyword_hits, profile_samples):
+        """ Method writes the results of a batch cleaned by a worker process
 
-            self.write_interim_data()  # Write to interim data
+        Args:
+            df (DataFrame): The cleaned batch
+            bad_df (DataFrame): The formatted bad quality observations separated from the batch
+            timezone_entries (dict): Time zone cache entries resolved by the worker for the batch
+            keyword_hits (Counter): Bad observation keyword hit counts of the batch
+            profile_samples (list): Stage profiling samples of the worker for the batch
+        """
+        self.df = df
+        self.profiler.next_batch()
+        self.profiler.add_samples(profile_samples)
+        if self.country_resolver is not None and self.country_resolver.fallback is not None:
+            self.run_stage(self.fallback_countries, self.batch_rows)  # Nominatim fallback, never called by workers
+        self.run_stage(partial(self.write_bad_data, bad_df), lambda: len(bad_df.index))
+        self.run_stage(self.write_interim_data, self.batch_rows)
+        self.timezone_resolver.update_entries(timezone_entries)
+        self.bad_observation_classifier.hit_counts.update(keyword_hits)
+
+    def discover_raw_files(self):
+        """ Method replaces the datasets by the raw files under resource_path that are not recorded within the raw file
+        manifest, or were modified since they were recorded"""
+        self.manifest = RawManifest(self.write_path + self.raw_manifest_file, self.resource_path)
+        self.datasets = self.manifest.new_files()
+        sys.stdout.write('New raw observation files: %s\n' % (', '.join(self.datasets) or 'none'))
 
     def aggregate_observations(self):
         """Method aggregates all observations from separate files, placing them within a df for manipulation
 
+        Observations are cast to the compact ingestion schema (see ObservationSchema) as each file is read.
         Method will check if dataframe is empty. This is to accommodate test cases which preloads the dataframe into
          the dataframe
         """
-        if not self.TEST:
-            for dataset in self.datasets:
-                df_temp = pd.read_csv(self.resource_path + dataset)
-                self.df_whole = pd.concat([self.df_whole, df_temp])  # Merge temp df into container df
+        if self.TEST:
+            self.df_whole = self.schema.apply(self.df_whole)
+            return
+
+        frames = [self.schema.apply(pd.read_csv(self.resource_path + dataset, **self.schema.read_options()))
+                  for dataset in self.datasets]
+        self.df_whole = concat_observations(frames)  # Merge file dfs, retaining categorical columns
+
+    def read_observation_chunks(self):
+        """ Generator yielding raw observations in chunks of chunk_size rows, file by file.
+
+        In test cases, the chunks are taken from the test dataframe.
+        """
+        if self.TEST:
+            test_df = self.df_whole  # df_whole is replaced by each chunk during streaming
+            for start in range(0, len(test_df.index), self.chunk_size):
+                yield self.schema.apply(test_df.iloc[start:start + self.chunk_size])
+            return
+
+        for dataset in self.datasets:
+            with pd.read_csv(self.resource_path + dataset, chunksize=self.chunk_size,
+                             **self.schema.read_options()) as reader:
+                for chunk in self.profiler.iterate('read_observation_chunks', reader):  # Profiles parsing
+                    yield self.schema.apply(chunk)
+
+    def stream_observations(self):
+        """ Generator yielding chunks of observations ready for batching, without aggregating all observations.
+
+        Each chunk is deduplicated against all previously streamed ids (seen_ids), observations already written to
+        interim or bad quality data are removed (continuation), as are rows with NaN working columns.
+        Memory is bounded by the chunk size, and the 8 bytes per id of the IdIndex instances.
+        """
+        self.processed_ids = self.collect_processed_ids()
+        streamed_rows = 0
+
+        for chunk in self.read_observation_chunks():
+            with self.profiler.stage('stream_observations', rows=lambda: len(chunk.index)):
+                chunk = chunk.drop_duplicates(subset=['id'], keep='first')  # Duplicates within the chunk
+                chunk = chunk[~self.seen_ids.contains(chunk['id'])]  # Duplicates of previous chunks
+                self.seen_ids.add(chunk['id'])
+
+                chunk = chunk.set_index('id')
+                chunk = chunk[~self.processed_ids.contains(chunk.index)]  # Continuation
+                chunk = chunk.dropna(subset=self.working_columns)
+
+            streamed_rows = streamed_rows + len(chunk.index)
+            self.row_sum = streamed_rows
+            self.progress.update(len(chunk.index))  # Streamed observations, without a known total
+            yield chunk
 
     def enforce_unique_ids(self):
         """Removal of any duplicate observations utilizing their observation id
@@ -105,40 +392,81 @@ class Pipeline:
         """
         self.df_whole.set_index('id', inplace=True)
 
-        interim_df = pd.DataFrame()
-        bad_quality_df = pd.DataFrame()
+        processed_ids = self.collect_processed_ids(test_interim_df, test_bad_df)
+        self.df_whole = self.df_whole[~processed_ids.contains(self.df_whole.index)]  # Removal of processed rows
 
-        if self.TEST and test_interim_df is not None:  # Conditions for test cases
-            interim_df = pd.concat([interim_df, test_interim_df])
-            bad_quality_df = pd.concat([bad_quality_df, test_bad_df])
+        self.row_sum = len(self.df_whole.index)
 
-        if not self.TEST and self.interim_exists:  # Non-test conditions when interim data file exists
-            interim_df = pd.read_csv(self.write_path + self.interim_file)
-        if not self.TEST and self.bad_data_exists:  # Non-test conditions when bad_quality data file exists
-            bad_quality_df = pd.read_csv(self.write_path + self.bad_file)
+    def collect_processed_ids(self, test_interim_df=None, test_bad_df=None) -> IdIndex:
+        """ Method collects the ids of all observations already written to interim data or bad_quality data.
 
-        if not interim_df.empty:  # Removal of duplicate rows already written to interim data
-            interim_df.set_index('id', inplace=True)
-            self.df_whole = self.df_whole.loc[self.df_whole.index.difference(interim_df.index), ]
+        The ids of each dataset are read from its id index (see collect_dataset_ids()), which is appended to as each
+        batch is written.
 
-        if not bad_quality_df.empty:  # Removal of duplicate rows already written to bad_quality data
-            bad_quality_df.set_index('id', inplace=True)
-            self.df_whole = self.df_whole.loc[self.df_whole.index.difference(bad_quality_df.index), ]
+        Args:
+            test_interim_df (DataFrame): Interim data for testing purposes, used in place of the interim data file
+            test_bad_df (DataFrame): Bad quality data for testing purposes, used in place of the bad quality data file
 
-        self.row_sum = len(self.df_whole.index)
+        Returns:
+            An IdIndex containing the processed observation ids
+        """
+        processed_ids = IdIndex()
+
+        if self.TEST:  # Conditions for test cases
+            for test_processed_df in [test_interim_df, test_bad_df]:
+                if test_processed_df is not None and not test_processed_df.empty:
+                    processed_ids.add(test_processed_df['id'])
+
+        if self.TEST:
+            return processed_ids
+
+        processed_ids.add(self.collect_dataset_ids(self.interim_dataset, self.interim_exists).ids)
+        processed_ids.add(self.collect_dataset_ids(self.bad_dataset, self.bad_data_exists).ids)
+        return processed_ids
+
+    def collect_dataset_ids(self, dataset, exists) -> IdIndex:
+        """ Method collects the ids of the observations written to a dataset, from the id index of the dataset.
+
+        The index is only trusted if the dataset is not marked as pending (see write_dataset()). It is rebuilt from the
+        id column of the dataset if it does not exist (data written prior to the index), or if the dataset is pending:
+        An interrupted run may have written rows without indexing their ids, which would otherwise be written again.
+        If the dataset does not exist (or was deleted), its stale index is removed.
+
+        Args:
+            dataset (str): The dataset name (interim_dataset or bad_dataset)
+            exists (bool): A flag indicating the dataset exists
+
+        Returns:
+            An IdIndex of the ids written to the dataset
+        """
+        index_file = self.write_path + dataset + self.processed_index_suffix
+        pending_file = self.write_path + dataset + self.pending_index_suffix
+        if not exists:  # Start the dataset from scratch
+            for file in [index_file, pending_file]:
+                if os.path.isfile(file):
+                    os.remove(file)
+            return IdIndex()
+
+        if os.path.isfile(index_file) and not os.path.isfile(pending_file):  # Resume from the id index
+            return IdIndex.load(index_file)
+
+        dataset_ids = IdIndex(self.storage.read(dataset, columns=[]).index)
+        IdIndex.append_file(index_file + '.tmp', dataset_ids.ids)
+        os.replace(index_file + '.tmp', index_file)  # Rebuild the index for subsequent resumes
+        if os.path.isfile(pending_file):
+            os.remove(pending_file)
+        return dataset_ids
 
     def remove_na_working_columns(self):
         """ This method removes all rows with NaN values, specifically located within columns used for computation that require
         values.
 
          The 'working columns' include date, time, time zone, and coordinates.
-         If the removal creates an empty dataframe, the method exists execution, displaying an exit message.
+         If the removal creates an empty dataframe, an exit message is displayed, and activate_flow() ends the run.
         """
-        self.df_whole.dropna(subset=['observed_on', 'latitude', 'longitude', 'time_observed_at', 'time_zone'],
-                             inplace=True)
+        self.df_whole.dropna(subset=self.working_columns, inplace=True)
         if self.df_whole.empty:
             print("*********** No further correctly format to process ***********")
-            sys.exit()
 
     def batching(self) -> bool:
         """ This method creates observation batches from the aggregate observations in order to iteratively process and clean
@@ -146,83 +474,97 @@ class Pipeline:
 
         This method processes each batch, iteratively writing to interim_data.csv.
         The DataFrame df_whole contains aggregate observations, while df contains the current batch.
-        Each batch once generated is removed from df_whole until this dataframe is empty, concluding the batching process.
+        On the first call, the position ranges of all batches are precomputed (see batch_ranges()). Each call advances
+        a cursor over these ranges, and places an owned copy of the batch rows in df, such that later stages can modify
+        the batch in place without copying (or altering) df_whole. Once all batches have been handed out, df_whole is
+        released, concluding the batching process. The rows of each completed batch are reported to the progress tracker.
 
         Returns:
             Method returns a boolean value. True if there are still observations to be batched and processes. False if df_whole is empty
             indicating the batching process has concluded.
         """
-        rows_remaining = len(self.df_whole.index)
-        if not self.TEST: self.percentage(rows_remaining)
-
-        if self.df_whole.empty:
-            return False
-
-        if rows_remaining > self.batch_size:
-            self.df = self.df_whole.iloc[0:self.batch_size]
-            self.df_whole = self.df_whole.iloc[self.batch_size:]
-            return True
-        else:
-            self.df = self.df_whole
+        if self.batch_positions is None:
+            self.batch_positions = batch_ranges(len(self.df_whole.index), self.batch_size)
+            self.batch_cursor = 0
+            if not self.stream:
+                self.progress.total = len(self.df_whole.index)
+        elif not self.stream:  # The previous batch is completed
+            start, stop = self.batch_positions[self.batch_cursor - 1]
+            self.progress.update(stop - start)
+
+        finished = self.batch_cursor == len(self.batch_positions)
+
+        if finished:
             self.df_whole = pd.DataFrame()
-            return True
-
-    def percentage(self, rows_remaining):
-        """ Method generates and updates a status bar based on the progress of batching.
-
-        Both percentage complete and running time metrics are displayed
-        Method inspiration: Inspiration: https://www.geeksforgeeks.org/progress-bars-in-python/
-
-        Args:
-            rows_remaining (int): The number of rows remaining to be processed in the df_whole DataFrame.
-        """
-        progress_bar_length = 100
-        percentage_complete = (self.row_sum - rows_remaining) / self.row_sum
-        filled = int(progress_bar_length * percentage_complete)
-        running_time = datetime.now() - self.start_time
+            self.batch_positions = None
+            return False
 
-        bar = '=' * filled + '-' * (progress_bar_length - filled)
-        percentage_display = round(100 * percentage_complete, 1)
-        sys.stdout.write('\r[%s] %s%s ... running: %s' % (bar, percentage_display, '%', running_time))
-        sys.stdout.flush()
+        start, stop = self.batch_positions[self.batch_cursor]
+        self.df = self.df_whole.iloc[start:stop].copy()
+        self.batch_cursor = self.batch_cursor + 1
+        return True
 
     def format_observation_dates(self):
         """ Method ensures that raw data dates follow format yyyy-mm-dd. If the dates deviate they are removed from the dataframe.
 
         In place changes are effected within the classes dataframe df.
         Any date errors produced by incorrect date formats are transformed into NaT values, and the row removed from df
-        Removal of the rows requires an index reset in order to facilitate testing operations on the cleaning pipeline.
+        The dates remain datetime64 values (see TimeModel), and are only formatted as text when written to CSV.
+        """
+        self.df['observed_on'] = parse_dates(self.df['observed_on'])
+        self.df = self.df[self.df['observed_on'].notna()]
+
+    def create_country_resolver(self, boundaries_path):
+        """ Method creates the offline country resolver from the country boundaries within the boundaries path
+
+        Returns:
+            The CountryResolver, with the optional Nominatim fallback, or None if the boundaries file does not exist
+        """
+        boundaries_file = boundaries_path + self.country_boundaries_file
+        if not os.path.isfile(boundaries_file):
+            return None
+        return CountryResolver(boundaries_file,
+                               name_property=self.country_name_property,
+                               grid_size=self.country_grid_size,
+                               fallback=reverse_geocode_countries if self.nominatim_country_fallback else None)
+
+    def coordinate_to_country(self):
+        """ Method identifies the country of origin of all observations in bulk, creating a country column
+
+        Countries are resolved offline by the CountryResolver (point-in-polygon tests against country boundaries,
+        reusing results per grid cell). Only coordinates outside all boundaries are reverse geocoded through Nominatim,
+        if the fallback is enabled.
+        """
+        self.df['country'] = self.country_resolver.resolve(self.df['latitude'].to_numpy(),
+                                                           self.df['longitude'].to_numpy())
+
+    def fallback_countries(self):
+        """ Method resolves the countries of batch observations outside all country boundaries through the fallback of
+        the country resolver (Nominatim reverse geocoding, if enabled).
+
+        Worker processes resolve countries without the fallback (see initialize_worker()), which is applied to their
+        batches here in the parent process instead, such that the rate limit of the fallback holds across all workers.
         """
-        self.df['observed_on'] = pd.to_datetime(self.df['observed_on'],
-                                                format='%Y-%m-%d',
-                                                yearfirst=True,
-                                                errors='coerce',
-                                                exact=True).astype(str)
-        self.df.query('observed_on != "NaT"', inplace=True)
+        unresolved = self.df['country'].isna().to_numpy()
+        if unresolved.any():
+            self.df.loc[unresolved, 'country'] = self.country_resolver.fallback(
+                self.df['latitude'].to_numpy()[unresolved], self.df['longitude'].to_numpy()[unresolved])
 
     def coordinate_to_country_rate_limited(self):
         """ Method takes data coordinates, and identifies the country of origin, creating a Country column within Interim data
 
         The Nomanitim geocoding API is utilized.
         Due to rate limiting of 1 request per second, a rate limiter has been introduced in order to respect the limits.
+        Prefer coordinate_to_country(), which resolves countries offline and only falls back to Nominatim.
         """
-        # Set up the geolocation library
-        geolocator = Nominatim(user_agent="Spatio_Tempt_Class")
-        geocode = RateLimiter(geolocator.reverse, min_delay_seconds=2)
-
-        # Combine lat and long into coordinates
-        latitudes = pd.Series(self.df.latitude.values.astype(str))
-        longitudes = pd.Series(self.df.longitude.values.astype(str))
-        coordinates = latitudes + ', ' + longitudes
-
-        # Retrieve countries from coordinates (rate limiting requests)
-        locations = coordinates.apply(partial(geocode, language='en', exactly_one=True))
-        self.df['country'] = locations.apply(lambda x: x.raw['address']['country']).values
+        self.df['country'] = reverse_geocode_countries(self.df.latitude.values, self.df.longitude.values)
 
     def generate_local_times(self):
         """ Method converts UTC time to correct local time utilizing the specified sighting timezone.
 
         The new column generated is labelled "local_time_observed_at" and can be found in interim data folder.
+        Local times are typed (see TimeModel): "local_time_observed_at" holds the naive local (wall clock) datetime,
+        and the generated "utc_offset" column the offset from UTC in minutes.
 
         The date conversion utilizes both date and time in the UTC format.
         This means, any day change (midnight -> next day) are accounted for.
@@ -233,48 +575,77 @@ class Pipeline:
         self.standardize_timezones()
 
         # Generate local times by converting UTC to specified time zones
-        self.df['local_time_observed_at'] = self.df.apply(
+        if self.vectorized_local_times:
+            local_times, offsets = localize(parse_utc_times(self.df['time_observed_at']), self.df['time_zone'])
+        else:
+            local_times, offsets = parse_local_times(self.convert_local_times_apply(self.df))
+        self.df['local_time_observed_at'] = local_times
+        self.df['utc_offset'] = offsets
+
+    @staticmethod
+    def convert_local_times_apply(df):
+        """ Method converts UTC times to local times row by row, parsing each time and time zone individually.
+
+        This is the original conversion path, retained for comparison in benchmarks/LocalTimesBenchmark.py
+
+        Args:
+            df (DataFrame): Observations containing the time_observed_at and (standardized) time_zone columns
+
+        Returns:
+            A Series of local time strings aligned to the df index
+        """
+        return df.apply(
             lambda x: pd.to_datetime(x['time_observed_at'], utc=True).astimezone(pytz.timezone(x['time_zone'])),
-            axis=1).astype(str)
+            axis=1, result_type='reduce').astype(str)  # A Series, also for batches without rows
+
+    @staticmethod
+    def convert_local_times_vectorized(df):
+        """ Method converts UTC times to local times by parsing the batch once, and converting each time zone group
+        with a single tz-aware operation.
+
+        The resulting strings are identical to those of convert_local_times_apply().
+        Rows without a resolved time zone are left as NaN.
+
+        Args:
+            df (DataFrame): Observations containing the time_observed_at and (standardized) time_zone columns
+
+        Returns:
+            A Series of local time strings aligned to the df index
+        """
+        utc_times = parse_utc_times(df['time_observed_at'])  # Parse the entire batch once
+        return format_local_times(*localize(utc_times, df['time_zone']))
 
     def standardize_timezones(self):
         """ Method generated timezones in a format accepted by the pytz library for use in the local time zone conversion
 
         This method utilizes the observation coordinates to return the time zone of the sighting.
         This timezone overwrites the "time_zone" column
+        Coordinates are resolved in bulk by the TimezoneResolver, which caches time zones on a lat/lon grid.
         """
-        finder = TimezoneFinder()
-
-        self.df['time_zone'] = self.df.apply(
-            lambda x: finder.timezone_at(lat=x['latitude'], lng=x['longitude']), axis=1)
-
-    def bad_data_separation(self):
-        """Method performs the sub-process of bad data separation, formatting, and writing to file"""
-        bad_df = self.identify_bad_observations()
-        bad_df = self.format_bad_data(bad_df)
-        self.write_bad_data(bad_df)
+        self.df['time_zone'] = self.timezone_resolver.resolve(self.df['latitude'].to_numpy(),
+                                                              self.df['longitude'].to_numpy())
 
     def identify_bad_observations(self):
         """Method identifies probable bad quality images based on keyword extraction from the descriptions
 
-        Keyword pattern identification is accomplished through the use of regex pattern matching
+        Keyword pattern identification is accomplished through the use of a single compiled word-boundary regex
+        pattern (see BadObservationClassifier), which also records the per-keyword hit counts.
         """
-        description_indicators = ['dead', 'road kill', 'road', 'scat', 'poo', 'killed', 'spoor', 'road-kill', 'remains',
-                                  'body', 'deceased', 'prey', 'fatality', 'tracks', 'trapped', 'bad', 'roadkilled', 'poop',
-                                  'crushed', 'kill', 'squashed', 'terrible', 'caught', 'pool', 'blurry', 'destroyed',
-                                  'sidewalk',
-                                  'grounded']
-        regex_pattern = '|'.join([f'{key_word}' for key_word in description_indicators])
-        filter = self.df.description.str.contains(regex_pattern, case=False, regex=True)  # Filter descriptions to identify keywords
-        filter.fillna(False, inplace=True)  # Boolean filter
-        bad_df = self.df[filter]  # Filter to produce bad_obs df
-        self.df = self.df[~filter]  # Filter to remove bad_obs from df
+        filter = self.bad_observation_classifier.classify(self.df.description)  # Filter descriptions to identify keywords
+        bad_df = self.df.take(np.flatnonzero(filter))  # Filter to produce bad_obs df (owned frame, not a view)
+        self.df = self.df.take(np.flatnonzero(~filter))  # Filter to remove bad_obs from df (owned frame, not a view)
         bad_df['image_quality'] = 'bad'  # Label bad data image quality
         return bad_df
 
     def remove_peripheral_columns(self):
-        """ Method removes all peripheral columns before writing dataframe to interim_data.csv"""
-        self.df = self.df[['observed_on', 'local_time_observed_at', 'latitude', 'longitude',
+        """ Method removes all peripheral columns before writing dataframe to interim_data.csv
+
+        The country column is always written (empty if no country resolver is available), such that the interim schema
+        does not depend on the country boundaries available when the run starts.
+        """
+        if 'country' not in self.df.columns:
+            self.df = self.df.assign(country=None)
+        self.df = self.df[['observed_on', 'local_time_observed_at', 'utc_offset', 'latitude', 'longitude', 'country',
                            'positional_accuracy', 'public_positional_accuracy', 'image_url', 'license', 'geoprivacy',
                            'taxon_geoprivacy', 'scientific_name', 'common_name', 'taxon_id']]
 
@@ -292,40 +663,172 @@ class Pipeline:
     def write_bad_data(self, bad_df):
         """Method performs similar operation to the write_interim_data() method, in this case specifically writing bad data
 
-        This method should be refactored in conjunction with write_interim_data in order to minimize code repetition
+        Both methods delegate the file format to the storage backend.
 
         Args:
             bad_df (DataFrame): DataFrame containing the sub-dataframe of only id, image_url, and image_quality columns
         """
         if not self.TEST:
-            self.bad_data_exists = os.path.isfile(self.write_path + self.bad_file)
-            if self.bad_data_exists:
-                bad_df.to_csv(self.write_path + self.bad_file, mode='a', index=True, header=False)
-            else:
-                bad_df.to_csv(self.write_path + self.bad_file, mode='w', index=True, header=True)
+            self.write_dataset(self.bad_dataset, bad_df)
+            self.bad_data_exists = True
+
+    def flush_storage(self):
+        """ Method writes the interim and bad quality rows buffered by the storage backend (see ParquetStorage), and
+        indexes their ids as processed"""
+        if not self.TEST:
+            for dataset in [self.interim_dataset, self.bad_dataset]:
+                self.index_written_ids(dataset, self.storage.flush(dataset))
+
+    def write_keyword_hits(self):
+        """ Method writes the bad observation keyword hit counts of the run (number of bad observations containing each
+        keyword) to the keyword hits file in the interim data folder, for auditing"""
+        if not self.TEST:
+            hits = pd.Series(self.bad_observation_classifier.hit_counts, name='hits', dtype='int64')
+            hits.rename_axis('keyword').sort_values(ascending=False).to_csv(self.write_path + self.keyword_hits_file)
+
+    def write_invalid_values(self):
+        """ Method reports the number of invalid raw values per column of the run, writing the counts (and examples)
+        to the invalid values file in the interim data folder"""
+        if not self.TEST and self.schema.invalid_counts:
+            report = self.schema.invalid_report()
+            sys.stdout.write('Invalid raw values: %s\n' % ', '.join('%s: %s' % (column, count) for column, count in
+                                                                      report['invalid'].items()))
+            report.to_csv(self.write_path + self.invalid_values_file)
+
+    def write_stage_profile(self):
+        """ Method reports the stage profile summary of the run, and exports the per-batch samples to the stage profile
+        file in the interim data folder, for regression tracking"""
+        self.profiler.stop()
+        if not self.TEST:
+            sys.stdout.write(self.profiler.report())
+            self.profiler.export(self.write_path + self.stage_profile_file)
 
     def write_interim_data(self):
-        """ Method writes current state of df into interim data folder in csv format"""
+        """ Method writes current state of df into interim data folder, in the format of the storage backend"""
         if not self.TEST:
-            self.interim_exists = os.path.isfile(self.write_path + self.interim_file)
-            if self.interim_exists:
-                self.df.to_csv(self.write_path + self.interim_file, mode='a', index=True, header=False)
-            else:
-                self.df.to_csv(self.write_path + self.interim_file, mode='w', index=True, header=True)
+            self.write_dataset(self.interim_dataset, self.df)
+            self.interim_exists = True
+
+    def write_dataset(self, dataset, df):
+        """ Method appends rows to a dataset through the storage backend, and indexes the ids of the written rows.
+
+        While rows handed to the storage backend are not yet indexed (rows being written, or buffered by the backend),
+        the dataset is marked as pending, such that the index of an interrupted run is rebuilt from the dataset on
+        resume (see collect_dataset_ids()) rather than trusted.
+
+        Args:
+            dataset (str): The dataset name (interim_dataset or bad_dataset)
+            df (DataFrame): The rows, indexed by id
+        """
+        pending_file = self.write_path + dataset + self.pending_index_suffix
+        self.unindexed_rows[dataset] += len(df.index)
+        if self.unindexed_rows[dataset] > 0 and not os.path.isfile(pending_file):
+            open(pending_file, 'w').close()  # Marked before any rows are written
+        self.index_written_ids(dataset, self.storage.append(dataset, df))
+
+    def index_written_ids(self, dataset, written_ids):
+        """ Method appends the ids of rows written to a dataset to its id index, and removes the pending mark of the
+        dataset once all rows handed to the storage backend are indexed
+
+        Args:
+            dataset (str): The dataset name (interim_dataset or bad_dataset)
+            written_ids (Index): Ids of the rows written by the storage backend
+        """
+        IdIndex.append_file(self.write_path + dataset + self.processed_index_suffix, written_ids)
+        self.unindexed_rows[dataset] -= len(written_ids)
+        pending_file = self.write_path + dataset + self.pending_index_suffix
+        if self.unindexed_rows[dataset] == 0 and os.path.isfile(pending_file):
+            os.remove(pending_file)
+
+
+def batch_ranges(rows: int, batch_size: int) -> np.ndarray:
+    """Method computes the positional ranges of consecutive batches over a number of rows
+
+    Args:
+        rows (int): The number of rows to be batched
+        batch_size (int): The maximum number of rows per batch
+
+    Returns:
+        An int64 array of shape (batches, 2), containing the start and (exclusive) stop position of each batch
+    """
+    starts = np.arange(0, rows, batch_size, dtype=np.int64)
+    stops = np.minimum(starts + batch_size, rows)
+    return np.column_stack((starts, stops))
+
+
+nominatim_geocode = None
+"""RateLimiter: Rate limited Nominatim reverse geocoding, created on first use by reverse_geocode_countries()"""
+worker_pipeline = None
+"""Pipeline: The pipeline of a worker process, initialized once per worker by initialize_worker()"""
+
+
+def reverse_geocode_countries(latitudes, longitudes) -> np.ndarray:
+    """Method reverse geocodes the countries of coordinates through the Nominatim geocoding API (rate limited)
+
+    Args:
+        latitudes (array-like): Float latitudes of the observations
+        longitudes (array-like): Float longitudes corresponding to the latitudes
+
+    Returns:
+        An object array of the country names, None where Nominatim resolves no country
+    """
+    global nominatim_geocode
+    if nominatim_geocode is None:  # Set up the geolocation library once, spacing requests across all calls
+        nominatim_geocode = RateLimiter(Nominatim(user_agent="Spatio_Tempt_Class").reverse, min_delay_seconds=2)
+
+    # Combine lat and long into coordinates
+    coordinates = pd.Series(np.asarray(latitudes).astype(str)) + ', ' + pd.Series(np.asarray(longitudes).astype(str))
+
+    # Retrieve countries from coordinates (rate limiting requests)
+    locations = coordinates.apply(partial(nominatim_geocode, language='en', exactly_one=True))
+    return locations.apply(lambda x: None if x is None else x.raw.get('address', {}).get('country')).to_numpy(object)
+
+
+def initialize_worker(settings):
+    """Method initializes the pipeline (and its TimezoneFinder) of a worker process.
+
+    The worker pipeline loads the persisted time zone cache, but never writes to file.
+
+    Args:
+        settings (dict): The cleaning settings of the parent pipeline (see Pipeline.worker_settings())
+    """
+    global worker_pipeline
+    worker_pipeline = Pipeline(test_df=pd.DataFrame())  # Without data files, loading only the settings below
+    worker_pipeline.vectorized_local_times = settings['vectorized_local_times']
+    worker_pipeline.working_columns = settings['working_columns']
+    worker_pipeline.bad_observation_classifier = BadObservationClassifier(settings['bad_observation_keywords'])
+    worker_pipeline.country_resolver = settings['country_resolver']
+    if worker_pipeline.country_resolver is not None:
+        worker_pipeline.country_resolver.fallback = None  # Applied by the parent process (see fallback_countries())
+    worker_pipeline.timezone_resolver = TimezoneResolver(grid_size=settings['timezone_grid_size'],
+                                                         point_decimals=settings['timezone_point_decimals'],
+                                                         cache_file=settings['timezone_cache_file'],
+                                                         finder=worker_pipeline.timezone_resolver.finder)
+    worker_pipeline.profiler = StageProfiler(trace_memory=settings['trace_memory'])
+
+
+def clean_batch_worker(batch):
+    """Method cleans a single batch within a worker process
+
+    Args:
+        batch (DataFrame): The batch of observations to be cleaned
+
+    Returns:
+        A tuple of the cleaned batch, the formatted bad quality observations, the time zone cache entries resolved
+        by the worker since its previous batch, the bad observation keyword hit counts of the batch, and the stage
+        profiling samples of the batch.
+    """
+    worker_pipeline.df = batch
+    bad_df = worker_pipeline.clean_batch()
+    return (worker_pipeline.df, bad_df, worker_pipeline.timezone_resolver.pop_new_entries(),
+            worker_pipeline.bad_observation_classifier.pop_hit_counts(), worker_pipeline.profiler.pop_samples())
 
 
 if __name__ == "__main__":
-    # Create Pipeline object
-    pipeline = Pipeline(datasets=['observations_1.csv',
-                                  'observations_2.csv',
-                                  'observations_3.csv',
-                                  'observations_4.csv',
-                                  'observations_5.csv',
-                                  'observations_6.csv',
-                                  'observations_7.csv',
-                                  'observations_8.csv',
-                                  'observations_9.csv',
-                                  'observations_10.csv'])
+    # Create Pipeline object, processing only the raw files added to (or modified within) data/raw/ since the last run
+    pipeline = Pipeline(incremental=True,
+                        workers=os.cpu_count(),
+                        stream=True)
 
     # Activate pipeline flow
     pipeline.activate_flow()
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+
+
+class IdIndex:
+    """ Compact set of observation ids, stored as a sorted int64 array (8 bytes per id).
+
+    Membership of a batch of ids is determined through a single binary search (searchsorted) over the array, and new
+    ids are merged in through a single sorted insertion.
+    Indexes can be persisted as append-only files of raw little-endian int64 ids (see append_file() and load()).
+
+    Args:
+        ids (array-like): Initial ids of the index
+    """
+
+    def __init__(self, ids=None):
+        self.ids = np.empty(0, dtype=np.int64)
+        if ids is not None:
+            self.add(ids)
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    def contains(self, ids) -> np.ndarray:
+        """ Method determines which of the given ids are contained within the index
+
+        Args:
+            ids (array-like): Integer observation ids
+
+        Returns:
+            A boolean array, True where the corresponding id is contained within the index
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.ids.shape[0] == 0:
+            return np.zeros(ids.shape[0], dtype=bool)
+
+        positions = np.minimum(np.searchsorted(self.ids, ids), self.ids.shape[0] - 1)  # Clip ids beyond the last id
+        return self.ids[positions] == ids
+
+    def add(self, ids):
+        """ Method adds ids to the index, ignoring ids already contained within it
+
+        Args:
+            ids (array-like): Integer observation ids
+        """
+        ids = np.unique(np.asarray(ids, dtype=np.int64))
+        ids = ids[~self.contains(ids)]
+        self.ids = np.insert(self.ids, np.searchsorted(self.ids, ids), ids)
+
+    @classmethod
+    def load(cls, file):
+        """ Method loads an index from an id file, which may contain duplicate or unsorted ids
+
+        Args:
+            file (str): Path to the id file. If the file does not exist, an empty index is returned.
+
+        Returns:
+            An IdIndex containing all ids of the file
+        """
+        if not os.path.isfile(file):
+            return cls()
+        return cls(np.fromfile(file, dtype='<i8'))
+
+    @staticmethod
+    def append_file(file, ids):
+        """ Method appends ids to an id file, creating the file if it does not exist
+
+        Args:
+            file (str): Path to the id file
+            ids (array-like): Integer observation ids
+        """
+        with open(file, 'ab') as f:
+            np.asarray(ids, dtype='<i8').tofile(f)
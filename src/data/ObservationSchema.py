@@ -0,0 +1,172 @@
+import importlib.util
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, is_categorical_dtype, union_categoricals
+
+licenses = ['CC0', 'CC-BY', 'CC-BY-NC', 'CC-BY-SA', 'CC-BY-ND', 'CC-BY-NC-SA', 'CC-BY-NC-ND']
+"""list: Licenses of iNaturalist observations (a missing license is all rights reserved)"""
+geoprivacy_levels = ['open', 'obscured', 'private']
+"""list: Geoprivacy levels of iNaturalist observations and taxa"""
+quality_grades = ['research', 'needs_id', 'casual']
+"""list: Quality grades of iNaturalist observations"""
+category_columns = {'license': licenses,
+                    'geoprivacy': geoprivacy_levels,
+                    'taxon_geoprivacy': geoprivacy_levels,
+                    'quality_grade': quality_grades,
+                    'time_zone': None,
+                    'scientific_name': None,
+                    'common_name': None}
+"""dict: Low cardinality columns stored as categoricals, with their valid categories (any value is valid if None)"""
+integer_columns = ['id', 'taxon_id', 'positional_accuracy', 'public_positional_accuracy']
+"""list: Integer columns stored as nullable int32"""
+coordinate_ranges = {'latitude': (-90, 90), 'longitude': (-180, 180)}
+"""dict: Coordinate columns with their valid ranges (inclusive)"""
+url_columns = ['url', 'image_url']
+"""list: URL columns stored as contiguous (Arrow) strings instead of Python string objects"""
+
+
+class ObservationSchema:
+    """ Compact dtype schema of raw observations, applied at ingestion.
+
+    Low cardinality columns are read as categoricals, integer columns as nullable int32, coordinates as float64 and
+    URL columns as Arrow-backed strings (the characters of all rows within one contiguous buffer, instead of a Python
+    object per row). Arrow strings require the pyarrow package; without it, URL columns remain object strings.
+
+    Values that do not conform to the schema (non-numeric or non-integral integers, integers beyond the int32 range,
+    coordinates out of range, or categories not within the valid categories) are replaced by missing values and
+    reported through invalid_counts and invalid_examples, rather than silently widening the column to object.
+    Observations with an invalid id are dropped.
+
+    Args:
+        categories (dict): Categorical columns with their valid categories (any value is valid if None)
+        integers (list): Nullable int32 columns
+        coordinates (dict): Coordinate columns with their valid ranges
+        urls (list): URL columns
+    """
+
+    example_limit = 5
+    """int: Maximum number of distinct invalid example values recorded per column"""
+
+    def __init__(self, categories=None, integers=None, coordinates=None, urls=None):
+        self.categories = category_columns if categories is None else categories
+        self.integers = integer_columns if integers is None else integers
+        self.coordinates = coordinate_ranges if coordinates is None else coordinates
+        self.urls = url_columns if urls is None else urls
+        self.url_dtype = 'string[pyarrow]' if importlib.util.find_spec('pyarrow') is not None else object
+        self.invalid_counts = Counter()
+        self.invalid_examples = dict()
+
+    def read_options(self) -> dict:
+        """ Method returns the pandas.read_csv options parsing the categorical columns directly as categoricals"""
+        return {'dtype': {column: 'category' for column in self.categories}}
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """ Method casts raw observations to the schema, reporting invalid values
+
+        Args:
+            df (DataFrame): Raw observations, as read (with or without the read options)
+
+        Returns:
+            A DataFrame of the observations in the schema dtypes, without observations of invalid ids
+        """
+        df = df.copy()
+        for column, valid_categories in self.categories.items():
+            if column in df.columns:
+                df[column] = self.categorical(df[column], valid_categories)
+        for column in self.integers:
+            if column in df.columns:
+                df[column] = self.integer(df[column])
+        for column, (minimum, maximum) in self.coordinates.items():
+            if column in df.columns:
+                values = self.numeric(df[column])
+                df[column] = values.where(~self.report(df[column], (values < minimum) | (values > maximum)))
+        for column in self.urls:
+            if column in df.columns:
+                df[column] = df[column].astype(self.url_dtype)
+
+        if 'id' in df.columns and df['id'].isna().any():  # Observations without a valid id are dropped
+            df = df[df['id'].notna()]
+        return df
+
+    def report(self, values: pd.Series, invalid) -> np.ndarray:
+        """ Method records the invalid values of a column
+
+        Args:
+            values (Series): The original values of the column
+            invalid (array-like): Boolean mask of the invalid values
+
+        Returns:
+            The invalid mask as a boolean array
+        """
+        invalid = np.asarray(invalid, dtype=bool)
+        if invalid.any():
+            self.invalid_counts[values.name] = self.invalid_counts[values.name] + int(invalid.sum())
+            examples = self.invalid_examples.setdefault(values.name, [])
+            for value in pd.unique(values.to_numpy(object)[invalid])[:self.example_limit].tolist():
+                if len(examples) < self.example_limit and value not in examples:
+                    examples.append(value)
+        return invalid
+
+    def numeric(self, values: pd.Series) -> pd.Series:
+        """ Method parses the values of a column as numbers, reporting (and clearing) the unparsable values"""
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            return values.astype('float64')
+        numbers = pd.to_numeric(values.astype(object).where(values.notna()), errors='coerce')
+        invalid = self.report(values, values.notna() & numbers.isna())
+        return numbers.where(~invalid).astype('float64')
+
+    def integer(self, values: pd.Series) -> pd.Series:
+        """ Method casts the values of a column to nullable int32, reporting non-integral and out of range values"""
+        numbers = self.numeric(values)
+        int32 = np.iinfo(np.int32)
+        invalid = self.report(values, numbers.notna() & ((numbers % 1 != 0) | (numbers < int32.min) |
+                                                         (numbers > int32.max)))
+        return numbers.where(~invalid).astype('Int32')
+
+    def categorical(self, values: pd.Series, valid_categories) -> pd.Series:
+        """ Method casts the values of a column to a categorical, reporting values outside the valid categories
+
+        Empty strings are missing values (as read from CSV).
+        """
+        if not is_categorical_dtype(values.dtype):
+            values = values.astype(object).where(values.notna() & (values != '')).astype('category')
+        elif '' in values.cat.categories:
+            values = values.cat.remove_categories([''])
+        if valid_categories is None:
+            return values
+
+        categorical = values.cat.set_categories(valid_categories)
+        self.report(values, values.notna() & categorical.isna())
+        return categorical
+
+    def invalid_report(self) -> pd.DataFrame:
+        """ Method returns the invalid values recorded per column (count and examples), indexed by column"""
+        return pd.DataFrame({'invalid': pd.Series(self.invalid_counts, dtype='int64'),
+                             'examples': pd.Series({column: '; '.join(map(str, examples))
+                                                    for column, examples in self.invalid_examples.items()},
+                                                   dtype=object)}).rename_axis('column')
+
+
+def concat_observations(frames: list) -> pd.DataFrame:
+    """Method concatenates observations cast to the schema, retaining categorical columns.
+
+    pandas concatenates categoricals of differing categories as object columns. The categories of each categorical
+    column are therefore unified across the frames before concatenation.
+
+    Args:
+        frames (list): DataFrames of observations in the schema dtypes, with identical columns
+
+    Returns:
+        The concatenated DataFrame
+    """
+    if not frames:
+        return pd.DataFrame()
+
+    unified = dict()
+    for column in frames[0].columns:
+        if all(is_categorical_dtype(frame[column].dtype) for frame in frames):
+            categories = union_categoricals([frame[column] for frame in frames], ignore_order=True).categories
+            unified[column] = CategoricalDtype(categories)
+    return pd.concat([frame.astype(unified) for frame in frames])
@@ -0,0 +1,127 @@
+import glob
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+
+class RawManifest:
+    """ Manifest of the raw observation files ingested by the cleaning pipeline, enabling incremental ingestion.
+
+    Each ingested file is recorded by its path (relative to the raw data directory), size, modification time and
+    SHA-256 content hash. Discovery compares the files within the raw data directory against the manifest:
+    A file is new if it is not recorded, or if its content hash differs from the recorded hash (the file was modified).
+    Files of an unchanged size and modification time are not hashed again, such that discovery only reads new or
+    touched files. Files that were touched without modification (identical hash) only have their entries updated.
+
+    New files are only recorded once they have been processed (see record), such that files of an interrupted run are
+    discovered again. Observations of a modified file that were already processed are removed by continuation.
+    The manifest is persisted as JSON to manifest_file.
+
+    Args:
+        manifest_file (str): Path to the persisted manifest
+        raw_path (str): Path of the raw data directory
+        pattern (str): Glob pattern (relative to raw_path) of the raw observation files
+    """
+
+    hash_block_size = 1 << 20
+    """int: Number of bytes read at a time while hashing file contents"""
+
+    def __init__(self, manifest_file, raw_path, pattern='**/*.csv'):
+        self.manifest_file = manifest_file
+        self.raw_path = raw_path
+        self.pattern = pattern
+        self.entries = dict()
+        self.pending = dict()
+        self.unsaved = False
+        self.load()
+
+    def discover(self) -> list:
+        """ Method lists the raw observation files within the raw data directory
+
+        Returns:
+            The paths of the files relative to raw_path, in natural order (observations_2 before observations_10)
+        """
+        files = glob.glob(os.path.join(self.raw_path, self.pattern), recursive=True)
+        paths = [os.path.relpath(file, self.raw_path).replace(os.sep, '/') for file in files if os.path.isfile(file)]
+        return sorted(paths, key=natural_key)
+
+    def new_files(self) -> list:
+        """ Method determines the raw observation files that are new or modified since they were recorded
+
+        The fingerprints of the new files are kept pending, until they are recorded after processing.
+
+        Returns:
+            The paths of the new files relative to raw_path, in natural order
+        """
+        new = []
+        for path in self.discover():
+            stat = os.stat(os.path.join(self.raw_path, path))
+            entry = self.entries.get(path)
+            if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+                continue  # Unchanged size and modification time, not hashed
+
+            fingerprint = self.fingerprint(path, stat)
+            if entry is not None and entry['sha256'] == fingerprint['sha256']:  # Touched, but not modified
+                self.entries[path] = dict(entry, mtime=fingerprint['mtime'])
+                self.unsaved = True
+                continue
+            self.pending[path] = fingerprint
+            new.append(path)
+        return new
+
+    def fingerprint(self, path, stat=None) -> dict:
+        """ Method fingerprints a raw observation file by its size, modification time (ns) and content hash"""
+        file = os.path.join(self.raw_path, path)
+        stat = os.stat(file) if stat is None else stat
+        return {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': file_hash(file, self.hash_block_size)}
+
+    def record(self, paths):
+        """ Method records processed files within the manifest, with their fingerprints taken at discovery
+
+        Args:
+            paths (list): Paths of processed files, relative to raw_path
+        """
+        ingested_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        for path in paths:
+            fingerprint = self.pending.pop(path) if path in self.pending else self.fingerprint(path)
+            self.entries[path] = dict(fingerprint, ingested_at=ingested_at)
+            self.unsaved = True
+
+    def load(self):
+        """ Method loads the persisted manifest, if it exists"""
+        if self.manifest_file is None or not os.path.isfile(self.manifest_file):
+            return
+
+        with open(self.manifest_file) as f:
+            self.entries = json.loads(f.read())['files']
+
+    def save(self):
+        """ Method persists the manifest if it changed, replacing the previous manifest atomically"""
+        if self.manifest_file is None or not self.unsaved:
+            return
+
+        temporary_file = self.manifest_file + '.tmp'
+        with open(temporary_file, 'w') as f:
+            f.write(json.dumps({'files': self.entries}, indent=2))
+        os.replace(temporary_file, self.manifest_file)  # An interrupted save never corrupts the manifest
+        self.unsaved = False
+
+
+def file_hash(file, block_size=1 << 20) -> str:
+    """Method computes the SHA-256 hash of the contents of a file, reading block_size bytes at a time
+
+    Returns:
+        The hexadecimal digest
+    """
+    digest = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def natural_key(path: str) -> list:
+    """Method generates a sort key ordering the numbers within paths numerically"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', path)]
@@ -0,0 +1,207 @@
+import os
+import re
+import shutil
+
+import pandas as pd
+
+from src.data.TimeModel import from_text, to_text
+
+
+class CsvStorage:
+    """ Storage backend writing each dataset to a single CSV file within a directory.
+
+    Datasets are identified by name (without extension), and are indexed by observation id.
+    CSV is the text export boundary of the typed time columns (see TimeModel): dates and local times are formatted as
+    text when written, and parsed back into typed columns when read.
+
+    Args:
+        path (str): Path of the directory containing the datasets
+    """
+
+    extension = '.csv'
+    """string: File extension of the datasets"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def location(self, name) -> str:
+        """ Method returns the path of the file storing the dataset"""
+        return self.path + name + self.extension
+
+    def exists(self, name) -> bool:
+        """ Method determines if the dataset exists"""
+        return os.path.isfile(self.location(name))
+
+    def append(self, name, df: pd.DataFrame) -> pd.Index:
+        """ Method appends df (indexed by id) to the dataset, creating the dataset (with header) if it does not exist
+
+        Returns:
+            The ids of the rows written to the dataset by this call (all rows of df, as CSV appends are not buffered)
+        """
+        if self.exists(name):
+            to_text(df).to_csv(self.location(name), mode='a', index=True, header=False)
+        else:
+            to_text(df).to_csv(self.location(name), mode='w', index=True, header=True)
+        return df.index
+
+    def flush(self, name) -> pd.Index:
+        """ Method writes the rows of the dataset buffered by append(). CSV appends are not buffered.
+
+        Returns:
+            The ids of the rows written by this call
+        """
+        return pd.Index([], name='id')
+
+    def write(self, name, df: pd.DataFrame):
+        """ Method writes df (indexed by id) as the dataset, overwriting any existing dataset"""
+        to_text(df).to_csv(self.location(name), mode='w', index=True, header=True)
+
+    def read(self, name, columns=None) -> pd.DataFrame:
+        """ Method reads the dataset
+
+        Args:
+            name (str): The dataset name
+            columns (list): The columns to read (in addition to the id index). All columns are read if None.
+
+        Returns:
+            A DataFrame of the dataset, indexed by id
+        """
+        usecols = None if columns is None else ['id'] + list(columns)
+        return from_text(pd.read_csv(self.location(name), usecols=usecols, index_col='id'))
+
+
+class ParquetStorage(CsvStorage):
+    """ Storage backend writing each dataset as a directory of Parquet partitions, with typed columns.
+
+    Appended rows are buffered per dataset, and written as a single partition (part-##########.parquet) once
+    partition_rows rows are buffered, or when the dataset is flushed. Partitions therefore contain many batches,
+    such that reads open few files, and existing partitions are never rewritten. Only written (not buffered) rows are
+    read, and append() and flush() return the ids of the rows they wrote, such that callers only index durable rows.
+    Before writing, known columns are cast to compact types (see column_types) and remaining text columns to strings,
+    keeping partition schemas consistent, and allowing readers to project only the columns they require without
+    parsing text. Other categorical columns (whose categories differ between streamed chunks, see ObservationSchema)
+    are stored as strings as well, whether a partition contains a single batch or several concatenated batches.
+    Requires the pyarrow package.
+
+    Args:
+        path (str): Path of the directory containing the datasets
+        partition_rows (int): Number of buffered rows written as a partition
+    """
+
+    extension = ''
+    """string: Datasets are directories, without extension"""
+    column_types = {'latitude': 'float64',
+                    'longitude': 'float64',
+                    'elevation': 'float32',
+                    'positional_accuracy': 'Int32',
+                    'public_positional_accuracy': 'Int32',
+                    'taxon_id': 'Int32',
+                    'license': 'category',
+                    'geoprivacy': 'category',
+                    'taxon_geoprivacy': 'category',
+                    'image_quality': 'category'}
+    """dict: Types of known columns, applied before writing (time columns are typed by TimeModel, and integer columns
+    match the ingestion schema, see ObservationSchema)"""
+    part_format = 'part-%010d.parquet'
+    """string: File name format of the partitions, numbered in order of writing"""
+    row_group_rows = 100000
+    """int: Number of rows per Parquet row group within a partition"""
+
+    def __init__(self, path, partition_rows=250000):
+        super().__init__(path)
+        self.partition_rows = partition_rows
+        self.part_numbers = dict()
+        self.buffers = dict()
+
+    def exists(self, name) -> bool:
+        """ Method determines if the dataset exists"""
+        return os.path.isdir(self.location(name))
+
+    def append(self, name, df: pd.DataFrame) -> pd.Index:
+        """ Method buffers df (indexed by id) for the dataset, writing a partition once partition_rows rows are buffered
+
+        Returns:
+            The ids of the rows written to the dataset by this call (empty if the rows remain buffered)
+        """
+        buffer = self.buffers.setdefault(name, [])
+        buffer.append(df)
+        if sum(len(frame.index) for frame in buffer) >= self.partition_rows:
+            return self.flush(name)
+        return pd.Index([], name='id')
+
+    def flush(self, name) -> pd.Index:
+        """ Method writes the buffered rows of the dataset as a new partition
+
+        Returns:
+            The ids of the rows written by this call
+        """
+        buffer = [frame for frame in self.buffers.pop(name, []) if not frame.empty]
+        if not buffer:  # No partitions of empty batches
+            return pd.Index([], name='id')
+
+        location = self.location(name)
+        if name not in self.part_numbers:  # Continue numbering after any existing partitions
+            self.part_numbers[name] = next_part_number(location)
+        os.makedirs(location, exist_ok=True)
+
+        df = self.typed(pd.concat(buffer) if len(buffer) > 1 else buffer[0])  # Typed once, after concatenation
+        part_file = os.path.join(location, self.part_format % self.part_numbers[name])
+        temporary_file = os.path.join(location, '.%s.tmp' % os.path.basename(part_file))  # Hidden from readers
+        df.to_parquet(temporary_file, index=True, row_group_size=self.row_group_rows)
+        os.replace(temporary_file, part_file)  # Readers never observe a partially written partition
+        self.part_numbers[name] = self.part_numbers[name] + 1
+        return df.index
+
+    def write(self, name, df: pd.DataFrame):
+        """ Method writes df (indexed by id) as the dataset, overwriting any existing dataset"""
+        if self.exists(name):
+            shutil.rmtree(self.location(name))
+        self.part_numbers[name] = 0
+        self.buffers.pop(name, None)
+        self.append(name, df)
+        self.flush(name)
+
+    def read(self, name, columns=None) -> pd.DataFrame:
+        """ Method reads the (written) dataset, projecting only the requested columns
+
+        Args:
+            name (str): The dataset name
+            columns (list): The columns to read (in addition to the id index). All columns are read if None.
+
+        Returns:
+            A DataFrame of the dataset, indexed by id
+        """
+        return pd.read_parquet(self.location(name), columns=None if columns is None else list(columns))
+
+    def typed(self, df: pd.DataFrame) -> pd.DataFrame:
+        """ Method casts the known columns of df to their storage types
+
+        Text time columns are parsed into typed time columns, while typed time columns are stored as is.
+
+        Returns:
+            A typed copy of df
+        """
+        df = from_text(df).copy()
+        for column in df.columns:
+            if self.column_types.get(column) == 'Int32':
+                df[column] = pd.to_numeric(df[column], errors='coerce').astype('Int32')
+            elif self.column_types.get(column) == 'category':  # String categories, even if all values are missing
+                df[column] = df[column].astype('string').astype('category')
+            elif column in self.column_types:
+                df[column] = df[column].astype(self.column_types[column])
+            elif df[column].dtype == object or isinstance(df[column].dtype, pd.CategoricalDtype):
+                df[column] = df[column].astype('string')  # Text columns, consistently typed across partitions
+        return df
+
+
+def next_part_number(location) -> int:
+    """Method determines the number of the next partition of a dataset, following the highest existing number
+
+    Returns:
+        The partition number (0 if the dataset does not exist)
+    """
+    if not os.path.isdir(location):
+        return 0
+    numbers = [int(match.group(1)) for match in map(re.compile(r'^part-(\d+)\.parquet$').match, os.listdir(location))
+               if match is not None]
+    return max(numbers) + 1 if numbers else 0
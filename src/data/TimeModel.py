@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+date_format = '%Y-%m-%d'
+"""string: Format of observation dates (observed_on) in raw data and text exports"""
+utc_time_format = '%Y-%m-%d %H:%M:%S'
+"""string: Format of raw UTC observation times, preceding the ' UTC' suffix"""
+date_columns = ['observed_on']
+"""list: Columns of observation dates, typed as datetime64 (midnight)"""
+local_time_column = 'local_time_observed_at'
+"""string: Column of local observation times, typed as the naive local (wall clock) datetime64"""
+offset_column = 'utc_offset'
+"""string: Column of the offset of each local observation time from UTC in minutes (nullable int16)"""
+
+
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """Method parses yyyy-mm-dd dates into datetime64 values. Dates deviating from the format are NaT.
+
+    Args:
+        dates (Series): Raw date strings
+
+    Returns:
+        A datetime64 Series aligned to dates
+    """
+    if pd.api.types.is_datetime64_dtype(dates.dtype):
+        return dates
+    return pd.to_datetime(dates, format=date_format, errors='coerce', exact=True)
+
+
+def parse_utc_times(times: pd.Series) -> pd.Series:
+    """Method parses raw UTC time strings (format yyyy-mm-dd HH:MM:SS UTC) into tz-aware UTC datetimes.
+
+    An explicit format is orders of magnitude faster than format inference. If any time deviates from the raw
+    data format, the entire series is parsed through format inference instead.
+
+    Args:
+        times (Series): Raw time_observed_at strings
+
+    Returns:
+        A Series of tz-aware (UTC) datetimes
+    """
+    if times.str.endswith(' UTC').fillna(False).all():
+        try:
+            return pd.to_datetime(times.str[:-4], format=utc_time_format, exact=True).dt.tz_localize('UTC')
+        except ValueError:
+            pass
+    return pd.to_datetime(times, utc=True)
+
+
+def localize(utc_times: pd.Series, time_zones: pd.Series) -> tuple:
+    """Method converts UTC times to the local times of their time zones, converting each time zone group with a
+    single tz-aware operation.
+
+    Args:
+        utc_times (Series): tz-aware UTC datetimes
+        time_zones (Series): IANA time zone of each time. Times without a time zone remain NaT.
+
+    Returns:
+        The naive local (wall clock) datetime64 Series, and the nullable int16 Series of UTC offsets in minutes, both
+        aligned to utc_times
+    """
+    local_times = np.full(len(utc_times.index), np.datetime64('NaT'), dtype='datetime64[ns]')
+    for time_zone, positions in time_zones.groupby(time_zones, sort=False).indices.items():  # Positions per time zone
+        local_times[positions] = utc_times.iloc[positions].dt.tz_convert(time_zone).dt.tz_localize(None).to_numpy()
+
+    local_times = pd.Series(local_times, index=utc_times.index)
+    offsets = (local_times - utc_times.dt.tz_localize(None)) // pd.Timedelta(minutes=1)
+    return local_times, offsets.astype('Int16')
+
+
+def format_dates(dates: pd.Series) -> pd.Series:
+    """Method formats datetime64 dates as yyyy-mm-dd strings (NaN where NaT)"""
+    text = dates.to_numpy(dtype='datetime64[D]').astype(str).astype(object)
+    return pd.Series(text, index=dates.index).where(dates.notna())
+
+
+def format_local_times(local_times: pd.Series, offsets: pd.Series) -> pd.Series:
+    """Method formats local times with their UTC offsets as 'yyyy-mm-dd HH:MM:SS+HH:MM' strings (NaN where NaT).
+
+    The strings are identical to those of tz-aware pandas Timestamps of second precision.
+
+    Args:
+        local_times (Series): Naive local (wall clock) datetime64 values
+        offsets (Series): UTC offsets in minutes
+
+    Returns:
+        A Series of local time strings aligned to local_times
+    """
+    wall_clock = pd.Series(local_times.to_numpy(dtype='datetime64[s]').astype(str), index=local_times.index)
+    codes, unique_offsets = pd.factorize(offsets)  # Few distinct offsets are formatted once each
+    offset_text = np.array(['%s%02d:%02d' % ('-' if offset < 0 else '+', abs(offset) // 60, abs(offset) % 60)
+                            for offset in unique_offsets.astype(int)] + [''], dtype=object)
+    text = wall_clock.str.replace('T', ' ', regex=False) + offset_text[codes]
+    return text.where(local_times.notna() & offsets.notna())
+
+
+def parse_local_times(text: pd.Series) -> tuple:
+    """Method parses 'yyyy-mm-dd HH:MM:SS+HH:MM' local time strings into local times and UTC offsets
+
+    Returns:
+        The naive local (wall clock) datetime64 Series, and the nullable int16 Series of UTC offsets in minutes
+    """
+    local_times = pd.to_datetime(text.str[:19], format=utc_time_format, errors='coerce')
+    codes, unique_offsets = pd.factorize(text.str[19:])
+    minutes = [(-1 if offset[0] == '-' else 1) * (int(offset[1:3]) * 60 + int(offset[4:6])) if len(offset) == 6
+               else None for offset in unique_offsets]
+    offsets = pd.Series(pd.array(minutes + [None], dtype='Int16')[codes], index=text.index)
+    return local_times, offsets.where(local_times.notna())
+
+
+def to_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Method formats the typed time columns of df as text, at the text (CSV) export boundary.
+
+    Dates are formatted as yyyy-mm-dd, and local times are combined with their UTC offsets into a single
+    'yyyy-mm-dd HH:MM:SS+HH:MM' column (the offset column is not exported).
+
+    Returns:
+        A copy of df with text time columns, or df itself if it contains no typed time columns
+    """
+    typed_dates = [column for column in date_columns if column in df.columns and
+                   pd.api.types.is_datetime64_dtype(df[column].dtype)]
+    typed_local_times = local_time_column in df.columns and offset_column in df.columns
+    if not typed_dates and not typed_local_times:
+        return df
+
+    df = df.copy()
+    for column in typed_dates:
+        df[column] = format_dates(df[column])
+    if typed_local_times:
+        df[local_time_column] = format_local_times(df[local_time_column], df[offset_column])
+        df = df.drop(columns=[offset_column])
+    return df
+
+
+def from_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Method parses the text time columns of df (as exported by to_text()) into their typed columns
+
+    Returns:
+        A copy of df with typed time columns (the offset column following the local time column), or df itself if
+        it contains no text time columns
+    """
+    text_dates = [column for column in date_columns if column in df.columns and
+                  not pd.api.types.is_datetime64_dtype(df[column].dtype)]
+    text_local_times = local_time_column in df.columns and offset_column not in df.columns
+    if not text_dates and not text_local_times:
+        return df
+
+    df = df.copy()
+    for column in text_dates:
+        df[column] = parse_dates(df[column].astype(object))
+    if text_local_times:
+        local_times, offsets = parse_local_times(df[local_time_column].astype(object).where(
+            df[local_time_column].notna(), '').astype(str))
+        df[local_time_column] = local_times
+        df.insert(df.columns.get_loc(local_time_column) + 1, offset_column, offsets)
+    return df
@@ -0,0 +1,236 @@
+import json
+import os
+
+from h3.api import basic_int as h3  # Integer H3 indexes, as keyed by the TimezoneFinder shortcuts
+import numpy as np
+from timezonefinder import TimezoneFinder
+from timezonefinder.configs import SHORTCUT_H3_RES
+
+
+class TimezoneResolver:
+    """ Resolver determining observation time zones in bulk, caching results on a latitude/longitude grid.
+
+    Coordinates are bucketed into square grid cells of grid_size degrees. Each cell is classified once:
+    If every TimezoneFinder shortcut (H3 hexagon) the cell touches contains a single and identical zone, the cell lies
+    entirely within that zone (TimezoneFinder.timezone_at resolves any coordinate of such a shortcut to its zone), and
+    all coordinates within it are resolved without a polygon lookup. Otherwise, the cell is marked as mixed.
+    The shortcuts touched are found among the rings of shortcut_ring hexagons around the shortcuts of the sample points
+    of the cell (corners, edge midpoints and center), keeping those whose bounding boxes overlap the cell, such that
+    zones crossing the cell between its sample points (for example small islands) are never missed.
+
+    Coordinates within mixed cells are rounded to point_decimals decimal places, deduplicated, and resolved through
+    TimezoneFinder.timezone_at once per rounded coordinate.
+    Both the cell classifications and the resolved points are persisted to cache_file (JSON) to be reused between runs.
+
+    Args:
+        grid_size (float): The width and height of each grid cell in degrees
+        point_decimals (int): Decimal places to round coordinates within mixed cells to (4 decimals is approx. 11m)
+        cache_file (str): Path to the persisted cache. If None, the cache is kept in memory only.
+        finder (TimezoneFinder): The TimezoneFinder instance to utilize. A new in-memory instance is created if None.
+    """
+
+    mixed_cell = ''
+    """string: Cell cache value marking a cell containing multiple (or no unique) time zones"""
+    sample_offsets = [0.0, 0.5, 1.0]
+    """list: Fractions of the grid size at which cells are sampled in each direction during classification"""
+    shortcut_margin = 0.05
+    """float: Degrees by which cells are widened when testing if shortcuts touch them (see shortcut_touches())"""
+    cache_version = 2
+    """int: Version of the cell classification. Cells cached by other versions are classified again."""
+
+    def __init__(self, grid_size=0.1, point_decimals=4, cache_file=None, finder=None):
+        self.grid_size = grid_size
+        self.point_decimals = point_decimals
+        self.cache_file = cache_file
+        self.finder = TimezoneFinder(in_memory=True) if finder is None else finder
+        self.cell_columns = int(np.ceil(360 / grid_size)) + 1
+        self.point_scale = 10 ** point_decimals
+        self.point_columns = 360 * self.point_scale + 1
+        cell_diagonal = np.sqrt(2) * grid_size * 111.32  # km, an upper bound (meridians converge)
+        min_edge = h3.edge_length(SHORTCUT_H3_RES, unit='km') / 2  # Conservative bound of the smallest hexagon edge
+        self.shortcut_ring = int(np.ceil(cell_diagonal / min_edge))
+        self.shortcut_zones = dict()
+        self.shortcut_bounds = dict()
+        self.cells = dict()
+        self.points = dict()
+        self.new_entries = {'cells': dict(), 'points': dict()}
+        self.unsaved = False
+        self.load_cache()
+
+    def resolve(self, latitudes, longitudes) -> np.ndarray:
+        """ Method resolves the time zones of the given coordinates.
+
+        Args:
+            latitudes (array-like): Float latitudes of the observations
+            longitudes (array-like): Float longitudes corresponding to the latitudes
+
+        Returns:
+            An object array of time zone names, aligned to the given coordinates
+        """
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        time_zones = np.empty(latitudes.shape[0], dtype=object)
+        if latitudes.shape[0] == 0:
+            return time_zones
+
+        keys = self.cell_keys(latitudes, longitudes)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)  # Deduplicate cells
+        cell_zones = np.array([self.classify_cell(key) for key in unique_keys.tolist()], dtype=object)
+        time_zones[:] = cell_zones[inverse]
+
+        mixed = time_zones == self.mixed_cell
+        if mixed.any():  # Resolve the unique (rounded) coordinates of mixed cells individually
+            point_keys = self.point_keys(latitudes[mixed], longitudes[mixed])
+            unique_points, point_inverse = np.unique(point_keys, return_inverse=True)
+            point_zones = np.array([self.resolve_point(key) for key in unique_points.tolist()], dtype=object)
+            time_zones[mixed] = point_zones[point_inverse]
+
+        return time_zones
+
+    def cell_keys(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """ Method generates packed integer grid cell keys for coordinates
+
+        Returns:
+            An int64 array of cell keys (row * cell_columns + column)
+        """
+        rows = np.floor((latitudes + 90) / self.grid_size).astype(np.int64)
+        columns = np.floor((longitudes + 180) / self.grid_size).astype(np.int64)
+        return rows * self.cell_columns + columns
+
+    def point_keys(self, latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+        """ Method generates packed integer keys for coordinates rounded to point_decimals decimal places
+
+        Returns:
+            An int64 array of point keys
+        """
+        rows = np.round((latitudes + 90) * self.point_scale).astype(np.int64)
+        columns = np.round((longitudes + 180) * self.point_scale).astype(np.int64)
+        return rows * self.point_columns + columns
+
+    def classify_cell(self, key: int) -> str:
+        """ Method returns the cached classification of a grid cell, classifying the cell if it is not yet cached.
+
+        Args:
+            key (int): The packed grid cell key
+
+        Returns:
+            The time zone name if the cell lies within a single time zone, else the mixed_cell marker
+        """
+        if key in self.cells:
+            return self.cells[key]
+
+        row, column = divmod(key, self.cell_columns)
+        south = row * self.grid_size - 90
+        west = column * self.grid_size - 180
+        sample_shortcuts = set()
+        for lat_offset in self.sample_offsets:
+            for lng_offset in self.sample_offsets:
+                lat = min(south + lat_offset * self.grid_size, 90.0)
+                lng = min(west + lng_offset * self.grid_size, 180.0)
+                sample_shortcuts.add(h3.geo_to_h3(lat, lng, SHORTCUT_H3_RES))
+        shortcuts = set().union(*[h3.k_ring(shortcut, self.shortcut_ring) for shortcut in sample_shortcuts])
+        zones = {self.shortcut_zone(shortcut) for shortcut in shortcuts
+                 if shortcut in sample_shortcuts or self.shortcut_touches(shortcut, south, west)}
+
+        zone = zones.pop() if len(zones) == 1 else None
+        self.cells[key] = self.mixed_cell if zone is None else zone
+        self.new_entries['cells'][key] = self.cells[key]
+        self.unsaved = True
+        return self.cells[key]
+
+    def shortcut_touches(self, shortcut: int, south: float, west: float) -> bool:
+        """ Method determines if a shortcut (H3 hexagon) may touch a grid cell, comparing their bounding boxes.
+
+        The cell bounding box is widened by shortcut_margin degrees, covering the curvature of the (geodesic) hexagon
+        edges. Hexagons crossing the antimeridian are considered to touch the cell.
+
+        Args:
+            shortcut (int): The H3 index of the shortcut
+            south (float): The southern latitude of the cell
+            west (float): The western longitude of the cell
+        """
+        if shortcut not in self.shortcut_bounds:
+            boundary = np.array(h3.h3_to_geo_boundary(shortcut))
+            self.shortcut_bounds[shortcut] = None if np.ptp(boundary[:, 1]) > 180 else \
+                (boundary[:, 0].min(), boundary[:, 0].max(), boundary[:, 1].min(), boundary[:, 1].max())
+        bounds = self.shortcut_bounds[shortcut]
+        if bounds is None:  # Crossing the antimeridian
+            return True
+
+        south_bound, north_bound, west_bound, east_bound = bounds
+        return (north_bound >= south - self.shortcut_margin and
+                south_bound <= south + self.grid_size + self.shortcut_margin and
+                east_bound >= west - self.shortcut_margin and
+                west_bound <= west + self.grid_size + self.shortcut_margin)
+
+    def shortcut_zone(self, shortcut: int):
+        """ Method returns the zone of a TimezoneFinder shortcut (H3 hexagon), if the shortcut contains a single zone
+
+        Returns:
+            The time zone name, or None if the shortcut contains no or multiple zones
+        """
+        if shortcut not in self.shortcut_zones:
+            polygons = self.finder.shortcut_mapping.get(shortcut, [])
+            zone_ids = np.unique(self.finder.zone_ids_of(polygons)) if len(polygons) > 0 else []
+            self.shortcut_zones[shortcut] = self.finder.zone_name_from_id(zone_ids[0]) if len(zone_ids) == 1 else None
+        return self.shortcut_zones[shortcut]
+
+    def resolve_point(self, key: int) -> str:
+        """ Method returns the cached time zone of a rounded coordinate, resolving it if it is not yet cached.
+
+        Args:
+            key (int): The packed point key
+
+        Returns:
+            The time zone name of the rounded coordinate
+        """
+        if key in self.points:
+            return self.points[key]
+
+        row, column = divmod(key, self.point_columns)
+        zone = self.finder.timezone_at(lat=row / self.point_scale - 90, lng=column / self.point_scale - 180)
+        self.points[key] = zone
+        self.new_entries['points'][key] = zone
+        self.unsaved = True
+        return zone
+
+    def pop_new_entries(self) -> dict:
+        """ Method returns the cells and points resolved since the previous call, enabling their merge into another
+        resolver (see update_entries())"""
+        new_entries = self.new_entries
+        self.new_entries = {'cells': dict(), 'points': dict()}
+        return new_entries
+
+    def update_entries(self, entries: dict):
+        """ Method merges cells and points resolved by another resolver (see pop_new_entries()) into the cache"""
+        for cache, new_entries in [(self.cells, entries['cells']), (self.points, entries['points'])]:
+            for key, zone in new_entries.items():
+                if key not in cache:
+                    cache[key] = zone
+                    self.unsaved = True
+
+    def load_cache(self):
+        """ Method loads the persisted cache, if it exists and was generated with the same grid size and point
+        decimals. Cells are only loaded if they were classified by the current cache_version."""
+        if self.cache_file is None or not os.path.isfile(self.cache_file):
+            return
+
+        with open(self.cache_file) as f:
+            data = json.loads(f.read())
+        if data['grid_size'] == self.grid_size and data['point_decimals'] == self.point_decimals:
+            if data.get('version') == self.cache_version:
+                self.cells = {int(key): zone for key, zone in data['cells'].items()}
+            self.points = {int(key): zone for key, zone in data['points'].items()}
+
+    def save_cache(self):
+        """ Method persists the cache, if any new cells or points were resolved since it was loaded"""
+        if self.cache_file is None or not self.unsaved:
+            return
+
+        with open(self.cache_file, 'w') as f:
+            f.write(json.dumps({'version': self.cache_version,
+                                'grid_size': self.grid_size,
+                                'point_decimals': self.point_decimals,
+                                'cells': self.cells,
+                                'points': self.points}))
+        self.unsaved = False
@@ -1,197 +1,185 @@
 import os
-import sys
 
 import Config
-from OpenMeteoApiTimer import enforce_request_interval, calculate_request_interval_batching, increase_interval
+from src.data.IdIndex import IdIndex
+from src.data.Storage import CsvStorage
+from src.features.ElevationCache import ElevationCache
+from src.features.ElevationProvider import HgtProvider
+from src.features.OpenMeteoApiTimer import get_rate_limiter
+from src.features.OpenMeteoClient import OpenMeteoClient
+from src.features.RequestPlanner import RequestPlanner
+from src.visualization.ProgressTracker import ProgressTracker
 
 import numpy as np
 import pandas as pd
-import requests
-import json
 
 ## SYSTEM LEVEL ##
-file_name = 'elevation_final.csv'
-"""string: file name of the output of the elevation extraction process"""
+file_name = 'elevation_final'
+"""string: dataset name of the output of the elevation extraction process"""
+resolved_index_file = 'elevation_ids.bin'
+"""string: File (within the processed data directory) indexing the ids of observations with resolved elevations"""
 root_path = Config.root_dir()
 """string: The root file path of the project"""
 data_path = '/data/processed/'
 """The data path to the directory of processed data."""
-interim_data_file = 'interim_observations.csv'
-"""string: File name where interim data is stored"""
+interim_data_file = 'interim_observations'
+"""string: Dataset name where interim data is stored"""
 interim_path = Config.root_dir() + "/data/interim/"
 """string: interim data directory path"""
+storage = CsvStorage
+"""class: Storage backend (CsvStorage or ParquetStorage) of the interim and processed data"""
 
 ## ELEVATION LEVEL ##
-open_meteo_endpoint = 'https://api.open-meteo.com/v1/elevation?l'
+dem_path = Config.root_dir() + '/data/external/dem/'
+"""string: Directory of local .hgt DEM tiles, which resolve elevations without API requests (see HgtProvider)"""
+open_meteo_endpoint = 'https://api.open-meteo.com/v1/elevation'
 """string: Open-Meteo elevation API endpoint"""
-position_elevation_dict = dict()
-"""dict: Collection of coordinate to recorded observations acting as a cache"""
+concurrency = 4
+"""int: The number of API requests kept in flight"""
+client = None
+"""OpenMeteoClient: The API client, created on first use (see get_client())"""
 coordinate_accuracy = 4
 """int: Decimal places to round the coordinate values to"""
+elevation_cache_file = interim_path + 'coordinate_elevations.bin'
+"""string: Append-only file of recorded coordinate elevations"""
+legacy_store_file = 'coordinate_elevation_store.txt'
+"""string: JSON coordinate elevation store of earlier versions, imported into the elevation cache if present"""
+similarity_radius = 25
+"""float: Distance in metres within which recorded elevations are reused for observations (0 disables reuse beyond
+identical rounded coordinates)"""
+interpolation_neighbours = 1
+"""int: Number of nearest recorded elevations within the similarity radius interpolated for an observation (inverse
+distance weighting). The nearest recorded elevation is reused if 1."""
+elevation_cache = ElevationCache(coordinate_accuracy=coordinate_accuracy)
+"""ElevationCache: Recorded elevations of similar locations acting as a cache"""
 batch_size = 100
-"""int: API parameter batch size"""
+"""int: API parameter batch size (coordinates per request)"""
 batch_limit = 100
 """int: The number of batches to be requesting during the course of execution"""
-request_duration = 5
-"""int: The number of minutes the batching of requests should extend over. Informs the GET request interval."""
 current_batch_no = 0
 """int: The current batch number being requested"""
-batch_start_index = 0
-"""int: index tracker of the batch within the larger dataframe"""
-current_batch = pd.DataFrame
-"""DataFrame: The current batch """
 
 
 def elevation_feature_extraction(df: pd.DataFrame):
     """Method performs the entirety of elevation extraction for all interim observations.
 
+    Elevations are first sampled from the local DEM tiles (if any), such that only the remaining observations are
+    requested from the Open-Meteo elevation API.
     This method includes the use of GET request limits (requests should not exceed 10000 a day, or more
     than 1 request per second. Open Meteo offers this API for non-commercial use, but it must be respected.
+    The limits are enforced by the rate limiter shared by all Open-Meteo feature extractors (see OpenMeteoApiTimer),
+    and the OpenMeteoClient keeps up to concurrency batch requests in flight. Extraction stops early once the daily
+    request limit is exhausted.
+
+    The extraction is resumable: Resolved elevations are checkpointed (appended to elevation_final) after every round
+    of requests, and observations resolved by earlier runs are skipped, such that extraction can be spread across
+    several days of request quota without repeating requests or rewriting earlier results.
 
     Args:
         df (DataFrame): The dataframe containing the entirety of interim observations
-    """
-    global position_elevation_dict, current_batch_no
-    calculate_request_interval_batching(batch_size, batch_limit, request_duration)
-    df['elevation'] = None  # Create empty elevation column
-    position_elevation_dict = collect_recorded_elevations()  # Read in already known elevations
-
-    while batching(df):
-        df = reduce_batch(df)  # Reduce batch first before getting coords
-        observations_progress(df)  # Update current observations on the progress bar
 
-        if not current_batch.empty:
-            latitudes = current_batch['latitude'].tolist()  # Retrieve batch latitudes
-            longitudes = current_batch['longitude'].tolist()  # Retrieve batch longitudes
-
-            elevations = get_request(latitudes, longitudes)  # Retrieve coordinate elevations
+    Returns:
+        The observations unresolved before the run, with a float elevation column of the run (NaN where unresolved,
+        excluding zero elevations).
+    """
+    global elevation_cache, current_batch_no
+    resolved = collect_resolved_ids().contains(df.index.to_numpy())
+    if resolved.any():  # Resume at the first unresolved observation
+        print("Observations resolved by earlier runs: ", resolved.sum())
+        df = df[~resolved].copy()
+    observation_elevations = np.full(df.shape[0], np.nan)  # Elevations by position, attached to df at the end
+    ids = df.index.to_numpy()
+    elevation_cache = collect_recorded_elevations()  # Read in already known elevations
+    requested = resolve_local_elevations(df, observation_elevations)  # Positions remaining to be requested
+    planner = RequestPlanner(df['latitude'].to_numpy()[requested], df['longitude'].to_numpy()[requested],
+                             elevation_cache, request_parameter_limit=batch_size,
+                             similarity_radius=similarity_radius, interpolation_neighbours=interpolation_neighbours)
+    progress = ProgressTracker(total=planner.total_observations, label='observations')
+
+    planned_requests = collect_requests(planner)
+    while planned_requests:
+        coordinates = [planner.coordinates(request) for request in planned_requests]
+        batch_elevations = get_client().get_elevations(coordinates)  # Retrieve batch elevations concurrently
+
+        for request, (latitudes, longitudes), elevations in zip(planned_requests, coordinates, batch_elevations):
             if elevations is None:
+                planner.abandon(request)
                 continue
 
-            current_batch['elevation'] = elevations  # Update current batch with elevation column
-
-            position_elevation_dict = update_recorded_elevations(latitudes, longitudes,
-                                                                 elevations)  # Update recorded positions
-            df.update(current_batch)  # Merge batch back into dataframe
-
+            elevation_cache.update(latitudes, longitudes, elevations)  # Update (and append) recorded positions
+            planner.record(request, elevations)  # Resolve all observations at the requested positions
             current_batch_no = current_batch_no + 1  # Update batch number
-            write_coordinate_elevation_dict(
-                position_elevation_dict)  # Write the updated coordinate elevation dict to file
-        sys.stdout.flush()
 
+        resolved_observations = checkpoint_planned_elevations(planner, ids[requested])  # Checkpoint the round
+        progress.update(resolved_observations, requests=len(planned_requests))  # Update the progress bar
+        if get_client().rate_limiter.remaining_quota() == 0:
+            print('\nDaily Open-Meteo request limit reached')
+            break
+        planned_requests = collect_requests(planner)
+
+    progress.update(checkpoint_planned_elevations(planner, ids[requested]))  # Resolved from the cache by final planning
+    progress.finish()
+    observation_elevations[requested] = planner.observation_elevations()  # Fan elevations out to the observations
+    df['elevation'] = observation_elevations
     df = final_processing(df)
     return df
 
 
-def batching(df: pd.DataFrame):
-    """This method separates df into a series of batches in order to perform batch API queries.
-
-    Args:
-        df (DataFrame): The whole dataframe containing interim observations. This df will be batched.
-
-    Returns:
-        A boolean indicating that the batching process is still ongoing. The method updates the global current_batch
-        variable with a new batch in the process. If the batch limit or the end of the dataframe is reached, the method
-        returns False.
-    """
-    global batch_start_index, current_batch, current_batch_no
-
-    df_len = df.shape[0]
-    batch_end_index = batch_start_index + batch_size  # Determine batch end index
-    if current_batch_no == batch_limit or batch_start_index > df_len:  # Batching stop conditions
-        return False
-
-    if batch_end_index > df_len:  # Near end of dataset
-        current_batch = df[['latitude', 'longitude']][batch_start_index:df_len]
-    else:  # Full batch
-        current_batch = df[['latitude', 'longitude']][batch_start_index:batch_end_index]
-
-    batch_start_index = batch_end_index  # Update batch start index
-
-    return True
-
-
-def reduce_batch(df: pd.DataFrame):
-    """Method performs caching on the current batch. This caching reduces the number of queries send to the API
+def resolve_local_elevations(df: pd.DataFrame, observation_elevations: np.ndarray) -> np.ndarray:
+    """Method samples the elevations of all observations from the local DEM tiles within dem_path
 
     Args:
-        df (DataFrame): The current batch of observations to be queried for elevations.
+        df (DataFrame): The dataframe containing the entirety of interim observations.
+        observation_elevations (ndarray): Float elevations corresponding to the rows of df, updated in place.
 
     Returns:
-        A modified df, where all cached elevations are appended the whole dataframe, and those observations are
-        removed from the current batch.
+        The positions (within df) of the observations without a local elevation, which are to be requested.
     """
-    global current_batch
-
-    recorded_locations = current_batch.apply(
-        lambda x: None if check_similar_location(x['latitude'], x['longitude']) is None
-        else check_similar_location(x['latitude'], x['longitude']), axis=1).rename(
-        'elevation')  # Determine already recorded elevations for similar locations
-
-    recorded_filter = recorded_locations.isna()  # Create a mask, where non-recorded values are True
-    if not recorded_locations.empty:  # Identifies similar elevations
-        df.update(recorded_locations.to_frame())  # Merge found elevations into df
-    current_batch = current_batch[recorded_filter]  # Update the current batch
-    return df
+    elevations = HgtProvider(dem_path).elevations(df['latitude'].to_numpy(), df['longitude'].to_numpy())
+    resolved = ~np.isnan(elevations)
+    if resolved.any():
+        observation_elevations[resolved] = elevations[resolved]
+        checkpoint_elevations(df.index.to_numpy()[resolved], elevations[resolved])
+        print("Observations with local elevations: ", resolved.sum())
+    return np.flatnonzero(~resolved)
 
 
-def check_similar_location(latitude, longitude):
-    """Method determines if the parameterized coordinate has a recorded elevation in the approximate area.
+def collect_requests(planner: RequestPlanner) -> list:
+    """Method collects the next requests to be sent concurrently, each packed with up to batch_size unresolved
+    locations (see RequestPlanner).
 
-    This forms part of the caching process to determine approximately similar elevations.
+    At most concurrency requests are collected, without exceeding the batch limit.
 
     Args:
-        latitude (float): A floating value representing latitude in the coordinate to be checked.
-        longitude (float): A float value representing the longitude in the coordinate to be checked.
+        planner (RequestPlanner): The request planner of the observations to be requested.
 
     Returns:
-        Method returns a float representing the elevation (in meters) if the coordinate key is found.
-        If no key is found, the exception is handled and None is returned.
+        A list of non-empty requests (positions of the planned locations). The list is empty once planning concludes.
     """
-    rounded_lat = round(latitude, coordinate_accuracy)  # Round the latitude
-    rounded_long = round(longitude, coordinate_accuracy)  # Round the longitude
-    key = str(rounded_lat) + ", " + str(rounded_long)  # Create dictionary key string
-    try:
-        recorded_elevation = position_elevation_dict[key]  # Retrieve recorded elevation as similar coordinates
-        return recorded_elevation
-    except KeyError:
-        return None
+    planned_requests = []
+    while len(planned_requests) < min(concurrency, batch_limit - current_batch_no):
+        request = planner.next_request()
+        if request.shape[0] == 0:
+            break
+        planned_requests.append(request)
+    return planned_requests
 
 
-def update_recorded_elevations(latitudes, longitudes, elevations):
-    """Method updates the coordinate-elevation dictionary based on the successful batch request.
-
-    The coordinates are rounded to 4 decimal places in order to cache those in similar locations.
-    Rounding to 4 decimal places produces an error of approximately 11.1m - 70m in coordinate accuracy.
-
-    Args:
-        latitudes (List): A list of numerical float latitudes
-        longitudes (List): Alist of corresponding numerical float longitudes to latitudes.
-        elevations (List): A list of corresponding elevations to the provided latitude, longitude pairs.
-    """
-    global position_elevation_dict
-    np_latitudes = np.array(latitudes)  # Convert lats to np arrays for vector ops
-    np_longitudes = np.array(longitudes)  # Convert longs to np arrays for vector ops
-
-    np_latitudes_round = np.round(np_latitudes, coordinate_accuracy)  # Round the latitudes to correct accuracy
-    np_longitudes_round = np.round(np_longitudes, coordinate_accuracy)  # Round the longitudes to the correct accuracy
-
-    lats_round = np_latitudes_round.astype(str).tolist()  # Transform rounded lats to a list of strings
-    longs_round = np_longitudes_round.astype(str).tolist()  # Transform rounded longs to a list of strings
-
-    keys = [i + ", " + j for i, j in zip(lats_round, longs_round)]  # Create coordinate keys
-    new_recordings = dict(zip(keys, elevations))  # Create new dictionary from coordinate keys and elevation values
-    return {**position_elevation_dict, **new_recordings}  # merge new dictionary with current coordinate-elevation dict
+def get_client() -> OpenMeteoClient:
+    """Method returns the Open-Meteo API client, created on first use with the shared Open-Meteo rate limiter"""
+    global client
+    if client is None:
+        client = OpenMeteoClient(endpoint=open_meteo_endpoint,
+                                 concurrency=concurrency,
+                                 rate_limiter=get_rate_limiter())
+    return client
 
 
 def get_request(latitude, longitude):
     """Method performs the get request and data collection from the response from Open-Meteo Elevation API
 
-    Method contains a request interval that is enforced by the OpenMeteoTimerAPI file. Please direct
-    queries there for further information.
-
-    Error responses (403-too many request error) is handled by increasing the timer interval, and re-attempting
-    the batch request after the new interval.
+    The request limits, retries (respecting Retry-After headers) and backoff are handled by the OpenMeteoClient.
+    Please direct queries there for further information.
 
     Each GET request is defined by a 5-second timeout parameter.
 
@@ -200,17 +188,12 @@ def get_request(latitude, longitude):
         longitude (List): A float corresponding list of longitudes to the provided latitudes.
 
     Returns:
-        Elevation values for the queries coordinates
+        Elevation values for the queries coordinates, or None if the request failed
     """
-    enforce_request_interval()  # Enforce the calculated interim request interval to respect the API
-    params = {'latitude': latitude, 'longitude': longitude}  # Format the request parameters
-    try:
-        req = requests.get(url=open_meteo_endpoint, params=params, timeout=5)  # Perform GET request
-        data = req.json()  # Retrieve data in JSON format
-        return data['elevation']  # Return the retrieved data
-    except Exception:
-        print(" | Error occurred: 403")  # Assumed 403 exception
-        increase_interval()  # Increase the request time interval
+    elevations = get_client().get_elevations([(latitude, longitude)])[0]
+    if elevations is None:
+        print(" | Error occurred: request failed")
+    return elevations
 
 
 def final_processing(df: pd.DataFrame):
@@ -229,69 +212,97 @@ def final_processing(df: pd.DataFrame):
     return processed_df
 
 
-def write_coordinate_elevation_dict(coordinate_elevations):
-    """Method to write the current coordinate-elevation dictionary to the coordinate_elevation_store.txt file"""
-    with open('coordinate_elevation_store.txt', 'w') as f:
-        f.write(json.dumps(coordinate_elevations))
+def collect_recorded_elevations() -> ElevationCache:
+    """Method loads the recorded coordinate elevations to serve as a cache to minimize API requests.
+
+    The elevations of a JSON coordinate_elevation_store.txt file of earlier versions (in the working directory) are
+    imported once, when the elevation cache file does not yet exist.
+
+    Returns:
+        The ElevationCache of the elevation_cache_file, empty if neither the cache file nor a JSON store exist.
+    """
+    migrate = not os.path.isfile(elevation_cache_file) and os.path.isfile(legacy_store_file)
+    cache = ElevationCache(file=elevation_cache_file, coordinate_accuracy=coordinate_accuracy)
+    if migrate:
+        cache.import_store(legacy_store_file)
+    return cache
+
 
+def checkpoint_planned_elevations(planner: RequestPlanner, requested_ids: np.ndarray) -> int:
+    """Method checkpoints the observations resolved by the planner since the previous checkpoint
 
-def collect_recorded_elevations() -> dict:
-    """Method accesses the stored coordinate-api dictionary to serve as a cache to minimize API requests.
+    Args:
+        planner (RequestPlanner): The request planner of the requested observations
+        requested_ids (ndarray): The ids of the requested observations, in planned order
 
     Returns:
-        If the coordinate_elevation_store.txt file exists, it returns the stored dictionary.
-        Else an empty dictionary is returned.
+        The number of observations checkpointed
     """
-    if os.path.isfile('./coordinate_elevation_store.txt'):
-        with open('coordinate_elevation_store.txt') as f:
-            data = f.read()
-            return json.loads(data)
-    return {}
+    observations, elevations = planner.pop_resolved_observations()
+    checkpoint_elevations(requested_ids[observations], elevations)
+    return observations.shape[0]
 
 
-def write_recorded_elevations(df: pd.DataFrame):
-    """Method writes all recorded elevations to elevation_final.csv inside the processed data folder.
+def checkpoint_elevations(ids, elevations):
+    """Method checkpoints resolved elevations, appending them to elevation_final inside the processed data folder.
 
-    Note, only the elevations values with the corresponding index (id) are written to file.
+    Zero elevations (indicating Open-Meteo could not determine an elevation) are not written, but their ids are
+    indexed as resolved alongside the written ids, such that they are not requested again.
+    Ids are indexed after their elevations are written, such that an interruption in between repeats the
+    observations rather than losing them.
+
+    Args:
+        ids (ndarray): Integer ids of the resolved observations
+        elevations (ndarray): Elevations corresponding to the ids
     """
-    final_elevations = df['elevation']
-    final_elevations.to_csv(root_path + data_path + file_name, mode='w', index=True, header=True)
+    if len(ids) == 0:
+        return
+
+    written = elevations != 0
+    if written.any():  # Checkpoints are flushed immediately, such that indexed ids are always written
+        elevation_storage = storage(root_path + data_path)
+        elevation_storage.append(file_name, pd.DataFrame({'elevation': elevations[written]},
+                                                         index=pd.Index(ids[written], name='id')))
+        elevation_storage.flush(file_name)
+    IdIndex.append_file(root_path + data_path + resolved_index_file, ids)
 
 
-def import_interim_data():
-    """Method to import interim_observations.csv as a dataframe
+def collect_resolved_ids() -> IdIndex:
+    """Method collects the ids of all observations resolved by earlier runs.
+
+    The ids are read from the resolved id index (resolved_index_file). If no index exists (elevations written prior
+    to the index), it is built once from the ids with elevations in elevation_final. If elevation_final does not exist,
+    a stale index is removed.
 
     Returns:
-        A DataFrame containing all interim observations.
+        An IdIndex of the resolved observation ids
     """
-    df = pd.read_csv(interim_path + interim_data_file)
-    df.set_index('id', inplace=True, drop=True)
-    return df
+    index_file = root_path + data_path + resolved_index_file
+    elevation_storage = storage(root_path + data_path)
+    if not elevation_storage.exists(file_name):  # Start from scratch
+        if os.path.isfile(index_file):
+            os.remove(index_file)
+        return IdIndex()
+
+    if not os.path.isfile(index_file):
+        elevations = elevation_storage.read(file_name, columns=['elevation'])
+        IdIndex.append_file(index_file, elevations.index[elevations['elevation'].notna()])
+    return IdIndex.load(index_file)
 
 
-def observations_progress(df: pd.DataFrame):
-    """Method to illustrate the observations that now contain elevations out of the entire dataset
+def import_interim_data(columns=None):
+    """Method to import interim_observations as a dataframe
 
     Args:
-        df (DataFrame): The dataset containing all observations. This dataset is updated as elevations are generated.
+        columns (list): The columns to import. Columnar storage backends only read these columns. All columns are
+            imported if None.
+
+    Returns:
+        A DataFrame containing all interim observations, indexed by id.
     """
-    cursor_up = '\x1b[1A'
-    erase_line = '\x1b[2K'
-    progress_bar_length = 100  # Specify progress bar length
-    answered_observations = df[df.elevation >= 0]  # Determine the number of elevations recorded
-    percentage_complete = answered_observations.shape[0] / df.shape[0]  # Calculate percentage complete
-    filled = int(progress_bar_length * percentage_complete)  # Determine fill of percentage bar
-
-    bar = '=' * filled + '-' * (progress_bar_length - filled)  # Modify bar with fill
-    percentage_display = round(100 * percentage_complete, 3)  # Calculate percentage
-    sys.stdout.write(cursor_up + erase_line + '\r[%s] %s%s ... current observations: %s / %s' % (bar,
-                                                                                                 percentage_display,
-                                                                                                 '%',
-                                                                                                 answered_observations.shape[0],
-                                                                                                 df.shape[0]))
+    return storage(interim_path).read(interim_data_file, columns=columns)
 
 
 if __name__ == '__main__':
-    df = import_interim_data()
-    df = elevation_feature_extraction(df)
-    write_recorded_elevations(df)
+    df = import_interim_data(columns=['latitude', 'longitude'])
+    elevation_feature_extraction(df)
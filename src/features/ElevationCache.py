@@ -0,0 +1,178 @@
+import json
+import os
+
+import numpy as np
+
+from src.features.SpatialIndex import SpatialIndex
+
+record_type = np.dtype([('key', '<i8'), ('elevation', '<f4')])
+"""dtype: Record of the cache file, a packed coordinate key and its elevation (12 bytes)"""
+
+
+class ElevationCache:
+    """ Cache of recorded elevations, keyed by coordinates rounded to coordinate_accuracy decimal places.
+
+    Coordinates are packed into int64 keys (see coordinate_keys()), and elevations stored as float32. In memory, the
+    cache is a sorted key array with corresponding elevations, such that a batch of coordinates is resolved with a
+    single binary search (searchsorted).
+    The cache is persisted as an append-only file of raw records (see record_type): Each update only appends its new
+    records, and loading reads the file in a single pass, with later records of a key replacing earlier records.
+
+    Args:
+        file (str): Path to the cache file. If None, the cache is kept in memory only.
+        coordinate_accuracy (int): Decimal places to round the coordinates to
+    """
+
+    def __init__(self, file=None, coordinate_accuracy=4):
+        self.file = file
+        self.coordinate_accuracy = coordinate_accuracy
+        self.keys = np.empty(0, dtype=np.int64)
+        self.elevations = np.empty(0, dtype=np.float32)
+        self.spatial_index = None
+        if file is not None and os.path.isfile(file):
+            records = np.fromfile(file, dtype=record_type)
+            self.merge(records['key'], records['elevation'])
+
+    def __len__(self):
+        return self.keys.shape[0]
+
+    def lookup(self, latitudes, longitudes) -> np.ndarray:
+        """ Method determines the recorded elevations of coordinates in the approximate area
+
+        Args:
+            latitudes (ndarray): Float latitudes
+            longitudes (ndarray): Float longitudes corresponding to the latitudes
+
+        Returns:
+            A float array of the recorded elevations (in meters), NaN where no elevation is recorded.
+        """
+        keys = coordinate_keys(latitudes, longitudes, self.coordinate_accuracy)
+        elevations = np.full(keys.shape[0], np.nan)
+        if self.keys.shape[0] == 0:
+            return elevations
+
+        positions = np.minimum(np.searchsorted(self.keys, keys), self.keys.shape[0] - 1)  # Clip keys beyond the last
+        found = self.keys[positions] == keys
+        elevations[found] = self.elevations[positions[found]]
+        return elevations
+
+    def nearby(self, latitudes, longitudes, radius, neighbours=1, power=2) -> np.ndarray:
+        """ Method determines elevations from the recorded elevations within radius metres of coordinates
+
+        Args:
+            latitudes (ndarray): Float latitudes
+            longitudes (ndarray): Float longitudes corresponding to the latitudes
+            radius (float): Maximum distance in metres of a recorded elevation
+            neighbours (int): Number of nearest recorded elevations to interpolate (inverse distance weighting).
+                The nearest recorded elevation is reused if 1.
+            power (float): Power of the inverse distance weights
+
+        Returns:
+            A float array of the nearby elevations (in meters), NaN where no elevation is recorded within the radius.
+        """
+        elevations = np.full(len(latitudes), np.nan)
+        if self.spatial_index is None or self.spatial_index.cell_size != max(radius, 1):
+            self.spatial_index = SpatialIndex(cell_size=max(radius, 1))
+            self.spatial_index.add(*self.coordinates(), self.keys)
+
+        queries, keys, distances = self.spatial_index.query(latitudes, longitudes, radius, neighbours)
+        values = self.elevations[np.searchsorted(self.keys, keys)].astype(np.float64)
+        recorded = ~np.isnan(values)
+        queries, values, distances = queries[recorded], values[recorded], distances[recorded]
+        if queries.shape[0] == 0:
+            return elevations
+
+        weights = 1 / np.maximum(distances, 1e-3) ** power  # Coinciding coordinates dominate the interpolation
+        found = np.unique(queries)
+        elevations[found] = (np.bincount(queries, weights * values, minlength=elevations.shape[0])[found] /
+                             np.bincount(queries, weights, minlength=elevations.shape[0])[found])
+        return elevations
+
+    def update(self, latitudes, longitudes, elevations):
+        """ Method records the elevations of coordinates, appending them to the cache file
+
+        New elevations replace previously recorded elevations of the same (rounded) coordinates.
+
+        Args:
+            latitudes (array-like): Float latitudes
+            longitudes (array-like): Float longitudes corresponding to the latitudes
+            elevations (array-like): Elevations corresponding to the coordinates. Missing (None) elevations are
+                recorded as NaN.
+        """
+        records = np.empty(len(latitudes), dtype=record_type)
+        records['key'] = coordinate_keys(latitudes, longitudes, self.coordinate_accuracy)
+        records['elevation'] = np.asarray(elevations, dtype=np.float64)
+        self.merge(records['key'], records['elevation'])
+
+        if self.file is not None:
+            with open(self.file, 'ab') as f:
+                records.tofile(f)
+
+    def merge(self, keys, elevations):
+        """ Method merges records into the in-memory cache, where the latest record of each key is retained
+
+        Args:
+            keys (ndarray): int64 coordinate keys
+            elevations (ndarray): Elevations corresponding to the keys
+        """
+        keys, latest = np.unique(keys[::-1], return_index=True)  # Reversed, such that the latest duplicate is kept
+        elevations = np.asarray(elevations, dtype=np.float32)[::-1][latest]
+
+        positions = np.searchsorted(self.keys, keys)
+        existing = positions < self.keys.shape[0]
+        existing[existing] = self.keys[positions[existing]] == keys[existing]
+
+        self.elevations[positions[existing]] = elevations[existing]  # Replace recorded elevations
+        self.keys = np.insert(self.keys, positions[~existing], keys[~existing])  # Insert, retaining the order
+        self.elevations = np.insert(self.elevations, positions[~existing], elevations[~existing])
+        if self.spatial_index is not None:  # Maintain the spatial index of the recorded coordinates
+            self.spatial_index.add(*key_coordinates(keys[~existing], self.coordinate_accuracy), keys[~existing])
+
+    def coordinates(self) -> tuple:
+        """ Method returns the (rounded) latitudes and longitudes of the recorded elevations, in cache order"""
+        return key_coordinates(self.keys, self.coordinate_accuracy)
+
+    def import_store(self, store_file):
+        """ Method records the elevations of a JSON coordinate elevation store (coordinate_elevation_store.txt), a
+        dictionary of "latitude, longitude" keys to elevations
+
+        Args:
+            store_file (str): Path to the JSON store
+        """
+        with open(store_file) as f:
+            stored_elevations = json.loads(f.read())
+        coordinates = np.array([key.split(', ') for key in stored_elevations], dtype=np.float64).reshape(-1, 2)
+        self.update(coordinates[:, 0], coordinates[:, 1], list(stored_elevations.values()))
+
+
+def coordinate_keys(latitudes, longitudes, coordinate_accuracy=4) -> np.ndarray:
+    """Method encodes coordinates, rounded to coordinate_accuracy decimal places, as packed integer keys.
+
+    The rounded latitude and longitude are scaled to non-negative integers, and packed into a single int64 key, such
+    that coordinates rounding to the same location share a key.
+    Rounding to 4 decimal places produces an error of approximately 11.1m - 70m in coordinate accuracy.
+
+    Args:
+        latitudes (array-like): Float latitudes
+        longitudes (array-like): Float longitudes corresponding to the latitudes
+        coordinate_accuracy (int): Decimal places to round the coordinates to
+
+    Returns:
+        An int64 array of coordinate keys
+    """
+    scale = 10 ** coordinate_accuracy
+    scaled_latitudes = np.rint(np.asarray(latitudes, dtype=np.float64) * scale).astype(np.int64) + 90 * scale
+    scaled_longitudes = np.rint(np.asarray(longitudes, dtype=np.float64) * scale).astype(np.int64) + 180 * scale
+    return scaled_latitudes * (360 * scale + 1) + scaled_longitudes
+
+
+def key_coordinates(keys, coordinate_accuracy=4) -> tuple:
+    """Method decodes packed coordinate keys (see coordinate_keys()) into rounded coordinates
+
+    Returns:
+        The float latitudes and longitudes of the keys
+    """
+    scale = 10 ** coordinate_accuracy
+    latitudes = (keys // (360 * scale + 1) - 90 * scale) / scale
+    longitudes = (keys % (360 * scale + 1) - 180 * scale) / scale
+    return latitudes, longitudes
@@ -0,0 +1,114 @@
+import math
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+hgt_void = -32768
+"""int: Value of missing (void) samples within .hgt tiles"""
+
+
+class ElevationProvider(ABC):
+    """ Interface of elevation providers, determining the elevations of batches of coordinates.
+
+    Providers return NaN for coordinates they cannot resolve, such that the remaining coordinates can be resolved by
+    other means (see Elevation.elevation_feature_extraction(), requesting them from the Open-Meteo elevation API).
+    """
+
+    @abstractmethod
+    def elevations(self, latitudes, longitudes) -> np.ndarray:
+        """ Method determines the elevations of coordinates
+
+        Args:
+            latitudes (ndarray): Float latitudes
+            longitudes (ndarray): Float longitudes corresponding to the latitudes
+
+        Returns:
+            A float array of elevations (in meters), NaN where the elevation could not be determined
+        """
+
+
+class HgtProvider(ElevationProvider):
+    """ Offline elevation provider sampling SRTM-style .hgt DEM tiles, without network access.
+
+    Each tile covers one degree of latitude and longitude, named after its south-west corner (for example N33E018.hgt
+    or S34W071.hgt), and contains a square grid of big-endian int16 elevations (1201 samples for 3 arc-second, 3601
+    for 1 arc-second resolution), ordered from the north-west corner. Tiles are memory-mapped on first use, such that
+    only the pages containing sampled elevations are read.
+    Elevations are bilinearly interpolated from the four samples surrounding each coordinate, vectorized per tile.
+    Coordinates outside the available tiles, or next to void samples, are not resolved.
+    GeoTIFF DEM tiles (such as the Copernicus DEM) are compressed, and can therefore not be memory-mapped. They are to be
+    converted to .hgt tiles first (for example with gdal_translate -of SRTMHGT).
+
+    Args:
+        tile_path (str): Path of the directory containing the .hgt tiles
+    """
+
+    def __init__(self, tile_path):
+        self.tile_path = tile_path
+        self.tiles = dict()
+
+    def elevations(self, latitudes, longitudes) -> np.ndarray:
+        """ Method determines the elevations of coordinates (see ElevationProvider.elevations())"""
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        elevations = np.full(latitudes.shape[0], np.nan)
+
+        corners = np.floor(np.column_stack([latitudes, longitudes])).astype(np.int64)  # South-west tile corners
+        tile_corners, tile_positions = np.unique(corners, axis=0, return_inverse=True)
+        order = np.argsort(tile_positions, kind='stable')  # Group the coordinates by tile
+        bounds = np.searchsorted(tile_positions[order], np.arange(tile_corners.shape[0] + 1))
+
+        for (latitude, longitude), start, stop in zip(tile_corners, bounds[:-1], bounds[1:]):
+            tile = self.tile(latitude, longitude)
+            if tile is not None:
+                positions = order[start:stop]
+                elevations[positions] = bilinear_sample(tile, latitude + 1 - latitudes[positions],
+                                                        longitudes[positions] - longitude)
+        return elevations
+
+    def tile(self, latitude, longitude):
+        """ Method returns the memory-mapped tile with the south-west corner latitude, longitude
+
+        Returns:
+            A 2D int16 array of the tile samples, or None if the tile is not available
+        """
+        key = (int(latitude), int(longitude))
+        if key not in self.tiles:
+            file = os.path.join(self.tile_path, tile_name(*key))
+            if os.path.isfile(file):
+                samples = math.isqrt(os.path.getsize(file) // 2)
+                self.tiles[key] = np.memmap(file, dtype='>i2', mode='r', shape=(samples, samples))
+            else:
+                self.tiles[key] = None
+        return self.tiles[key]
+
+
+def tile_name(latitude, longitude) -> str:
+    """Method returns the file name of the .hgt tile with the south-west corner latitude, longitude (e.g. S34E018.hgt)"""
+    return '%s%02d%s%03d.hgt' % ('N' if latitude >= 0 else 'S', abs(latitude),
+                                 'E' if longitude >= 0 else 'W', abs(longitude))
+
+
+def bilinear_sample(tile, rows, columns) -> np.ndarray:
+    """Method bilinearly interpolates the samples of a tile
+
+    Args:
+        tile (ndarray): A square 2D array of samples, spanning one degree, ordered from the north-west corner
+        rows (ndarray): Degrees south of the north edge of the tile (0 - 1)
+        columns (ndarray): Degrees east of the west edge of the tile (0 - 1)
+
+    Returns:
+        A float array of the interpolated elevations, NaN where any surrounding sample is void
+    """
+    intervals = tile.shape[0] - 1
+    rows, columns = np.clip(rows, 0, 1) * intervals, np.clip(columns, 0, 1) * intervals
+    top, left = np.minimum(rows.astype(np.int64), intervals - 1), np.minimum(columns.astype(np.int64), intervals - 1)
+    row_fractions, column_fractions = rows - top, columns - left
+
+    samples = np.stack([tile[top, left], tile[top, left + 1], tile[top + 1, left], tile[top + 1, left + 1]])
+    samples = samples.astype(np.float64)
+    samples[samples == hgt_void] = np.nan
+    upper = samples[0] * (1 - column_fractions) + samples[1] * column_fractions
+    lower = samples[2] * (1 - column_fractions) + samples[3] * column_fractions
+    return upper * (1 - row_fractions) + lower * row_fractions
@@ -0,0 +1,199 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.data.TimeModel import from_text
+from src.features import Elevation
+
+store_path = Elevation.root_path + Elevation.data_path + 'feature_store/'
+"""string: Directory of the feature store (within the processed data directory)"""
+feature_types = {'latitude': 'float32',
+                 'longitude': 'float32',
+                 'elevation': 'float32',
+                 'day_of_year': 'int16',
+                 'local_hour': 'float32',
+                 'utc_offset': 'int16'}
+"""dict: Features of the store with their array types. Elevations that were not resolved are NaN."""
+interim_columns = ['observed_on', 'local_time_observed_at', 'utc_offset', 'latitude', 'longitude']
+"""list: Interim data columns the features are derived from"""
+metadata_file = 'metadata.json'
+"""string: File (within the store directory) describing the stored features"""
+
+
+class FeatureStore:
+    """ Store of per-observation numeric spatio-temporal features, as column-wise memory-mapped NumPy arrays.
+
+    Each feature is stored as its own .npy array (see feature_types), alongside the ids of the observations (ids.npy).
+    Rows are stored in a random (seeded) order when materialized (see materialize_features()), such that any contiguous
+    block of rows is a random sample of the observations. The minibatches of batches() are therefore contiguous slices
+    of the memory-mapped arrays, which NumPy returns as views: A batch is never copied or parsed, and only its pages are
+    read from disk.
+
+    Observations are located by id through the id index (sorted_ids.npy and the corresponding sorted_rows.npy), with a
+    single binary search per lookup.
+
+    Args:
+        path (str): Directory of the materialized feature store
+    """
+
+    def __init__(self, path=None):
+        self.path = store_path if path is None else path
+        with open(os.path.join(self.path, metadata_file)) as f:
+            self.metadata = json.loads(f.read())
+        self.ids = np.load(os.path.join(self.path, 'ids.npy'), mmap_mode='r')
+        self.sorted_ids = np.load(os.path.join(self.path, 'sorted_ids.npy'), mmap_mode='r')
+        self.sorted_rows = np.load(os.path.join(self.path, 'sorted_rows.npy'), mmap_mode='r')
+        self.columns = {column: np.load(os.path.join(self.path, column + '.npy'), mmap_mode='r')
+                        for column in self.metadata['columns']}
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    def rows(self, ids) -> np.ndarray:
+        """ Method locates observations within the store by id
+
+        Args:
+            ids (array-like): Integer observation ids
+
+        Returns:
+            An int64 array of the row of each id, -1 where the id is not stored
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self) == 0:
+            return np.full(ids.shape[0], -1, dtype=np.int64)
+
+        positions = np.minimum(np.searchsorted(self.sorted_ids, ids), len(self) - 1)  # Clip ids beyond the last id
+        return np.where(self.sorted_ids[positions] == ids, self.sorted_rows[positions], -1)
+
+    def features(self, ids, columns=None) -> pd.DataFrame:
+        """ Method gathers the features of observations by id (copied, as the rows are not contiguous)
+
+        Args:
+            ids (array-like): Integer observation ids
+            columns (list): The features to gather. All features are gathered if None.
+
+        Returns:
+            A DataFrame of the features indexed by id, without ids that are not stored
+        """
+        rows = self.rows(ids)
+        rows = rows[rows >= 0]
+        columns = self.metadata['columns'] if columns is None else columns
+        return pd.DataFrame({column: self.columns[column][rows] for column in columns},
+                            index=pd.Index(self.ids[rows], name='id'))
+
+    def batches(self, batch_size, columns=None, shuffle=True, seed=None, drop_partial=False):
+        """ Generator serving the stored observations as minibatches of contiguous rows (memory-mapped views).
+
+        Each epoch (call) serves every row once. If shuffled, the block boundaries are offset by a random number of
+        rows, and the blocks served in a random order, such that minibatches differ between epochs.
+
+        Args:
+            batch_size (int): The number of rows per minibatch
+            columns (list): The features served. All features are served if None.
+            shuffle (bool): Flag to serve the blocks in a random order, with randomly offset boundaries
+            seed (int): Random seed of the shuffle
+            drop_partial (bool): Flag to skip the blocks of fewer than batch_size rows (at the store boundaries)
+
+        Yields:
+            The ids of the minibatch, and a dict of feature arrays (views of the stored arrays)
+        """
+        columns = self.metadata['columns'] if columns is None else columns
+        rng = np.random.default_rng(seed)
+        offset = int(rng.integers(batch_size)) if shuffle else 0
+        bounds = np.unique(np.concatenate([[0], np.arange(offset, len(self), batch_size), [len(self)]]))
+        blocks = np.column_stack([bounds[:-1], bounds[1:]])
+        if drop_partial:
+            blocks = blocks[blocks[:, 1] - blocks[:, 0] == batch_size]
+        if shuffle:
+            blocks = blocks[rng.permutation(blocks.shape[0])]
+
+        for start, stop in blocks.tolist():
+            yield self.ids[start:stop], {column: self.columns[column][start:stop] for column in columns}
+
+
+def derive_features(interim_df: pd.DataFrame, elevation_df: pd.DataFrame) -> pd.DataFrame:
+    """Method derives the numeric features of observations from their interim data and resolved elevations
+
+    Observations without a valid date or local time are excluded, as their temporal features are unknown.
+
+    Args:
+        interim_df (DataFrame): Interim observations (interim_columns), indexed by id. Text time columns are parsed.
+        elevation_df (DataFrame): Resolved elevations (elevation column), indexed by id
+
+    Returns:
+        A DataFrame of the features (feature_types) indexed by id
+    """
+    interim_df = from_text(interim_df)
+    interim_df = interim_df[interim_df['observed_on'].notna() & interim_df['local_time_observed_at'].notna() &
+                            interim_df['utc_offset'].notna()]
+    elevations = elevation_df.loc[~elevation_df.index.duplicated(keep='last'), 'elevation']  # Latest checkpoint
+
+    local_times = interim_df['local_time_observed_at']
+    local_hours = local_times.dt.hour + local_times.dt.minute / 60 + local_times.dt.second / 3600  # Fractional hours
+    return pd.DataFrame({'latitude': interim_df['latitude'],
+                         'longitude': interim_df['longitude'],
+                         'elevation': elevations.reindex(interim_df.index),
+                         'day_of_year': interim_df['observed_on'].dt.dayofyear,
+                         'local_hour': local_hours,
+                         'utc_offset': interim_df['utc_offset']}, index=interim_df.index)
+
+
+def materialize_features(features: pd.DataFrame, path=None, seed=0) -> FeatureStore:
+    """Method materializes features (indexed by id) as a feature store, replacing any existing store at path.
+
+    The rows are written in a random order (seeded), and the arrays are written into a temporary directory which
+    replaces the store once complete, such that an interrupted materialization never leaves a partially written store.
+
+    Args:
+        features (DataFrame): The features (feature_types) of the observations, indexed by unique ids
+        path (str): Directory of the feature store
+        seed (int): Random seed of the row order
+
+    Returns:
+        The FeatureStore
+    """
+    path = (store_path if path is None else path).rstrip('/')
+    temporary_path = path + '.tmp'
+    if os.path.isdir(temporary_path):
+        shutil.rmtree(temporary_path)
+    os.makedirs(temporary_path)
+
+    order = np.random.default_rng(seed).permutation(len(features.index))
+    ids = features.index.to_numpy(dtype=np.int64)[order]
+    sorted_rows = np.argsort(ids, kind='stable')
+    arrays = {'ids': ids, 'sorted_ids': ids[sorted_rows], 'sorted_rows': sorted_rows.astype(np.int64)}
+    for column, dtype in feature_types.items():
+        arrays[column] = features[column].to_numpy(dtype=dtype)[order]
+
+    for name, values in arrays.items():
+        np.save(os.path.join(temporary_path, name + '.npy'), values)
+    with open(os.path.join(temporary_path, metadata_file), 'w') as f:
+        f.write(json.dumps({'columns': list(feature_types), 'rows': len(ids), 'seed': seed}, indent=2))
+
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.replace(temporary_path, path)
+    return FeatureStore(path + '/')
+
+
+def build_feature_store(path=None, seed=0) -> FeatureStore:
+    """Method builds the feature store from the interim observations and the resolved elevations (elevation_final)
+
+    Returns:
+        The FeatureStore
+    """
+    interim_df = Elevation.import_interim_data(columns=interim_columns)
+    elevation_storage = Elevation.storage(Elevation.root_path + Elevation.data_path)
+    if elevation_storage.exists(Elevation.file_name):
+        elevation_df = elevation_storage.read(Elevation.file_name, columns=['elevation'])
+    else:
+        elevation_df = pd.DataFrame({'elevation': pd.Series(dtype='float64')}, index=pd.Index([], name='id'))
+    return materialize_features(derive_features(interim_df, elevation_df), path=path, seed=seed)
+
+
+if __name__ == '__main__':
+    store = build_feature_store()
+    print('Feature store of %s observations written to %s' % (len(store), store.path))
@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.features.RateLimiter import RateLimiter
+
+open_meteo_endpoint = 'https://api.open-meteo.com/v1/elevation'
+"""string: Open-Meteo elevation API endpoint"""
+retry_status_codes = [429, 500, 502, 503, 504]
+"""list: Response status codes indicating a request should be retried"""
+
+
+class OpenMeteoClient:
+    """ Asynchronous Open-Meteo elevation client, keeping a configurable number of requests in flight.
+
+    Requests are performed through a single requests.Session, reusing a pool of (keep-alive) connections, with each
+    blocking request executed in a worker thread. The per-second and per-day request limits are enforced by a
+    RateLimiter, such that requests proceed at the maximum permitted rate rather than with fixed sleeps. The rate
+    limiter can be shared with other clients, and is informed of the outcome of each request to adapt the request rate.
+    Failed requests (connection errors, timeouts, other request exceptions and retry status codes) are retried with
+    exponential backoff. A Retry-After header (in seconds or as an HTTP date) takes precedence over the backoff, and
+    pauses the shared rate limiter, such that no request of any task is sent before it expires. Responses without
+    valid elevations are counted as errors and abandoned. Once the daily request quota is exhausted, remaining requests
+    are abandoned.
+
+    Args:
+        endpoint (str): The elevation API endpoint. Can be pointed to a local stand-in server for testing purposes.
+        concurrency (int): Maximum number of requests in flight
+        rate_limiter (RateLimiter): The (shared) rate limiter. If None, a rate limiter is created from the limits below.
+        requests_per_second (float): Per-second request limit, if no rate limiter is provided
+        requests_per_day (int): Per-day request limit, if no rate limiter is provided
+        max_retries (int): Maximum number of retries per request, before the request is abandoned
+        backoff (float): Initial backoff in seconds, doubled after each failed attempt
+        timeout (float): Timeout in seconds of each request
+    """
+
+    def __init__(self, endpoint=open_meteo_endpoint, concurrency=4, rate_limiter=None, requests_per_second=1,
+                 requests_per_day=10000, max_retries=5, backoff=1.0, timeout=5):
+        self.endpoint = endpoint
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter(requests_per_second=requests_per_second, requests_per_day=requests_per_day) \
+            if rate_limiter is None else rate_limiter
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.request_no = 0
+        self.error_no = 0
+
+    def get_elevations(self, coordinate_batches) -> list:
+        """ Method requests the elevations of several coordinate batches concurrently
+
+        Args:
+            coordinate_batches (list): A list of (latitudes, longitudes) tuples, each containing at most 100 coordinates
+
+        Returns:
+            A list containing the elevations of each batch (in batch order), or None for batches that failed or exceeded
+            the daily request quota
+        """
+        return asyncio.run(self.request_batches(coordinate_batches))
+
+    async def request_batches(self, coordinate_batches) -> list:
+        """ Method asynchronously requests the elevations of several coordinate batches, with at most concurrency
+        requests in flight (see get_elevations())"""
+        in_flight = asyncio.Semaphore(self.concurrency)
+
+        async def limited_request(latitudes, longitudes):
+            async with in_flight:
+                return await self.request(latitudes, longitudes)
+
+        return await asyncio.gather(*[limited_request(latitudes, longitudes)
+                                      for latitudes, longitudes in coordinate_batches])
+
+    async def request(self, latitudes, longitudes):
+        """ Method asynchronously requests the elevations of a single coordinate batch, retrying failed attempts
+
+        Args:
+            latitudes (list): Float latitudes
+            longitudes (list): Float longitudes corresponding to the latitudes
+
+        Returns:
+            A list of elevations corresponding to the coordinates, or None if all attempts failed or the daily request
+            quota is exhausted
+        """
+        params = {'latitude': ','.join(map(str, latitudes)), 'longitude': ','.join(map(str, longitudes))}
+        for attempt in range(self.max_retries + 1):
+            if not await self.rate_limiter.acquire():
+                return None
+
+            retry_after = None
+            try:
+                response = await asyncio.to_thread(self.session.get, self.endpoint, params=params,
+                                                   timeout=self.timeout)
+                self.request_no = self.request_no + 1
+                if response.status_code == 200:
+                    return self.parse_elevations(response)
+                if response.status_code not in retry_status_codes:
+                    self.error_no = self.error_no + 1
+                    return None
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            except requests.RequestException:  # Connection errors, timeouts, invalid URLs, interrupted responses...
+                pass
+
+            self.error_no = self.error_no + 1
+            self.rate_limiter.record_failure()
+            if attempt < self.max_retries:
+                if retry_after is None:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+                else:
+                    self.rate_limiter.pause(retry_after)  # Applies to all tasks, awaited by the next acquire()
+        return None
+
+    def parse_elevations(self, response):
+        """ Method parses the elevations of a successful response
+
+        Returns:
+            The list of elevations, or None (counted as an error) if the response body contains no elevations
+        """
+        try:
+            elevations = response.json()['elevation']
+        except (ValueError, KeyError, TypeError):  # Not JSON (JSON decoding errors are ValueErrors), or no elevations
+            self.error_no = self.error_no + 1
+            return None
+        self.rate_limiter.record_success()
+        return elevations
+
+    def close(self):
+        """ Method closes the pooled connections of the client session"""
+        self.session.close()
+
+
+def parse_retry_after(value):
+    """Method parses the value of a Retry-After header
+
+    Args:
+        value (str): The header value, either a number of seconds or an HTTP date. May be None.
+
+    Returns:
+        The number of seconds to wait, or None if the value is missing or cannot be parsed.
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,284 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class TokenBucket:
+    """ Token bucket rate limiter, permitting bursts of up to capacity requests, refilled at rate tokens per second.
+
+    Requests reserve a token, even if the bucket is empty (the token balance becomes negative). The reservation
+    returns the time to wait until the token is refilled, such that waiting requests are served in order of arrival.
+    The bucket can be paused (see pause()), such that no tokens are handed out before the pause deadline. A pause
+    defers the reservations still waiting by the length of the pause, such that they remain spaced at the refill
+    rate after the deadline, rather than being sent together once the pause expires.
+    Reservations and rate changes are thread safe.
+
+    Args:
+        rate (float): Tokens refilled per second
+        capacity (float): Maximum number of tokens within the bucket
+        clock (function): Monotonic clock in seconds, replaceable for testing purposes
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.deferred = 0.0
+        self.lock = threading.Lock()
+
+    def refill(self):
+        """ Method refills the bucket with the tokens generated since the previous refill (caller holds the lock).
+        No tokens are generated before the deadline of a pause."""
+        now = self.clock()
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self) -> float:
+        """ Method reserves a single token
+
+        Returns:
+            The time in seconds to wait before the reserved token is available
+        """
+        return self.remaining_wait(self.reservation())
+
+    def reservation(self) -> tuple:
+        """ Method reserves a single token, to be awaited with remaining_wait()
+
+        Returns:
+            The (clock) time at which the token is available, and the deferral by pauses at the time of reservation
+        """
+        with self.lock:
+            self.refill()
+            self.tokens = self.tokens - 1
+            return max(self.clock(), self.updated) + max(0.0, -self.tokens / self.rate), self.deferred
+
+    def remaining_wait(self, reservation) -> float:
+        """ Method returns the time in seconds to wait before a reserved token is available, including the deferral
+        by any pauses started since its reservation"""
+        ready_at, deferred = reservation
+        return max(0.0, ready_at + self.deferred - deferred - self.clock())
+
+    def pause(self, seconds):
+        """ Method pauses the bucket for seconds (for example, as requested by a Retry-After header): The bucket is
+        emptied, and refilling resumes at the pause deadline. Pauses never shorten an earlier pause.
+        Waiting reservations (the token debt) are deferred by the extension of the pause, such that they are
+        refilled after the deadline at the refill rate."""
+        with self.lock:
+            self.refill()
+            now = self.clock()
+            resumed = max(self.updated, now)  # Refilling resumes now, or at the deadline of an earlier pause
+            self.tokens = min(0.0, self.tokens)
+            self.updated = max(self.updated, now + seconds)
+            self.deferred = self.deferred + self.updated - resumed
+
+    def pause_remaining(self) -> float:
+        """ Method returns the time in seconds until the deadline of the current pause (0 if not paused)"""
+        return max(0.0, self.updated - self.clock())
+
+    def set_rate(self, rate):
+        """ Method changes the refill rate, crediting the tokens generated at the previous rate"""
+        with self.lock:
+            self.refill()
+            self.rate = rate
+
+    def acquire_blocking(self):
+        """ Method reserves a token, sleeping until it is available (and the bucket is not paused)"""
+        reservation = self.reservation()
+        wait = self.remaining_wait(reservation)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.remaining_wait(reservation)  # A pause may have deferred the reservation while waiting
+
+    async def acquire(self):
+        """ Method reserves a token, asynchronously sleeping until it is available (and the bucket is not paused)"""
+        reservation = self.reservation()
+        wait = self.remaining_wait(reservation)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.remaining_wait(reservation)  # A pause may have deferred the reservation while waiting
+
+
+class DailyQuota:
+    """ Ledger of the requests used of a daily request quota, persisted such that the quota holds across runs.
+
+    The quota resets at midnight (UTC). The ledger file is rewritten atomically on every reservation.
+
+    Args:
+        limit (int): Number of requests permitted per day
+        ledger_file (str): Path to the persisted ledger (JSON). If None, the ledger is kept in memory only.
+        clock (function): Function returning the current (UTC) datetime, replaceable for testing purposes
+    """
+
+    def __init__(self, limit, ledger_file=None, clock=lambda: datetime.now(timezone.utc)):
+        self.limit = limit
+        self.ledger_file = ledger_file
+        self.clock = clock
+        self.day = self.today()
+        self.used = 0
+        self.lock = threading.Lock()
+        self.load()
+
+    def today(self) -> str:
+        """ Method returns the current (UTC) day as yyyy-mm-dd"""
+        return self.clock().strftime('%Y-%m-%d')
+
+    def rollover(self):
+        """ Method resets the used requests if the day changed since the previous reservation (caller holds the lock)"""
+        today = self.today()
+        if today != self.day:
+            self.day = today
+            self.used = 0
+
+    def reserve(self) -> bool:
+        """ Method reserves a single request of the quota
+
+        Returns:
+            True if the request is permitted, False if the quota of the day is exhausted
+        """
+        with self.lock:
+            self.rollover()
+            if self.used >= self.limit:
+                return False
+            self.used = self.used + 1
+            self.save()
+            return True
+
+    def remaining(self) -> int:
+        """ Method returns the number of requests remaining of the quota of the day"""
+        with self.lock:
+            self.rollover()
+            return self.limit - self.used
+
+    def load(self):
+        """ Method loads the used requests of the current day from the ledger file, if it exists"""
+        if self.ledger_file is None or not os.path.isfile(self.ledger_file):
+            return
+
+        with open(self.ledger_file) as f:
+            ledger = json.loads(f.read())
+        if ledger['day'] == self.day:
+            self.used = ledger['used']
+
+    def save(self):
+        """ Method atomically writes the ledger file (caller holds the lock)"""
+        if self.ledger_file is None:
+            return
+
+        temporary_file = self.ledger_file + '.tmp'
+        with open(temporary_file, 'w') as f:
+            f.write(json.dumps({'day': self.day, 'used': self.used}))
+        os.replace(temporary_file, self.ledger_file)
+
+
+class RateLimiter:
+    """ Rate limiter shared by all API consumers, combining a token bucket, a persisted daily quota, and adaptive
+    (AIMD) rate control.
+
+    The request rate adapts to the responses of the API: Each failure (for example a 429 response) multiplicatively
+    decreases the rate (down to min_requests_per_second), while each success additively recovers it (up to
+    requests_per_second). A burst of errors therefore only slows requests until the API recovers.
+    All methods are thread safe, and acquire() can be awaited by concurrent asyncio tasks.
+
+    Args:
+        requests_per_second (float): Maximum request rate
+        requests_per_day (int): Daily request quota
+        ledger_file (str): Path to the persisted daily quota ledger. If None, the quota is kept in memory only.
+        min_requests_per_second (float): Minimum request rate. A twentieth of the maximum rate if None.
+        decrease_factor (float): Factor multiplying the rate after a failure
+        recovery_step (float): Rate increase after a success. A tenth of the maximum rate if None.
+        clock (function): Monotonic clock in seconds, replaceable for testing purposes
+    """
+
+    def __init__(self, requests_per_second=1, requests_per_day=10000, ledger_file=None, min_requests_per_second=None,
+                 decrease_factor=0.5, recovery_step=None, clock=time.monotonic):
+        self.max_rate = requests_per_second
+        self.min_rate = requests_per_second / 20 if min_requests_per_second is None else min_requests_per_second
+        self.decrease_factor = decrease_factor
+        self.recovery_step = requests_per_second / 10 if recovery_step is None else recovery_step
+        self.bucket = TokenBucket(rate=requests_per_second, capacity=max(1, requests_per_second), clock=clock)
+        self.quota = DailyQuota(requests_per_day, ledger_file=ledger_file)
+        self.lock = threading.Lock()
+        self.request_no = 0
+        self.failure_no = 0
+
+    @property
+    def rate(self) -> float:
+        """float: The current request rate (requests per second)"""
+        return self.bucket.rate
+
+    def reserve(self):
+        """ Method reserves a request of the daily quota and a token of the bucket
+
+        Returns:
+            The time in seconds to wait before the request may be sent, or None if the daily quota is exhausted
+        """
+        reservation = self.reservation()
+        return None if reservation is None else self.bucket.remaining_wait(reservation)
+
+    def reservation(self):
+        """ Method reserves a request of the daily quota and a token of the bucket
+
+        Returns:
+            The token reservation (see TokenBucket.reservation()), or None if the daily quota is exhausted
+        """
+        if not self.quota.reserve():
+            return None
+        with self.lock:
+            self.request_no = self.request_no + 1
+        return self.bucket.reservation()
+
+    def acquire_blocking(self) -> bool:
+        """ Method reserves a request, sleeping until it may be sent
+
+        Returns:
+            True once the request may be sent, False if the daily quota is exhausted
+        """
+        reservation = self.reservation()
+        if reservation is None:
+            return False
+        wait = self.bucket.remaining_wait(reservation)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.bucket.remaining_wait(reservation)  # A pause may have deferred the reservation while waiting
+        return True
+
+    async def acquire(self) -> bool:
+        """ Method reserves a request, asynchronously sleeping until it may be sent
+
+        Returns:
+            True once the request may be sent, False if the daily quota is exhausted
+        """
+        reservation = self.reservation()
+        if reservation is None:
+            return False
+        wait = self.bucket.remaining_wait(reservation)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self.bucket.remaining_wait(reservation)  # A pause may have deferred the reservation while waiting
+        return True
+
+    def record_success(self):
+        """ Method additively recovers the request rate after a successful request"""
+        with self.lock:
+            self.bucket.set_rate(min(self.max_rate, self.bucket.rate + self.recovery_step))
+
+    def record_failure(self):
+        """ Method multiplicatively decreases the request rate after a failed (throttled) request"""
+        with self.lock:
+            self.failure_no = self.failure_no + 1
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate * self.decrease_factor))
+
+    def pause(self, seconds):
+        """ Method pauses all requests sharing the rate limiter for seconds, including requests already waiting for
+        their token (for example, after a Retry-After header)"""
+        self.bucket.pause(seconds)
+
+    def remaining_quota(self) -> int:
+        """ Method returns the number of requests remaining of the daily quota"""
+        return self.quota.remaining()
@@ -0,0 +1,166 @@
+import numpy as np
+
+from src.features.ElevationCache import coordinate_keys, key_coordinates
+from src.features.SpatialIndex import SpatialIndex
+
+
+class RequestPlanner:
+    """ Planner of elevation API requests, resolving as many observations as possible with each request.
+
+    Observation coordinates are deduplicated across the whole dataset by their (rounded) coordinate keys, such that
+    each location is requested once, and its elevation fanned out to all observations sharing the location.
+    Locations are planned in key order (grouping nearby locations), and each request is packed with up to
+    request_parameter_limit locations still unresolved. Before a location is packed, it is resolved from the elevation
+    cache (identical rounded coordinates, or recorded elevations within the similarity radius), such that elevations
+    recorded by earlier requests of the run are reused. Locations within the similarity radius of a location already
+    in flight are deferred, until the elevation of the location in flight is recorded (see record()) or abandoned
+    (see abandon()), such that neighbouring locations are not requested together.
+
+    Args:
+        latitudes (ndarray): Float latitudes of the observations
+        longitudes (ndarray): Float longitudes corresponding to the latitudes
+        cache (ElevationCache): Recorded elevations
+        request_parameter_limit (int): Maximum number of locations per request
+        similarity_radius (float): Distance in metres within which recorded elevations are reused (0 disables reuse
+            beyond identical rounded coordinates)
+        interpolation_neighbours (int): Number of nearest recorded elevations interpolated (see ElevationCache.nearby())
+    """
+
+    def __init__(self, latitudes, longitudes, cache, request_parameter_limit=100, similarity_radius=0,
+                 interpolation_neighbours=1):
+        self.cache = cache
+        self.request_parameter_limit = request_parameter_limit
+        self.similarity_radius = similarity_radius
+        self.interpolation_neighbours = interpolation_neighbours
+
+        keys = coordinate_keys(latitudes, longitudes, cache.coordinate_accuracy)
+        self.keys, self.observation_locations = np.unique(keys, return_inverse=True)
+        self.observation_counts = np.bincount(self.observation_locations, minlength=self.keys.shape[0])
+        self.latitudes, self.longitudes = key_coordinates(self.keys, cache.coordinate_accuracy)
+        self.elevations = np.full(self.keys.shape[0], np.nan)
+        self.cursor = 0
+        self.deferred = np.empty(0, dtype=np.int64)
+        self.in_flight = np.empty(0, dtype=np.int64)
+        self.resolved_locations = []
+        self.resolved_observations = 0
+        self.location_observations = None
+        self.location_starts = None
+
+    @property
+    def total_observations(self) -> int:
+        """int: The number of planned observations"""
+        return self.observation_locations.shape[0]
+
+    def next_request(self) -> np.ndarray:
+        """ Method packs the next request with unresolved locations, resolving cached locations along the way
+
+        Deferred locations are reconsidered first, followed by the locations not yet planned.
+
+        Returns:
+            The positions of the requested locations (see coordinates() and record()), empty once all locations are
+            planned, or only deferred locations remain.
+        """
+        request = np.empty(0, dtype=np.int64)
+        candidates, self.deferred = self.deferred, np.empty(0, dtype=np.int64)
+        while True:
+            elevations = self.cached_elevations(candidates)
+            cached = ~np.isnan(elevations)
+            self.record(candidates[cached], elevations[cached])
+            candidates = candidates[~cached]
+
+            if self.similarity_radius > 0:  # Defer locations neighbouring locations in flight
+                neighbouring = self.neighbouring(candidates, np.concatenate([self.in_flight, request]))
+                self.deferred = np.concatenate([self.deferred, candidates[neighbouring]])
+                candidates = candidates[~neighbouring]
+
+            packed = candidates[:self.request_parameter_limit - request.shape[0]]
+            request = np.concatenate([request, packed])
+            self.deferred = np.concatenate([self.deferred, candidates[packed.shape[0]:]])
+            if request.shape[0] == self.request_parameter_limit or self.cursor == self.keys.shape[0]:
+                break
+
+            candidates = np.arange(self.cursor, min(self.keys.shape[0],
+                                                    self.cursor + self.request_parameter_limit - request.shape[0]))
+            self.cursor = self.cursor + candidates.shape[0]
+
+        self.in_flight = np.concatenate([self.in_flight, request])
+        return request
+
+    def neighbouring(self, candidates, pending) -> np.ndarray:
+        """ Method determines the candidate locations within the similarity radius of a pending location, or of an
+        earlier candidate location
+
+        Args:
+            candidates (ndarray): Positions of the candidate locations
+            pending (ndarray): Positions of the pending (requested) locations
+
+        Returns:
+            A boolean array, True where the corresponding candidate is to be deferred
+        """
+        if candidates.shape[0] == 0:
+            return np.zeros(0, dtype=bool)
+
+        locations = np.concatenate([pending, candidates])
+        index = SpatialIndex(cell_size=self.similarity_radius)
+        index.add(self.latitudes[locations], self.longitudes[locations], np.arange(locations.shape[0]))
+        queries, neighbours, _ = index.query(self.latitudes[candidates], self.longitudes[candidates],
+                                             self.similarity_radius, neighbours=locations.shape[0])
+        earlier = neighbours < pending.shape[0] + queries  # Pending locations, or earlier candidates
+        return np.bincount(queries[earlier], minlength=candidates.shape[0]) > 0
+
+    def cached_elevations(self, positions) -> np.ndarray:
+        """ Method determines the recorded elevations of locations, NaN where no elevation is recorded"""
+        latitudes, longitudes = self.latitudes[positions], self.longitudes[positions]
+        elevations = self.cache.lookup(latitudes, longitudes)
+        unrecorded = np.isnan(elevations)
+        if self.similarity_radius > 0 and unrecorded.any():  # Reuse elevations of nearby recorded locations
+            elevations[unrecorded] = self.cache.nearby(latitudes[unrecorded], longitudes[unrecorded],
+                                                       self.similarity_radius, self.interpolation_neighbours)
+        return elevations
+
+    def coordinates(self, positions) -> tuple:
+        """ Method returns the latitudes and longitudes (lists) of locations, as request parameters"""
+        return self.latitudes[positions].tolist(), self.longitudes[positions].tolist()
+
+    def record(self, positions, elevations):
+        """ Method records the elevations of locations, resolving all observations at the locations
+
+        Args:
+            positions (ndarray): Positions of the locations
+            elevations (array-like): Elevations corresponding to the locations. Missing (None) elevations remain
+                unresolved.
+        """
+        elevations = np.asarray(elevations, dtype=np.float64)
+        self.abandon(positions)
+        self.elevations[positions] = elevations
+        self.resolved_locations.append(np.asarray(positions)[~np.isnan(elevations)])
+        self.resolved_observations = self.resolved_observations + \
+            self.observation_counts[positions][~np.isnan(elevations)].sum()
+
+    def abandon(self, positions):
+        """ Method removes locations from the locations in flight, such that deferred neighbouring locations can be
+        requested (for example after a failed request). The abandoned locations remain unresolved."""
+        if self.in_flight.shape[0] > 0:
+            self.in_flight = self.in_flight[~np.isin(self.in_flight, positions)]
+
+    def pop_resolved_observations(self) -> tuple:
+        """ Method returns the observations resolved since the previous call (for checkpointing)
+
+        Returns:
+            The positions of the resolved observations (in planned observation order), and their elevations
+        """
+        locations = np.concatenate(self.resolved_locations) if self.resolved_locations else np.empty(0, dtype=np.int64)
+        self.resolved_locations = []
+        if self.location_observations is None:  # Observations grouped by location, built on first use
+            self.location_observations = np.argsort(self.observation_locations, kind='stable')
+            self.location_starts = np.cumsum(self.observation_counts) - self.observation_counts
+
+        counts = self.observation_counts[locations]
+        total = counts.sum()
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        observations = self.location_observations[np.repeat(self.location_starts[locations], counts) + offsets]
+        return observations, self.elevations[self.observation_locations[observations]]
+
+    def observation_elevations(self) -> np.ndarray:
+        """ Method returns the elevations of the observations (in planned observation order), NaN where unresolved"""
+        return self.elevations[self.observation_locations]
@@ -0,0 +1,111 @@
+import numpy as np
+
+earth_radius = 6371000
+"""int: Mean radius of the earth in metres"""
+minimum_cell_size = 10
+"""float: Minimum grid cell size in metres, such that cell coordinates are packed within 21 bits each"""
+
+
+class SpatialIndex:
+    """ Spatial index of points, answering 'points within a radius' queries for batches of coordinates.
+
+    Coordinates are projected to earth-centred cartesian coordinates in metres, such that straight-line distances
+    approximate great-circle distances (within millimetres at distances of hundreds of metres) everywhere, including
+    near the poles and the antimeridian.
+    Points are bucketed into a grid of cubic cells. The packed cell keys of the points are kept sorted, such that the
+    points of a cell form a contiguous range, found through a binary search (searchsorted). A query examines the cells
+    surrounding each coordinate within the radius.
+
+    Args:
+        cell_size (float): Edge length of the grid cells in metres. Queries are most efficient for radii up to the cell
+            size.
+    """
+
+    def __init__(self, cell_size=50):
+        self.cell_size = max(cell_size, minimum_cell_size)
+        self.cells = np.empty(0, dtype=np.int64)
+        self.points = np.empty((0, 3))
+        self.ids = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    def add(self, latitudes, longitudes, ids):
+        """ Method adds points to the index
+
+        Args:
+            latitudes (array-like): Float latitudes of the points
+            longitudes (array-like): Float longitudes corresponding to the latitudes
+            ids (array-like): Integer ids of the points, returned by queries
+        """
+        points = cartesian_coordinates(latitudes, longitudes)
+        cells = self.cell_keys(np.floor(points / self.cell_size).astype(np.int64))
+        order = np.argsort(cells, kind='stable')
+        positions = np.searchsorted(self.cells, cells[order], side='right')
+
+        self.cells = np.insert(self.cells, positions, cells[order])
+        self.points = np.insert(self.points, positions, points[order], axis=0)
+        self.ids = np.insert(self.ids, positions, np.asarray(ids, dtype=np.int64)[order])
+
+    def query(self, latitudes, longitudes, radius, neighbours=1) -> tuple:
+        """ Method determines the nearest points within radius of each coordinate
+
+        Args:
+            latitudes (array-like): Float latitudes to be queried
+            longitudes (array-like): Float longitudes corresponding to the latitudes
+            radius (float): Maximum distance in metres
+            neighbours (int): Maximum number of points returned per coordinate
+
+        Returns:
+            Arrays of the query positions (indices into the coordinates), point ids, and distances in metres of the
+            points found, ordered by query position and distance.
+        """
+        points = cartesian_coordinates(latitudes, longitudes)
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+        if self.ids.shape[0] == 0 or points.shape[0] == 0:
+            return empty
+
+        reach = int(np.ceil(radius / self.cell_size))
+        steps = np.arange(-reach, reach + 1)
+        offsets = np.stack(np.meshgrid(steps, steps, steps, indexing='ij'), axis=-1).reshape(-1, 3)
+        cells = np.floor(points / self.cell_size).astype(np.int64)
+        neighbour_cells = self.cell_keys((cells[:, None, :] + offsets[None, :, :]).reshape(-1, 3))
+
+        starts = np.searchsorted(self.cells, neighbour_cells, side='left')  # Point range of each neighbouring cell
+        counts = np.searchsorted(self.cells, neighbour_cells, side='right') - starts
+        total = counts.sum()
+        if total == 0:
+            return empty
+
+        range_starts = np.repeat(np.cumsum(counts) - counts, counts)  # Expand the ranges into candidate positions
+        candidates = np.repeat(starts, counts) + np.arange(total) - range_starts
+        queries = np.repeat(np.arange(neighbour_cells.shape[0]) // offsets.shape[0], counts)
+
+        distances = np.linalg.norm(self.points[candidates] - points[queries], axis=1)
+        within = distances <= radius
+        queries, candidates, distances = queries[within], candidates[within], distances[within]
+
+        order = np.lexsort((distances, queries))  # Nearest first within each query
+        queries, candidates, distances = queries[order], candidates[order], distances[order]
+        first = np.searchsorted(queries, queries, side='left')  # Rank of each point within its query
+        nearest = np.arange(queries.shape[0]) - first < neighbours
+        return queries[nearest], self.ids[candidates[nearest]], distances[nearest]
+
+    @staticmethod
+    def cell_keys(cells) -> np.ndarray:
+        """ Method packs integer cell coordinates (an (n, 3) array) into int64 keys, 21 bits per coordinate"""
+        shifted = cells + 2 ** 20
+        return (shifted[:, 0] << 42) | (shifted[:, 1] << 21) | shifted[:, 2]
+
+
+def cartesian_coordinates(latitudes, longitudes) -> np.ndarray:
+    """Method projects coordinates to earth-centred cartesian coordinates (a spherical earth) in metres
+
+    Returns:
+        An (n, 3) array of x, y, z coordinates
+    """
+    latitudes = np.radians(np.asarray(latitudes, dtype=np.float64))
+    longitudes = np.radians(np.asarray(longitudes, dtype=np.float64))
+    return earth_radius * np.column_stack([np.cos(latitudes) * np.cos(longitudes),
+                                           np.cos(latitudes) * np.sin(longitudes),
+                                           np.sin(latitudes)])
@@ -0,0 +1,108 @@
+import sys
+import time
+from datetime import timedelta
+
+
+class ProgressTracker:
+    """ Progress and throughput metrics of a long running stage, shared by the cleaning pipeline and feature extraction.
+
+    Stages report the rows they complete (and any named counters) incrementally through update(), such that progress
+    never requires scanning the data. The progress bar is redrawn at most once every redraw_interval seconds, however
+    frequently updates arrive, and displays the throughput (rows per second) and the estimated time remaining.
+    Without a total (for example when streaming), the completed rows and throughput are displayed without a bar.
+
+    Args:
+        total (int): The total number of rows of the stage, if known
+        label (str): Description of the rows (for example 'observations')
+        redraw_interval (float): Minimum number of seconds between redraws
+        output (file): Stream the progress bar is drawn to. Progress is tracked without drawing if None.
+        clock (function): Monotonic clock in seconds, replaceable for testing purposes
+    """
+
+    progress_bar_length = 100
+    """int: Number of characters of the progress bar"""
+
+    def __init__(self, total=None, label='rows', redraw_interval=0.5, output=sys.stdout, clock=time.monotonic):
+        self.total = total
+        self.label = label
+        self.redraw_interval = redraw_interval
+        self.output = output
+        self.clock = clock
+        self.start = clock()
+        self.last_draw = None
+        self.rows = 0
+        self.counters = dict()
+
+    def update(self, rows=0, **counters):
+        """ Method records completed rows and increments named counters, redrawing the progress bar if due
+
+        Args:
+            rows (int): The number of rows completed since the previous update
+            counters (int): Increments of named counters (for example requests=4)
+        """
+        self.rows = self.rows + rows
+        for name, increment in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + increment
+        self.draw()
+
+    def elapsed(self) -> float:
+        """ Method returns the number of seconds since the stage started"""
+        return self.clock() - self.start
+
+    def rows_per_second(self) -> float:
+        """ Method returns the average throughput of the stage"""
+        elapsed = self.elapsed()
+        return self.rows / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """ Method estimates the number of seconds remaining, at the average throughput of the stage
+
+        Returns:
+            The estimated seconds remaining, or None if the total is unknown or no rows are completed yet
+        """
+        rate = self.rows_per_second()
+        if self.total is None or rate == 0:
+            return None
+        return max(0, self.total - self.rows) / rate
+
+    def metrics(self) -> dict:
+        """ Method returns the progress metrics (rows, total, elapsed seconds, rows per second, eta and counters)"""
+        return {'rows': self.rows, 'total': self.total, 'elapsed': self.elapsed(),
+                'rows_per_second': self.rows_per_second(), 'eta': self.eta(), **self.counters}
+
+    def render(self) -> str:
+        """ Method renders the progress bar and metrics as a single line"""
+        status = '%s: %s' % (self.label, self.rows)
+        if self.total is not None:
+            percentage_complete = min(self.rows / self.total, 1) if self.total > 0 else 1
+            filled = int(self.progress_bar_length * percentage_complete)
+            bar = '=' * filled + '-' * (self.progress_bar_length - filled)
+            status = '[%s] %s%s ... %s / %s' % (bar, round(100 * percentage_complete, 1), '%', status, self.total)
+
+        status = status + ' ... %s rows/s ... running: %s' % (round(self.rows_per_second(), 1),
+                                                              timedelta(seconds=round(self.elapsed())))
+        eta = self.eta()
+        if eta is not None:
+            status = status + ' ... ETA: %s' % timedelta(seconds=round(eta))
+        for name, value in self.counters.items():
+            status = status + ' ... %s: %s' % (name, value)
+        return status
+
+    def draw(self, force=False):
+        """ Method redraws the progress bar, unless it was drawn within the redraw interval (or force is True)"""
+        if self.output is None:
+            return
+        now = self.clock()
+        if not force and self.last_draw is not None and now - self.last_draw < self.redraw_interval:
+            return
+
+        self.last_draw = now
+        self.output.write('\r' + self.render())
+        self.output.flush()
+
+    def finish(self):
+        """ Method draws the final progress of the stage, ending the progress line"""
+        self.draw(force=True)
+        if self.output is not None:
+            self.output.write('\n')
+            self.output.flush()
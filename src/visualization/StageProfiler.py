@@ -0,0 +1,170 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+
+class StageProfiler:
+    """ Per stage, per batch profiling of a pipeline, recording wall time, rows in and out, and peak memory.
+
+    Each execution of a stage is recorded as a sample (batch, stage, seconds, rows_in, rows_out, peak_memory).
+    Stages are timed through the stage() context manager, or, for stages producing an iterator (for example chunked
+    file reads), through iterate(). Samples are summarized per stage by summary(), and exported by export() for
+    regression tracking.
+
+    Peak memory is only traced if trace_memory is set (tracemalloc slows Python allocations considerably). It is the
+    peak memory allocated during the stage, beyond the memory allocated at its start. Stages are not nested.
+
+    Args:
+        trace_memory (bool): Flag to trace the peak memory of each stage
+        clock (function): Monotonic clock in seconds, replaceable for testing purposes
+    """
+
+    sample_columns = ['batch', 'stage', 'seconds', 'rows_in', 'rows_out', 'peak_memory']
+    """list: Fields of each recorded sample"""
+
+    def __init__(self, trace_memory=False, clock=time.perf_counter):
+        self.trace_memory = trace_memory
+        self.clock = clock
+        self.samples = []
+        self.batch_no = None
+        self.started_tracing = False
+
+    def next_batch(self) -> int:
+        """ Method advances the batch number attributed to subsequent samples (samples before the first batch have
+        no batch number)
+
+        Returns:
+            The new batch number
+        """
+        self.batch_no = 0 if self.batch_no is None else self.batch_no + 1
+        return self.batch_no
+
+    def begin(self) -> tuple:
+        """ Method starts measuring a stage
+
+        Returns:
+            The start time, and the memory allocated at the start (None if memory is not traced)
+        """
+        memory = None
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+        return self.clock(), memory
+
+    def end(self, start, stage, rows_in=None, rows_out=None) -> dict:
+        """ Method completes the measurement of a stage, recording its sample
+
+        Args:
+            start (tuple): The start of the stage, returned by begin()
+            stage (str): Name of the stage
+            rows_in (int): The number of rows entering the stage
+            rows_out (int): The number of rows produced by the stage
+
+        Returns:
+            The recorded sample
+        """
+        start_time, start_memory = start
+        seconds = self.clock() - start_time
+        peak_memory = None
+        if start_memory is not None:
+            peak_memory = max(0, tracemalloc.get_traced_memory()[1] - start_memory)
+
+        sample = {'batch': self.batch_no, 'stage': stage, 'seconds': seconds, 'rows_in': rows_in,
+                  'rows_out': rows_out, 'peak_memory': peak_memory}
+        self.samples.append(sample)
+        return sample
+
+    @contextmanager
+    def stage(self, stage, rows=None):
+        """ Context manager profiling the enclosed stage
+
+        Args:
+            stage (str): Name of the stage
+            rows (function): Function returning the current number of rows, evaluated on entering (rows in) and
+                exiting (rows out) the stage
+        """
+        rows_in = None if rows is None else rows()
+        start = self.begin()
+        yield
+        self.end(start, stage, rows_in, None if rows is None else rows())
+
+    def iterate(self, stage, iterable):
+        """ Generator profiling the production of each item of an iterable (for example each chunk of a file read)
+
+        The rows out of each sample are the length of the produced item.
+
+        Args:
+            stage (str): Name of the stage
+            iterable (iterable): The items produced by the stage
+        """
+        iterator = iter(iterable)
+        while True:
+            start = self.begin()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.end(start, stage, rows_out=len(item))
+            yield item
+
+    def add_samples(self, samples):
+        """ Method records samples profiled elsewhere (for example within a worker process), attributing them to the
+        current batch"""
+        self.samples.extend([dict(sample, batch=self.batch_no) for sample in samples])
+
+    def pop_samples(self) -> list:
+        """ Method returns the samples recorded since the previous call, removing them from the profiler"""
+        samples, self.samples = self.samples, []
+        return samples
+
+    def to_frame(self) -> pd.DataFrame:
+        """ Method returns the recorded samples as a DataFrame, one row per sample"""
+        return pd.DataFrame(self.samples, columns=self.sample_columns)
+
+    def summary(self) -> pd.DataFrame:
+        """ Method summarizes the samples per stage (in order of first execution)
+
+        Returns:
+            A DataFrame indexed by stage, of the number of samples, the total and mean seconds, the share of the total
+            profiled time, the total rows in and out, the throughput (the larger of the rows in and out, per second)
+            and the maximum peak memory
+        """
+        samples = self.to_frame()
+        stages = samples.groupby('stage', sort=False)
+        summary = pd.DataFrame({'samples': stages.size(),
+                                'seconds': stages['seconds'].sum(),
+                                'mean_seconds': stages['seconds'].mean(),
+                                'rows_in': stages['rows_in'].sum(min_count=1),
+                                'rows_out': stages['rows_out'].sum(min_count=1),
+                                'peak_memory': stages['peak_memory'].max()})
+        total_seconds = summary['seconds'].sum()
+        summary.insert(3, 'share', summary['seconds'] / total_seconds if total_seconds > 0 else 0.0)
+        rows = summary[['rows_in', 'rows_out']].max(axis=1)
+        summary.insert(6, 'rows_per_second', (rows / summary['seconds']).where(summary['seconds'] > 0))
+        return summary
+
+    def report(self) -> str:
+        """ Method renders the stage summary as a table, with the share as a percentage and peak memory in MB"""
+        summary = self.summary()
+        summary[['seconds', 'mean_seconds']] = summary[['seconds', 'mean_seconds']].round(4)
+        summary['share'] = (100 * summary['share']).round(1).astype(str) + '%'
+        summary[['rows_in', 'rows_out']] = summary[['rows_in', 'rows_out']].round().astype('Int64')
+        summary['rows_per_second'] = summary['rows_per_second'].round(1)
+        summary['peak_memory'] = (summary['peak_memory'] / 2 ** 20).round(1)
+        summary = summary.rename(columns={'peak_memory': 'peak_memory_mb'})
+        return summary.to_string() + '\n'
+
+    def export(self, file):
+        """ Method writes the raw samples to a CSV file, for comparison between runs"""
+        self.to_frame().to_csv(file, index=False)
+
+    def stop(self):
+        """ Method stops memory tracing, if started by the profiler"""
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
@@ -0,0 +1,48 @@
+import unittest
+
+import pandas as pd
+
+from src.data.BadObservationClassifier import BadObservationClassifier
+
+descriptions = pd.Series(['Really bad picture but there’s one in there ',
+                          'Caught in pitfall trap, guided by drift fence. Field techniques',
+                          'Swimming in the pool',
+                          'Seen on a broad path near the Roadkill sign',
+                          'Crossing a gravel ROAD, road-kill later',
+                          None,
+                          'Spooky dusk sighting',
+                          ''])
+
+
+class TestBadObservationClassifier(unittest.TestCase):
+    def test_classification(self):
+        classifier = BadObservationClassifier()
+        matches = classifier.classify(descriptions).tolist()
+
+        # Testing
+        self.assertTrue(matches == [True, True, True, True, True, False, False, False])
+
+    def test_word_boundaries(self):
+        classifier = BadObservationClassifier(keywords=['poo', 'road'])
+        matches = classifier.classify(descriptions).tolist()
+
+        # Testing ('pool', 'broad', 'Roadkill' and 'Spooky' are not whole word matches)
+        self.assertTrue(matches == [False, False, False, False, True, False, False, False])
+
+    def test_hit_counts(self):
+        classifier = BadObservationClassifier()
+        classifier.classify(descriptions)
+        classifier.classify(descriptions.iloc[:1])
+        hit_counts = classifier.pop_hit_counts()
+
+        # Testing
+        self.assertTrue(hit_counts['bad'] == 2)
+        self.assertTrue(hit_counts['road'] == 1)
+        self.assertTrue(hit_counts['road-kill'] == 1)
+        self.assertTrue(hit_counts['roadkill'] == 1)
+        self.assertTrue('poo' not in hit_counts)
+        self.assertTrue(len(classifier.hit_counts) == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from benchmarks.ObservationGenerator import generate_observations, raw_data_columns
+from benchmarks.PipelineBenchmark import benchmark_cleaning, benchmark_elevation, compare_results
+from src.features import Elevation, OpenMeteoApiTimer
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_generated_observations(self):
+        df = generate_observations(2000, seed=1)
+
+        # Testing
+        self.assertTrue(df.columns.tolist() == raw_data_columns)
+        self.assertTrue(df.equals(generate_observations(2000, seed=1)))  # Seeded observations are reproducible
+        self.assertTrue(df['id'].duplicated().any() and df['description'].notna().any())
+        self.assertTrue(df['latitude'].between(-90, 90).all() and df['longitude'].between(-180, 180).all())
+
+    def test_benchmark_runs(self):
+        elevation_cache_file = Elevation.elevation_cache_file
+        rate_limiter = OpenMeteoApiTimer.rate_limiter
+        cleaning = benchmark_cleaning(2000)
+        elevation = benchmark_elevation(500)
+
+        # Testing
+        stages = [stage['stage'] for stage in cleaning['stages']]
+        self.assertTrue(stages[0] == 'aggregate_observations' and 'generate_local_times' in stages)
+        self.assertTrue(0 < cleaning['interim_rows'] < 2000)
+        self.assertTrue(elevation['resolved_rows'] == 500 and elevation['requests'] > 0)
+        self.assertTrue(Elevation.elevation_cache_file == elevation_cache_file)  # Configuration is restored
+        self.assertTrue(OpenMeteoApiTimer.rate_limiter is rate_limiter)
+
+        cleaning['environment'] = {'commit': 'abc1234'}
+        self.assertTrue('speedup: 1.00x' in compare_results(cleaning, cleaning))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,18 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import numpy as np
 import pandas as pd
 import unittest
 
-from src.data.DataCleanPipeline import Pipeline
+from src.data.DataCleanPipeline import Pipeline, batch_ranges
+from src.data.Storage import CsvStorage
+from src.data.TimeModel import format_dates, format_local_times
+from src.data.TimezoneResolver import TimezoneResolver
+from src.visualization.StageProfiler import StageProfiler
 
 # Test data retrieved from observations_1.csv and observations_6 (modified to include errors here)
 test_data = [
@@ -61,6 +72,29 @@ raw_data_columns = ['id', 'observed_on', 'latitude', 'longitude', 'time_observed
 
 test_df = pd.DataFrame(test_data, columns=raw_data_columns)
 
+# Rough bounding boxes of Australia and Spain as stand-in country boundaries
+test_boundaries = {'type': 'FeatureCollection', 'features': [
+    {'type': 'Feature', 'properties': {'name': 'Australia'},
+     'geometry': {'type': 'Polygon', 'coordinates': [[[113, -44], [154, -44], [154, -10], [113, -10]]]}},
+    {'type': 'Feature', 'properties': {'name': 'Spain'},
+     'geometry': {'type': 'Polygon', 'coordinates': [[[-9.5, 36], [3.3, 36], [3.3, 43.8], [-9.5, 43.8]]]}}]}
+
+
+def process_fallback(latitudes, longitudes):
+    """Stand-in country fallback, resolving coordinates to the id of the process calling the fallback"""
+    return np.full(len(latitudes), str(os.getpid()), dtype=object)
+
+
+class CapturingPipeline(Pipeline):
+    """Pipeline capturing the written batches (written), instead of writing interim data"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written = []
+
+    def write_interim_data(self):
+        self.written.append(self.df)
+
 
 class TestCleaningPipeline(unittest.TestCase):
     def setup(self):
@@ -69,6 +103,33 @@ class TestCleaningPipeline(unittest.TestCase):
         pipeline.batching()
         return pipeline
 
+    def run_on_directory(self, raw_path, interim_path, **kwargs):  # Pipeline processing the raw files of raw_path
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline = Pipeline(**kwargs)
+            pipeline.resource_path = raw_path
+            pipeline.write_path = interim_path
+            pipeline.storage = CsvStorage(pipeline.write_path)
+            pipeline.interim_exists = pipeline.storage.exists(Pipeline.interim_dataset)
+            pipeline.bad_data_exists = pipeline.storage.exists(Pipeline.bad_dataset)
+            pipeline.timezone_resolver = TimezoneResolver(grid_size=Pipeline.timezone_grid_size)
+            pipeline.activate_flow()
+        return pipeline
+
+    def test_batching(self):
+        # Pipeline
+        pipeline = Pipeline(test_df=test_df)
+        pipeline.batch_size = 3
+        batch_lengths = []
+        while pipeline.batching():
+            batch_lengths.append(len(pipeline.df.index))
+            pipeline.df['observed_on'] = None  # Batches are owned, and do not alter df_whole
+
+        # Testing
+        self.assertTrue(batch_lengths == [3, 3, 2])
+        self.assertTrue(pipeline.df_whole.empty)
+        self.assertTrue(batch_ranges(8, 3).tolist() == [[0, 3], [3, 6], [6, 8]])
+        self.assertTrue(batch_ranges(0, 3).tolist() == [])
+
     def test_unique_id(self):
         # Pipeline
         pipeline = self.setup()
@@ -112,7 +173,7 @@ class TestCleaningPipeline(unittest.TestCase):
         # Pipeline
         pipeline = self.setup()
         pipeline.format_observation_dates()
-        resulting_formatted_dates = pipeline.df['observed_on'].tolist()
+        resulting_formatted_dates = format_dates(pipeline.df['observed_on']).tolist()
 
         # Testing
         correct_dates = ['2022-08-02', '2022-08-02', '2022-08-02',
@@ -134,6 +195,39 @@ class TestCleaningPipeline(unittest.TestCase):
         self.assertTrue(countries[6] == 'Namibia')
         self.assertTrue(countries[7] == 'Australia')
 
+    def test_offline_country_resolution(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, Pipeline.country_boundaries_file), 'w') as f:
+                f.write(json.dumps(test_boundaries))
+
+            # Pipeline
+            pipeline = self.setup()
+            pipeline.country_resolver = pipeline.create_country_resolver(directory + '/')
+            pipeline.clean_batch()
+            countries = pipeline.df['country'].tolist()
+        unresolved_pipeline = self.setup()  # Without country boundaries
+        unresolved_pipeline.clean_batch()
+
+        # Testing
+        self.assertTrue(countries == ['Australia', 'Spain', None, None])  # Rows remaining after cleaning
+        self.assertTrue(unresolved_pipeline.df.columns.equals(pipeline.df.columns))  # Identical interim schema
+        self.assertTrue(unresolved_pipeline.df['country'].isna().all())
+        self.assertTrue(pipeline.create_country_resolver(directory + '/') is None)  # Boundaries no longer exist
+
+    def test_stage_profile(self):
+        # Pipeline
+        pipeline = self.setup()
+        pipeline.profiler.next_batch()
+        pipeline.clean_batch()
+        samples = pipeline.profiler.to_frame().set_index('stage')
+
+        # Testing
+        self.assertTrue(samples.index.tolist() == ['identify_bad_observations', 'format_observation_dates',
+                                                   'generate_local_times', 'remove_peripheral_columns'])
+        self.assertTrue(samples.loc['identify_bad_observations', 'rows_in'] == 8)
+        self.assertTrue(samples.loc['remove_peripheral_columns', 'rows_out'] == 4)
+        self.assertTrue((samples['batch'] == 0).all() and (samples['seconds'] >= 0).all())
+
     def test_timezone_standardization(self):
         # Pipeline
         pipeline = self.setup()
@@ -153,7 +247,10 @@ class TestCleaningPipeline(unittest.TestCase):
         # Pipeline
         pipeline = self.setup()
         pipeline.generate_local_times()
-        local_times = pipeline.df['local_time_observed_at'].tolist()
+        local_times = format_local_times(pipeline.df['local_time_observed_at'], pipeline.df['utc_offset']).tolist()
+        apply_pipeline = self.setup()
+        apply_pipeline.vectorized_local_times = False
+        apply_pipeline.generate_local_times()
 
         # Testing
         # Correct times confirmed using https://dateful.com/convert/utc
@@ -162,6 +259,20 @@ class TestCleaningPipeline(unittest.TestCase):
                          '2022-08-02 13:32:23+12:00', '2022-08-02 01:14:59-06:00',
                          '2022-08-02 10:11:57+02:00', '2020-02-02 10:04:35+11:00']
         self.assertTrue(set(local_times) == set(correct_times))
+        self.assertTrue(str(pipeline.df['local_time_observed_at'].dtype) == 'datetime64[ns]')
+        self.assertTrue(pipeline.df['utc_offset'].tolist() == [600, 120, 120, 720, 720, -360, 120, 660])
+        self.assertTrue(apply_pipeline.df[['local_time_observed_at', 'utc_offset']].equals(
+            pipeline.df[['local_time_observed_at', 'utc_offset']]))
+
+    def test_vectorized_local_times(self):
+        # Pipeline
+        pipeline = self.setup()
+        pipeline.standardize_timezones()
+        apply_times = pipeline.convert_local_times_apply(pipeline.df).tolist()
+        vectorized_times = pipeline.convert_local_times_vectorized(pipeline.df).tolist()
+
+        # Testing
+        self.assertTrue(apply_times == vectorized_times)
 
     def test_bad_observation_identification(self):
         # Pipeline
@@ -194,11 +305,155 @@ class TestCleaningPipeline(unittest.TestCase):
         df_columns = pipeline.df.columns.tolist()
 
         # Testing
-        correct_columns = ['observed_on', 'local_time_observed_at', 'latitude', 'longitude',
+        correct_columns = ['observed_on', 'local_time_observed_at', 'utc_offset', 'latitude', 'longitude', 'country',
                            'positional_accuracy', 'public_positional_accuracy', 'image_url', 'license', 'geoprivacy',
                            'taxon_geoprivacy', 'scientific_name', 'common_name', 'taxon_id']
         self.assertTrue(set(df_columns) == set(correct_columns))
 
+    def test_parallel_flow(self):
+        # Pipelines (capturing written batches)
+        sequential_pipeline = CapturingPipeline(test_df=test_df)
+        parallel_pipeline = CapturingPipeline(test_df=test_df, workers=2)
+        for pipeline in [sequential_pipeline, parallel_pipeline]:
+            pipeline.batch_size = 2
+            pipeline.activate_flow()
+
+        # Testing
+        sequential_df = pd.concat(sequential_pipeline.written)
+        parallel_df = pd.concat(parallel_pipeline.written)
+        self.assertTrue(len(parallel_pipeline.written) == len(sequential_pipeline.written))
+        self.assertTrue(parallel_df.equals(sequential_df))
+
+    def test_parallel_worker_settings(self):
+        # Pipelines (capturing written batches), with settings changed from the class defaults
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, Pipeline.country_boundaries_file), 'w') as f:
+                f.write(json.dumps(test_boundaries))
+
+            sequential_pipeline = CapturingPipeline(test_df=test_df)
+            parallel_pipeline = CapturingPipeline(test_df=test_df, workers=2)
+            for pipeline in [sequential_pipeline, parallel_pipeline]:
+                pipeline.batch_size = 2
+                pipeline.vectorized_local_times = False
+                pipeline.country_resolver = pipeline.create_country_resolver(directory + '/')
+                pipeline.profiler = StageProfiler(trace_memory=True)
+                pipeline.activate_flow()
+
+        # Testing
+        sequential_df = pd.concat(sequential_pipeline.written)
+        parallel_df = pd.concat(parallel_pipeline.written)
+        worker_samples = parallel_pipeline.profiler.to_frame()
+        worker_samples = worker_samples[worker_samples['stage'] == 'coordinate_to_country']
+        self.assertTrue(parallel_df.equals(sequential_df))
+        self.assertTrue(parallel_df['country'].tolist() == ['Australia', 'Spain', None, None])
+        self.assertTrue(not worker_samples.empty and worker_samples['peak_memory'].notna().all())
+
+    def test_parallel_country_fallback(self):
+        # Pipelines (capturing written batches), with the country fallback enabled
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, Pipeline.country_boundaries_file), 'w') as f:
+                f.write(json.dumps(test_boundaries))
+
+            sequential_pipeline = CapturingPipeline(test_df=test_df)
+            parallel_pipeline = CapturingPipeline(test_df=test_df, workers=2)
+            for pipeline in [sequential_pipeline, parallel_pipeline]:
+                pipeline.batch_size = 2
+                pipeline.country_resolver = pipeline.create_country_resolver(directory + '/')
+                pipeline.country_resolver.fallback = process_fallback
+                pipeline.activate_flow()
+
+        # Testing (the fallback is only called by the parent process)
+        sequential_df = pd.concat(sequential_pipeline.written)
+        parallel_df = pd.concat(parallel_pipeline.written)
+        self.assertTrue(parallel_df.equals(sequential_df))
+        self.assertTrue(parallel_df['country'].tolist() == ['Australia', 'Spain', str(os.getpid()), str(os.getpid())])
+
+    def test_streaming_flow(self):
+        # Pipelines (capturing written batches)
+        aggregate_pipeline = CapturingPipeline(test_df=test_df)
+        streaming_pipeline = CapturingPipeline(test_df=test_df, stream=True)
+        streaming_pipeline.chunk_size = 3  # Duplicate id 129076855 spans two chunks
+        for pipeline in [aggregate_pipeline, streaming_pipeline]:
+            pipeline.activate_flow()
+
+        # Testing (categories differ between streamed chunks, such that categorical columns are compared as values)
+        aggregate_df = pd.concat([df.astype(object) for df in aggregate_pipeline.written])
+        streaming_df = pd.concat([df.astype(object) for df in streaming_pipeline.written])
+        self.assertTrue(streaming_df.index.is_unique)
+        self.assertTrue(streaming_df.sort_index().equals(aggregate_df.sort_index()))
+
+    def test_incremental_flow(self):
+        with tempfile.TemporaryDirectory() as directory:
+            def run_incremental():
+                return self.run_on_directory(raw_path, interim_path, incremental=True)
+
+            raw_path, interim_path = directory + '/raw/', directory + '/interim/'
+            os.makedirs(raw_path)
+            os.makedirs(interim_path)
+            test_df.iloc[:4].to_csv(raw_path + 'observations_1.csv', index=False)
+            first_pipeline = run_incremental()
+            first_rows = len(CsvStorage(interim_path).read(Pipeline.interim_dataset).index)
+            test_df.iloc[4:].to_csv(raw_path + 'observations_2.csv', index=False)  # New daily export
+            second_pipeline = run_incremental()
+            os.utime(raw_path + 'observations_1.csv', ns=(0, 10 ** 9))  # Touched, but not modified
+            third_pipeline = run_incremental()
+            interim_df = CsvStorage(interim_path).read(Pipeline.interim_dataset)
+            with open(interim_path + Pipeline.raw_manifest_file) as f:
+                touched_entry = json.loads(f.read())['files']['observations_1.csv']
+
+            os.remove(interim_path + Pipeline.raw_manifest_file)  # Existing archive without a manifest
+            fourth_pipeline = run_incremental()  # No new rows remain after continuation
+
+            # Testing
+            self.assertTrue(first_pipeline.datasets == ['observations_1.csv'])
+            self.assertTrue(second_pipeline.datasets == ['observations_2.csv'])  # Only the new file is processed
+            self.assertTrue(third_pipeline.datasets == [])
+            self.assertTrue(len(interim_df.index) > first_rows and interim_df.index.is_unique)
+            self.assertTrue(set(third_pipeline.manifest.entries) == {'observations_1.csv', 'observations_2.csv'})
+            self.assertTrue(touched_entry['mtime'] == 10 ** 9)  # Refreshed entries are persisted
+            self.assertTrue(fourth_pipeline.datasets == ['observations_1.csv', 'observations_2.csv'])
+            self.assertTrue(fourth_pipeline.df_whole.empty)
+            self.assertTrue(os.path.isfile(interim_path + Pipeline.raw_manifest_file))
+            self.assertTrue(run_incremental().datasets == [])
+
+    def test_resume_index(self):
+        with tempfile.TemporaryDirectory() as directory:
+            def run_resumed():
+                return self.run_on_directory(directory + '/', directory + '/', datasets=['observations_1.csv']).storage
+
+            def index_file(dataset):
+                return os.path.join(directory, dataset + Pipeline.processed_index_suffix)
+
+            def pending_file(dataset):
+                return os.path.join(directory, dataset + Pipeline.pending_index_suffix)
+
+            test_df.to_csv(os.path.join(directory, 'observations_1.csv'), index=False)
+            storage = run_resumed()
+            interim_ids = storage.read(Pipeline.interim_dataset, columns=[]).index
+            bad_ids = storage.read(Pipeline.bad_dataset, columns=[]).index
+            pending_after_run = [os.path.isfile(pending_file(dataset))
+                                 for dataset in [Pipeline.interim_dataset, Pipeline.bad_dataset]]
+
+            open(index_file(Pipeline.interim_dataset), 'w').close()  # Rows written, but ids not indexed (interrupted)
+            open(pending_file(Pipeline.interim_dataset), 'w').close()
+            storage = run_resumed()
+            resumed_interim_ids = storage.read(Pipeline.interim_dataset, columns=[]).index
+            rebuilt_index = np.fromfile(index_file(Pipeline.interim_dataset), dtype='<i8')
+
+            os.remove(storage.location(Pipeline.bad_dataset))  # Only the bad quality data is deleted
+            storage = run_resumed()
+            rewritten_bad_ids = storage.read(Pipeline.bad_dataset, columns=[]).index
+            final_interim_ids = storage.read(Pipeline.interim_dataset, columns=[]).index
+
+            # Testing
+            self.assertTrue(len(interim_ids) > 0 and len(bad_ids) > 0)
+            self.assertTrue(pending_after_run == [False, False])
+            self.assertTrue(resumed_interim_ids.equals(interim_ids))  # Not written again
+            self.assertTrue(sorted(rebuilt_index.tolist()) == sorted(interim_ids.tolist()))
+            self.assertTrue(not os.path.isfile(pending_file(Pipeline.interim_dataset)))
+            self.assertTrue(sorted(rewritten_bad_ids.tolist()) == sorted(bad_ids.tolist()))
+            self.assertTrue(final_interim_ids.equals(interim_ids))
+
 
 if __name__ == '__main__':
     unittest.main()
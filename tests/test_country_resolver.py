@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.data.CountryResolver import CountryResolver
+
+# Stand-in country boundaries: A square with a lake (hole), an archipelago (multipolygon) and a triangle
+boundaries = {'type': 'FeatureCollection', 'features': [
+    {'type': 'Feature', 'properties': {'name': 'Squareland'},
+     'geometry': {'type': 'Polygon', 'coordinates': [[[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+                                                     [[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]]]}},
+    {'type': 'Feature', 'properties': {'name': 'Archipelago'},
+     'geometry': {'type': 'MultiPolygon', 'coordinates': [[[[20, -5], [22, -5], [22, -3], [20, -3], [20, -5]]],
+                                                          [[[25, -5], [27, -5], [27, -3], [25, -3]]]]}},
+    {'type': 'Feature', 'properties': {'name': 'Triangle'},
+     'geometry': {'type': 'Polygon', 'coordinates': [[[-30, 20], [-20, 20], [-30, 30], [-30, 20]]]}},
+    {'type': 'Feature', 'properties': {'name': 'Nowhere'}, 'geometry': None}]}
+
+
+class TestCountryResolver(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.boundaries_file = os.path.join(self.directory.name, 'countries.geojson')
+        with open(self.boundaries_file, 'w') as f:
+            f.write(json.dumps(boundaries))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resolution(self):
+        resolver = CountryResolver(self.boundaries_file, grid_size=1)
+        latitudes = [1.2, 8.7, 5.0, 4.2, -4.0, -4.5, -4.0, 21.0, 28.0, 50.0, 2.0]
+        longitudes = [1.2, 9.9, 5.0, 3.9, 21.0, 26.5, 23.5, -29.0, -22.0, 50.0, 10.5]
+        countries = resolver.resolve(latitudes, longitudes).tolist()
+
+        # Testing (the lake, the strait between islands, and points outside the triangle belong to no country)
+        self.assertTrue(countries == ['Squareland', 'Squareland', None, 'Squareland', 'Archipelago', 'Archipelago',
+                                      None, 'Triangle', None, None, None])
+        self.assertTrue(resolver.resolve([], []).tolist() == [])
+
+    def test_cell_reuse(self):
+        resolver = CountryResolver(self.boundaries_file, grid_size=1)
+        rng = np.random.default_rng(0)
+        latitudes = rng.uniform(1.1, 3.9, 10000)  # Within the interior cells of Squareland
+        longitudes = rng.uniform(1.1, 3.9, 10000)
+        countries = resolver.resolve(latitudes, longitudes)
+
+        # Testing
+        self.assertTrue((countries == 'Squareland').all())
+        self.assertTrue(len(resolver.cells) == 9)
+        self.assertTrue(len(resolver.points) == 0)
+
+    def test_boundary_points(self):
+        resolver = CountryResolver(self.boundaries_file, grid_size=1, point_decimals=2)
+        latitudes = np.array([4.501, 4.502, 4.994, 0.014])  # Within cells crossed by the lake or coast
+        longitudes = np.array([6.504, 6.501, 6.2, 9.986])
+        countries = resolver.resolve(latitudes, longitudes).tolist()
+
+        # Testing (coordinates rounding to the same point are resolved once)
+        self.assertTrue(countries == ['Squareland', 'Squareland', 'Squareland', 'Squareland'])
+        self.assertTrue(len(resolver.points) == 3)
+
+    def test_fallback(self):
+        fallback_coordinates = []
+
+        def fallback(latitudes, longitudes):
+            fallback_coordinates.extend(zip(latitudes.tolist(), longitudes.tolist()))
+            return np.array(['Ocean'] * len(latitudes), dtype=object)
+
+        resolver = CountryResolver(self.boundaries_file, grid_size=1, fallback=fallback)
+        countries = resolver.resolve([1.5, 50.0, 5.0], [1.5, 50.0, 5.0]).tolist()
+
+        # Testing (only coordinates outside all boundaries are resolved by the fallback)
+        self.assertTrue(countries == ['Squareland', 'Ocean', 'Ocean'])
+        self.assertTrue(fallback_coordinates == [(50.0, 50.0), (5.0, 5.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from src.data.Storage import CsvStorage
+from src.features import Elevation, OpenMeteoApiTimer
+from src.features.ElevationCache import ElevationCache
+from src.features.RateLimiter import RateLimiter
+from tests.test_open_meteo_client import StandInHandler
+
+
+class ElevationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.configuration = {name: getattr(Elevation, name) for name in
+                              ['elevation_cache_file', 'legacy_store_file', 'dem_path', 'open_meteo_endpoint',
+                               'client', 'current_batch_no', 'root_path', 'data_path']}
+        self.rate_limiter = OpenMeteoApiTimer.rate_limiter
+        Elevation.elevation_cache_file = os.path.join(self.directory.name, 'coordinate_elevations.bin')
+        Elevation.legacy_store_file = os.path.join(self.directory.name, 'coordinate_elevation_store.txt')
+        Elevation.dem_path = self.directory.name
+        Elevation.root_path, Elevation.data_path = self.directory.name, '/'
+        Elevation.elevation_cache = ElevationCache()
+        Elevation.current_batch_no = 0
+
+    def tearDown(self):
+        for name, value in self.configuration.items():
+            setattr(Elevation, name, value)
+        OpenMeteoApiTimer.rate_limiter = self.rate_limiter
+        self.directory.cleanup()
+
+    def run_extraction(self, df, requests_per_day=10000):
+        """Method runs the elevation extraction against a stand-in Open-Meteo server
+
+        Returns:
+            The extracted df, and the number of requests received by the server
+        """
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        server.lock = threading.Lock()
+        server.request_no, server.throttled_requests, server.in_flight, server.max_in_flight = 0, 0, 0, 0
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        Elevation.open_meteo_endpoint = 'http://127.0.0.1:%s/v1/elevation' % server.server_address[1]
+        Elevation.client = None
+        OpenMeteoApiTimer.rate_limiter = RateLimiter(requests_per_second=100, requests_per_day=requests_per_day)
+        try:
+            df = Elevation.elevation_feature_extraction(df)
+        finally:
+            if Elevation.client is not None:
+                Elevation.client.close()
+            server.shutdown()
+        return df, server.request_no
+
+    def test_elevation_feature_extraction(self):
+        latitudes = np.repeat(np.arange(1, 151) * 0.01, 2)  # 150 locations, each observed twice
+        df = pd.DataFrame({'latitude': latitudes, 'longitude': np.full(300, 20.0)},
+                          index=pd.Index(np.arange(300), name='id'))
+        df, request_no = self.run_extraction(df)
+
+        # Testing
+        self.assertTrue(request_no == 2)  # 150 unique locations packed into requests of 100
+        self.assertTrue(np.allclose(df['elevation'].astype(float), latitudes + 20.0))
+        self.assertTrue(len(ElevationCache(file=Elevation.elevation_cache_file)) == 150)
+
+    def test_local_and_requested_elevations(self):
+        np.full((11, 11), 500, dtype='>i2').tofile(os.path.join(Elevation.dem_path, 'S34E018.hgt'))
+        df = pd.DataFrame({'latitude': [-33.5, 0.01, -33.2, 0.02], 'longitude': [18.5, 20.0, 18.1, 20.0]},
+                          index=pd.Index([40, 10, 30, 20], name='id'))
+        df, request_no = self.run_extraction(df)
+
+        # Testing
+        self.assertTrue(request_no == 1)
+        self.assertTrue(df['elevation'].dtype == np.float64)
+        self.assertTrue(np.allclose(df['elevation'], [500.0, 20.01, 500.0, 20.02]))
+
+    def test_resumed_extraction(self):
+        df = pd.DataFrame({'latitude': np.repeat(np.arange(1, 151) * 0.01, 2), 'longitude': np.full(300, 20.0)},
+                          index=pd.Index(np.arange(300), name='id'))
+        first_df, first_request_no = self.run_extraction(df.copy(), requests_per_day=1)  # Quota of a single request
+        Elevation.elevation_cache = ElevationCache()
+        second_df, second_request_no = self.run_extraction(df.copy())
+        third_df, third_request_no = self.run_extraction(df.copy())
+        written_df = CsvStorage(self.directory.name + '/').read(Elevation.file_name)
+
+        # Testing
+        self.assertTrue((first_request_no, second_request_no, third_request_no) == (1, 1, 0))
+        self.assertTrue(first_df['elevation'].notna().sum() == 200)
+        self.assertTrue(second_df.shape[0] == 100)  # Resumed at the unresolved observations
+        self.assertTrue(third_df.shape[0] == 0)
+        self.assertTrue(sorted(written_df.index) == list(range(300)))
+        self.assertTrue(np.allclose(written_df.sort_index()['elevation'], df['latitude'] + 20.0))
+
+    def test_legacy_store_migration(self):
+        with open(Elevation.legacy_store_file, 'w') as f:
+            f.write(json.dumps({'-33.9249, 18.4241': 10.0, '51.5072, -0.1276': 11.0}))
+        migrated_cache = Elevation.collect_recorded_elevations()
+        os.remove(Elevation.legacy_store_file)
+        loaded_cache = Elevation.collect_recorded_elevations()
+
+        # Testing
+        self.assertTrue(len(migrated_cache) == 2)
+        self.assertTrue(np.array_equal(loaded_cache.lookup([51.5072], [-0.1276]), [11.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
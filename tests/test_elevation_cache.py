@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.features.ElevationCache import ElevationCache, coordinate_keys, key_coordinates
+
+
+class ElevationCacheTest(unittest.TestCase):
+    def test_coordinate_keys(self):
+        keys = coordinate_keys(np.array([-33.92491, -33.92489, 90.0, -90.0]),
+                               np.array([18.42412, 18.42408, 180.0, -180.0]))
+        latitudes, longitudes = key_coordinates(keys)
+
+        # Testing
+        self.assertTrue(keys[0] == keys[1])  # Coordinates rounding to the same location
+        self.assertTrue(keys[2] > keys[0] > keys[3] >= 0)
+        self.assertTrue(latitudes.tolist() == [-33.9249, -33.9249, 90.0, -90.0])
+        self.assertTrue(longitudes.tolist() == [18.4241, 18.4241, 180.0, -180.0])
+
+    def test_lookup(self):
+        cache = ElevationCache()
+        cache.update([-33.9249, 51.5072, -33.9249], [18.4241, -0.1276, 18.4241], [10.0, 11.0, 12.0])
+        cache.update([51.5072, 40.7128], [-0.1276, -74.006], [20.0, 30.0])
+        elevations = cache.lookup(np.array([-33.92491, 51.50721, 40.7128, 0.0]),
+                                  np.array([18.42409, -0.12759, -74.006, 0.0]))
+
+        # Testing
+        self.assertTrue(np.array_equal(elevations, [12.0, 20.0, 30.0, np.nan], equal_nan=True))
+        self.assertTrue(len(cache) == 3)
+        self.assertTrue(np.all(np.diff(cache.keys) > 0))
+
+    def test_nearby(self):
+        cache = ElevationCache()
+        cache.update([0.0, 0.0002], [0.0, 0.0], [10.0, 40.0])
+        nearest = cache.nearby(np.array([0.00005, 0.01]), np.array([0.0, 0.0]), radius=25)
+        interpolated = cache.nearby(np.array([0.00005]), np.array([0.0]), radius=25, neighbours=2)
+        cache.update([0.01], [0.0], [99.0])  # Recorded after the spatial index is built
+
+        # Testing
+        self.assertTrue(np.array_equal(nearest, [10.0, np.nan], equal_nan=True))
+        self.assertTrue(np.allclose(interpolated, (10.0 / 1 + 40.0 / 9) / (1 + 1 / 9)))  # Distances 5.6m and 16.7m
+        self.assertTrue(cache.nearby(np.array([0.01]), np.array([0.00001]), radius=25).tolist() == [99.0])
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'coordinate_elevations.bin')
+            cache = ElevationCache(file=file)
+            cache.update([-33.9249, 51.5072], [18.4241, -0.1276], [10.0, 11.0])
+            cache.update([51.5072], [-0.1276], [20.5])
+            file_size = os.path.getsize(file)
+            loaded_cache = ElevationCache(file=file)
+
+        # Testing
+        self.assertTrue(file_size == 3 * 12)  # Updates are appended
+        self.assertTrue(np.array_equal(loaded_cache.keys, cache.keys))
+        self.assertTrue(loaded_cache.elevations.tolist() == [10.0, 20.5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.features.ElevationProvider import ElevationProvider, HgtProvider, tile_name
+
+
+class ElevationProviderTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        rows, columns = np.mgrid[0:11, 0:11]
+        tile = (rows * 10 + columns).astype('>i2')  # Elevation increases southwards and eastwards
+        tile.tofile(os.path.join(self.directory.name, 'S34E018.hgt'))
+        tile[0, 0] = -32768
+        tile.tofile(os.path.join(self.directory.name, 'N00W001.hgt'))
+        self.provider = HgtProvider(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_tile_name(self):
+        # Testing
+        self.assertTrue(tile_name(-34, 18) == 'S34E018.hgt')
+        self.assertTrue(tile_name(0, -1) == 'N00W001.hgt')
+
+    def test_bilinear_interpolation(self):
+        elevations = self.provider.elevations(np.array([-33.01, -33.99, -33.45, -33.5]),
+                                              np.array([18.0, 18.99, 18.25, 18.95]))
+
+        # Testing
+        self.assertTrue(np.allclose(elevations, [1.0, 108.9, 47.5, 59.5]))
+
+    def test_unresolved_coordinates(self):
+        elevations = self.provider.elevations(np.array([0.99, 0.5, 10.5]), np.array([-0.99, -0.5, 10.5]))
+
+        # Testing
+        self.assertTrue(np.isnan(elevations[0]))  # Next to a void sample
+        self.assertTrue(elevations[1] == 55.0)
+        self.assertTrue(np.isnan(elevations[2]))  # No tile
+
+    def test_abstract_provider(self):
+        # Testing
+        with self.assertRaises(TypeError):
+            ElevationProvider()
+
+
+if __name__ == '__main__':
+    unittest.main()
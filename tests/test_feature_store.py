@@ -0,0 +1,49 @@
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.features.FeatureStore import FeatureStore, derive_features, materialize_features
+from tests.test_storage import interim_df
+
+
+class TestFeatureStore(unittest.TestCase):
+    def test_derived_features(self):
+        elevation_df = pd.DataFrame({'elevation': [2100.0, 2150.5]}, index=pd.Index([129107609] * 2, name='id'))
+        features = derive_features(interim_df, elevation_df)
+
+        # Testing
+        self.assertTrue(features.index.tolist() == [128984633, 129107609])
+        self.assertTrue(features['day_of_year'].tolist() == [214, 214])
+        self.assertTrue(np.allclose(features['local_hour'], [40 / 60, 1 + 14 / 60 + 59 / 3600]))
+        self.assertTrue(features['utc_offset'].tolist() == [600, -360])
+        self.assertTrue(np.isnan(features['elevation'].iloc[0]) and features['elevation'].iloc[1] == 2150.5)
+
+    def test_minibatches(self):
+        ids = np.arange(1000, 1100)
+        features = pd.DataFrame({'latitude': ids / 100, 'longitude': -ids / 100, 'elevation': ids * 2.0,
+                                 'day_of_year': ids % 366, 'local_hour': (ids % 24) + 0.5, 'utc_offset': ids % 60},
+                                index=pd.Index(ids, name='id'))
+        with tempfile.TemporaryDirectory() as directory:
+            materialize_features(features, path=directory + '/store/', seed=1)
+            store = FeatureStore(directory + '/store/')
+            batches = list(store.batches(16, seed=2))
+            batch_ids = np.concatenate([batch_ids for batch_ids, _ in batches])
+            full_batches = list(store.batches(16, columns=['elevation'], seed=2, drop_partial=True))
+            gathered = store.features([1050, 5, 1001], columns=['elevation', 'day_of_year'])
+
+            # Testing
+            self.assertTrue(len(store) == 100 and np.sort(batch_ids).tolist() == ids.tolist())  # Each row once
+            self.assertTrue(not np.array_equal(store.ids[:10], ids[:10]))  # Rows are stored in a random order
+            self.assertTrue(all(np.array_equal(batch['elevation'], batch_ids * 2.0) for batch_ids, batch in batches))
+            self.assertTrue(all(isinstance(batch['latitude'], np.memmap) for _, batch in batches))  # Views
+            self.assertTrue(all(len(batch_ids) == 16 for batch_ids, _ in full_batches))
+            self.assertTrue(list(full_batches[0][1]) == ['elevation'])
+            self.assertTrue(store.rows([1050, 5]).tolist()[1] == -1)
+            self.assertTrue(gathered.index.tolist() == [1050, 1001])
+            self.assertTrue(gathered['day_of_year'].tolist() == [1050 % 366, 1001 % 366])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import os
+import tempfile
+import unittest
+
+from src.data.IdIndex import IdIndex
+
+
+class TestIdIndex(unittest.TestCase):
+    def test_membership(self):
+        index = IdIndex([129051266, 38197744, 128984633])
+        index.add([129076855, 38197744])
+        membership = index.contains([38197744, 129076855, 129107609, 1, 999999999]).tolist()
+
+        # Testing
+        self.assertTrue(len(index) == 4)
+        self.assertTrue(index.ids.tolist() == sorted(index.ids.tolist()))
+        self.assertTrue(membership == [True, True, False, False, False])
+
+    def test_empty_index(self):
+        index = IdIndex()
+
+        # Testing
+        self.assertTrue(index.contains([128984633]).tolist() == [False])
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, 'processed_ids.bin')
+            IdIndex.append_file(file, [129051266, 38197744])
+            IdIndex.append_file(file, [128984633, 38197744])
+            index = IdIndex.load(file)
+
+            # Testing
+            self.assertTrue(index.ids.tolist() == [38197744, 128984633, 129051266])
+            self.assertTrue(len(IdIndex.load(os.path.join(directory, 'missing.bin'))) == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.data.ObservationSchema import ObservationSchema, concat_observations
+from tests.test_cleaning_pipeline import test_df
+
+raw_csv = """id,latitude,longitude,license,geoprivacy,quality_grade,scientific_name,taxon_id,positional_accuracy,image_url
+1,-30.49,151.63,CC-BY,open,research,Phascolarctos cinereus,42983,11,https://static.inaturalist.org/photos/1/medium.jpg
+2,43.11,-7.67,,,research,Plecotus auritus,40416,8,https://static.inaturalist.org/photos/2/medium.jpg
+3,95.0,16.95,CC-BY-XYZ,unknown,research,Madoqua damarensis,unknown,4.5,https://static.inaturalist.org/photos/3/medium.jpg
+x4,-38.19,145.47,CC0,obscured,casual,Pseudocheirus peregrinus,42775,3000000000,
+"""
+
+
+class TestObservationSchema(unittest.TestCase):
+    def test_schema_dtypes(self):
+        schema = ObservationSchema()
+        df = schema.apply(test_df)
+
+        # Testing
+        self.assertTrue(schema.invalid_counts == {})  # The string taxon id '42391' is a valid integer
+        self.assertTrue(df['taxon_id'].dtype == 'Int32' and df['id'].dtype == 'Int32')
+        self.assertTrue(df['taxon_id'].tolist()[5] == 42391)
+        self.assertTrue(all(isinstance(df[column].dtype, pd.CategoricalDtype) for column in
+                            ['license', 'geoprivacy', 'quality_grade', 'time_zone', 'scientific_name']))
+        self.assertTrue(df['license'].isna().sum() == 3)  # Empty licenses are missing, rather than invalid
+        self.assertTrue(df['latitude'].dtype == np.float64)
+        self.assertTrue(df['image_url'].tolist() == test_df['image_url'].tolist())
+        self.assertTrue(df.memory_usage(deep=True).sum() < test_df.memory_usage(deep=True).sum())
+
+    def test_invalid_values(self):
+        schema = ObservationSchema()
+        df = schema.apply(pd.read_csv(io.StringIO(raw_csv), **schema.read_options()))
+        report = schema.invalid_report()
+
+        # Testing
+        self.assertTrue(df['id'].tolist() == [1, 2, 3])  # The observation with an invalid id is dropped
+        self.assertTrue(schema.invalid_counts == {'id': 1, 'license': 1, 'geoprivacy': 1, 'latitude': 1,
+                                                  'taxon_id': 1, 'positional_accuracy': 2})
+        self.assertTrue(df['latitude'].isna().tolist() == [False, False, True])
+        self.assertTrue(df['license'].isna().tolist() == [False, True, True])
+        self.assertTrue(report.loc['positional_accuracy', 'examples'] == '4.5; 3000000000.0')
+        self.assertTrue(report.loc['license', 'examples'] == 'CC-BY-XYZ')
+
+    def test_concatenation(self):
+        schema = ObservationSchema()
+        first = schema.apply(test_df.iloc[:4])
+        second = schema.apply(test_df.iloc[4:])
+        df = concat_observations([first, second])
+
+        # Testing (categoricals of differing categories are retained)
+        self.assertTrue(isinstance(df['scientific_name'].dtype, pd.CategoricalDtype))
+        self.assertTrue(df['scientific_name'].tolist() == test_df['scientific_name'].tolist())
+        self.assertTrue(concat_observations([]).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
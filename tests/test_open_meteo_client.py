@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from src.features.OpenMeteoClient import OpenMeteoClient, parse_retry_after
+from src.features.RateLimiter import RateLimiter, TokenBucket
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Stand-in Open-Meteo elevation endpoint, returning latitude + longitude as the elevation of each coordinate.
+
+    The first throttled_requests requests are answered with 429 and a Retry-After header. Requests of latitude 99 are
+    answered with a body without elevations.
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_no = server.request_no + 1
+            throttled = server.request_no <= server.throttled_requests
+            server.in_flight = server.in_flight + 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        time.sleep(0.05)
+        if throttled:
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            body = b'{}'
+        elif parse_qs(urlparse(self.path).query)['latitude'][0] == '99.0':
+            self.send_response(200)
+            body = b'<html>Error</html>'
+        else:
+            query = parse_qs(urlparse(self.path).query)
+            latitudes = [float(value) for value in query['latitude'][0].split(',')]
+            longitudes = [float(value) for value in query['longitude'][0].split(',')]
+            body = json.dumps({'elevation': [lat + lng for lat, lng in zip(latitudes, longitudes)]}).encode()
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+        with server.lock:
+            server.in_flight = server.in_flight - 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestOpenMeteoClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        self.server.lock = threading.Lock()
+        self.server.request_no = 0
+        self.server.throttled_requests = 0
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.endpoint = 'http://127.0.0.1:%s/v1/elevation' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_concurrent_requests(self):
+        client = OpenMeteoClient(endpoint=self.endpoint, concurrency=4, requests_per_second=100)
+        batches = [([float(i), 1.5], [10.0, float(i)]) for i in range(8)]
+        elevations = client.get_elevations(batches)
+        client.close()
+
+        # Testing
+        self.assertTrue(elevations == [[i + 10.0, 1.5 + i] for i in range(8)])
+        self.assertTrue(1 < self.server.max_in_flight <= 4)
+
+    def test_retry_after(self):
+        self.server.throttled_requests = 2
+        client = OpenMeteoClient(endpoint=self.endpoint, concurrency=1, requests_per_second=100, backoff=10)
+        start = time.monotonic()
+        elevations = client.get_elevations([([1.0], [2.0])])
+
+        # Testing (Retry-After: 0 overrides the 10 second backoff)
+        self.assertTrue(elevations == [[3.0]])
+        self.assertTrue(time.monotonic() - start < 5)
+        self.assertTrue(client.error_no == 2)
+
+    def test_abandoned_request(self):
+        self.server.throttled_requests = 10
+        client = OpenMeteoClient(endpoint=self.endpoint, requests_per_second=100, max_retries=1)
+
+        # Testing
+        self.assertTrue(client.get_elevations([([1.0], [2.0])]) == [None])
+
+    def test_shared_rate_limiter(self):
+        rate_limiter = RateLimiter(requests_per_second=100, requests_per_day=3)
+        clients = [OpenMeteoClient(endpoint=self.endpoint, rate_limiter=rate_limiter) for _ in range(2)]
+        first_elevations = clients[0].get_elevations([([1.0], [2.0]), ([3.0], [4.0])])
+        second_elevations = clients[1].get_elevations([([5.0], [6.0]), ([7.0], [8.0])])
+
+        # Testing
+        self.assertTrue(first_elevations == [[3.0], [7.0]])
+        self.assertTrue(second_elevations.count(None) == 1)  # The daily quota is shared between the clients
+        self.assertTrue(self.server.request_no == 3)
+
+    def test_token_bucket(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+        waits = [bucket.reserve() for _ in range(4)]
+        now[0] = 10.0
+
+        # Testing
+        self.assertTrue(waits == [0.0, 0.0, 0.5, 1.0])
+        self.assertTrue(bucket.reserve() == 0.0)
+
+        bucket.pause(5)  # No tokens are handed out before the pause deadline
+        pause_waits = [bucket.reserve() for _ in range(2)]
+        bucket.pause(1)  # A shorter pause does not shorten the earlier pause
+        now[0] = 16.0
+
+        # Testing
+        self.assertTrue(pause_waits == [5.5, 6.0] and bucket.pause_remaining() == 0.0)
+        self.assertTrue(bucket.reserve() == 0.5)  # Refilled from the pause deadline, after the waiting reservations
+
+    def test_token_bucket_pause_deferral(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=1, capacity=1, clock=lambda: now[0])
+        bucket.reserve()  # Sent immediately
+        reservations = [bucket.reservation() for _ in range(2)]  # Waiting reservations, spaced at the refill rate
+        now[0] = 0.5
+        bucket.pause(5)  # Retry-After received while the reservations wait
+        now[0] = 1.0
+        waits = [bucket.remaining_wait(reservation) for reservation in reservations]
+
+        # Testing (the waiting reservations are deferred by the pause, remaining spaced after the deadline)
+        self.assertTrue(waits == [5.0, 6.0])
+        self.assertTrue(bucket.reserve() == 7.0)
+
+    def test_malformed_response(self):
+        client = OpenMeteoClient(endpoint=self.endpoint, requests_per_second=100, backoff=10)
+        elevations = client.get_elevations([([99.0], [1.0]), ([1.0], [2.0])])
+
+        # Testing (the malformed response neither fails the other batch, nor is retried)
+        self.assertTrue(elevations == [None, [3.0]])
+        self.assertTrue(client.error_no == 1 and self.server.request_no == 2)
+
+    def test_retry_after_parsing(self):
+        # Testing
+        self.assertTrue(parse_retry_after('3') == 3.0)
+        self.assertTrue(parse_retry_after(None) is None)
+        self.assertTrue(parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0.0)
+        self.assertTrue(parse_retry_after('soon') is None)
+
+
+if __name__ == '__main__':
+    unittest.main()
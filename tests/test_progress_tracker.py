@@ -0,0 +1,59 @@
+import io
+import unittest
+
+from src.visualization.ProgressTracker import ProgressTracker
+
+
+class ProgressTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = [0.0]
+        self.output = io.StringIO()
+
+    def tracker(self, total=None):
+        return ProgressTracker(total=total, label='observations', redraw_interval=0.5, output=self.output,
+                               clock=lambda: self.now[0])
+
+    def test_metrics(self):
+        progress = self.tracker(total=1000)
+        self.now[0] = 2.0
+        progress.update(250, requests=3)
+        progress.update(0, requests=1)
+
+        # Testing
+        self.assertTrue(progress.rows_per_second() == 125)
+        self.assertTrue(progress.eta() == 6)
+        self.assertTrue(progress.metrics()['requests'] == 4)
+        self.assertTrue('25.0%' in progress.render() and 'ETA: 0:00:06' in progress.render())
+
+    def test_throttled_redraws(self):
+        progress = self.tracker(total=1000)
+        for _ in range(100):  # 100 updates within 1 second
+            self.now[0] = self.now[0] + 0.01
+            progress.update(1)
+        progress.finish()
+
+        # Testing
+        self.assertTrue(self.output.getvalue().count('\r') == 3)  # Two throttled redraws, and the final redraw
+        self.assertTrue(self.output.getvalue().endswith('100 / 1000 ... 100.0 rows/s ... running: 0:00:01 ... '
+                                                        'ETA: 0:00:09\n'))
+
+    def test_unknown_total(self):
+        progress = self.tracker()
+        self.now[0] = 1.0
+        progress.update(10)
+
+        # Testing
+        self.assertTrue(progress.eta() is None)
+        self.assertTrue(progress.render() == 'observations: 10 ... 10.0 rows/s ... running: 0:00:01')
+
+    def test_without_output(self):
+        progress = ProgressTracker(total=10, output=None)
+        progress.update(5)
+        progress.finish()
+
+        # Testing
+        self.assertTrue(progress.rows == 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timezone
+
+from src.features.RateLimiter import DailyQuota, RateLimiter
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.ledger_file = os.path.join(self.directory.name, 'quota.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_quota_persistence(self):
+        quota = DailyQuota(3, ledger_file=self.ledger_file)
+        permitted = [quota.reserve() for _ in range(2)]
+        resumed_quota = DailyQuota(3, ledger_file=self.ledger_file)  # Quota of a later run on the same day
+
+        # Testing
+        self.assertTrue(permitted == [True, True])
+        self.assertTrue(resumed_quota.remaining() == 1)
+        self.assertTrue(resumed_quota.reserve())
+        self.assertFalse(resumed_quota.reserve())
+
+    def test_quota_rollover(self):
+        now = [datetime(2023, 5, 1, 23, 59, tzinfo=timezone.utc)]
+        quota = DailyQuota(1, ledger_file=self.ledger_file, clock=lambda: now[0])
+        quota.reserve()
+        exhausted = not quota.reserve()
+        now[0] = datetime(2023, 5, 2, 0, 1, tzinfo=timezone.utc)
+
+        # Testing
+        self.assertTrue(exhausted)
+        self.assertTrue(quota.reserve())
+        self.assertTrue(DailyQuota(1, ledger_file=self.ledger_file).remaining() == 1)  # Ledger of a previous day
+
+    def test_adaptive_rate(self):
+        limiter = RateLimiter(requests_per_second=1, min_requests_per_second=0.1, recovery_step=0.25)
+        for _ in range(5):
+            limiter.record_failure()
+        decreased_rate = limiter.rate
+        for _ in range(2):
+            limiter.record_success()
+        recovering_rate = limiter.rate
+        for _ in range(10):
+            limiter.record_success()
+
+        # Testing
+        self.assertTrue(decreased_rate == 0.1)  # 1 / 2**5 is limited to the minimum rate
+        self.assertTrue(recovering_rate == 0.6)
+        self.assertTrue(limiter.rate == 1)
+        self.assertTrue(limiter.failure_no == 5)
+
+    def test_quota_exhaustion(self):
+        limiter = RateLimiter(requests_per_second=1000, requests_per_day=2)
+
+        # Testing
+        self.assertTrue(limiter.acquire_blocking())
+        self.assertTrue(limiter.acquire_blocking())
+        self.assertFalse(limiter.acquire_blocking())
+        self.assertTrue(limiter.remaining_quota() == 0)
+
+    def test_thread_safety(self):
+        limiter = RateLimiter(requests_per_second=100000, requests_per_day=1000, ledger_file=self.ledger_file)
+        permitted = []
+
+        def acquire():
+            for _ in range(300):
+                permitted.append(limiter.acquire_blocking())
+
+        threads = [threading.Thread(target=acquire) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Testing
+        self.assertTrue(sum(permitted) == 1000)
+        self.assertTrue(limiter.request_no == 1000)
+        self.assertTrue(DailyQuota(1000, ledger_file=self.ledger_file).remaining() == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
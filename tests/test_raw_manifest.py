@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+
+from src.data.RawManifest import RawManifest
+
+
+def write_file(file, text):
+    with open(file, 'w') as f:
+        f.write(text)
+
+
+class TestRawManifest(unittest.TestCase):
+    def test_discovery(self):
+        with tempfile.TemporaryDirectory() as directory:
+            raw_path = directory + '/raw/'
+            manifest_file = directory + '/raw_manifest.json'
+            os.makedirs(raw_path + 'daily')
+            write_file(raw_path + 'observations_10.csv', 'id\n10\n')
+            write_file(raw_path + 'observations_2.csv', 'id\n2\n')
+            write_file(raw_path + 'notes.txt', 'not observations')
+            manifest = RawManifest(manifest_file, raw_path)
+            first_files = manifest.new_files()
+            manifest.record(first_files)
+            manifest.save()
+
+            write_file(raw_path + 'daily/observations_11.csv', 'id\n11\n')  # New file
+            os.utime(raw_path + 'observations_2.csv', ns=(0, 10 ** 9))  # Touched, but not modified
+            reloaded_manifest = RawManifest(manifest_file, raw_path)
+            second_files = reloaded_manifest.new_files()
+
+            write_file(raw_path + 'observations_10.csv', 'id\n10\n12\n')  # Modified file
+            third_files = RawManifest(manifest_file, raw_path).new_files()
+
+            # Testing
+            self.assertTrue(first_files == ['observations_2.csv', 'observations_10.csv'])  # Natural order
+            self.assertTrue(manifest.entries['observations_2.csv']['size'] == 5)
+            self.assertTrue(len(manifest.entries['observations_2.csv']['sha256']) == 64)
+            self.assertTrue(second_files == ['daily/observations_11.csv'])
+            self.assertTrue(reloaded_manifest.entries['observations_2.csv']['mtime'] == 10 ** 9)
+            self.assertTrue(third_files == ['daily/observations_11.csv', 'observations_10.csv'])
+
+
+if __name__ == '__main__':
+    unittest.main()
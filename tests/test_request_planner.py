@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+
+from src.features.ElevationCache import ElevationCache
+from src.features.RequestPlanner import RequestPlanner
+
+
+class RequestPlannerTest(unittest.TestCase):
+    def test_deduplicated_packed_requests(self):
+        latitudes = np.repeat(np.arange(250) * 0.01, 2)  # Every location is observed twice
+        longitudes = np.repeat(np.arange(250) * 0.01, 2) + np.tile([0.0, 0.00001], 250)
+        planner = RequestPlanner(latitudes, longitudes, ElevationCache(), request_parameter_limit=100)
+        requests = []
+        request = planner.next_request()
+        while request.shape[0] > 0:
+            requests.append(request)
+            planner.record(request, planner.latitudes[request] * 100)
+            request = planner.next_request()
+        observations, elevations = planner.pop_resolved_observations()
+
+        # Testing
+        self.assertTrue([request.shape[0] for request in requests] == [100, 100, 50])
+        self.assertTrue(sorted(observations) == list(range(500)))
+        self.assertTrue(np.allclose(elevations, latitudes[observations] * 100))
+        self.assertTrue(planner.pop_resolved_observations()[0].shape[0] == 0)
+        self.assertTrue(planner.resolved_observations == 500)
+        self.assertTrue(np.allclose(planner.observation_elevations(), latitudes * 100))
+
+    def test_cached_locations_are_skipped(self):
+        cache = ElevationCache()
+        cache.update(np.arange(0, 150) * 0.01, np.zeros(150), np.ones(150))  # Locations 0 - 149 are recorded
+        cache.update([2.0], [0.00005], [7.0])  # Within 25m of location 200
+        planner = RequestPlanner(np.arange(300) * 0.01, np.zeros(300), cache, request_parameter_limit=100,
+                                 similarity_radius=25)
+        first_request = planner.next_request()
+        second_request = planner.next_request()
+
+        # Testing
+        self.assertTrue(first_request.shape[0] == 100)  # Packed with locations 150 - 250, skipping location 200
+        self.assertTrue(np.allclose(planner.latitudes[first_request][[0, -1]], [1.5, 2.5]))
+        self.assertTrue(second_request.shape[0] == 49)
+        self.assertTrue(planner.resolved_observations == 151)
+        self.assertTrue(planner.observation_elevations()[200] == 7.0)
+
+    def test_neighbouring_locations_are_deferred(self):
+        latitudes = np.array([0.0, 0.0001, 1.0, 2.0, 2.0001])  # Locations 0, 1 (and 3, 4) are 11m apart
+        planner = RequestPlanner(latitudes, np.zeros(5), ElevationCache(), request_parameter_limit=100,
+                                 similarity_radius=25)
+        first_request = planner.next_request()
+        planner.cache.update(*planner.coordinates(first_request[:1]), [5.0])
+        planner.record(first_request[:1], [5.0])
+        planner.abandon(first_request[1:])  # Failed requests release their deferred neighbours
+        second_request = planner.next_request()
+
+        # Testing
+        self.assertTrue(first_request.tolist() == [0, 2, 3])
+        self.assertTrue(second_request.tolist() == [4])  # Location 1 reuses the elevation of location 0
+        self.assertTrue(planner.observation_elevations()[1] == 5.0)
+        self.assertTrue(planner.next_request().shape[0] == 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
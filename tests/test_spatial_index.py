@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from src.features.SpatialIndex import SpatialIndex
+
+
+class SpatialIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SpatialIndex(cell_size=50)
+        self.index.add([0.0, 0.0003, 10.0, 89.99999, 0.0], [0.0, 0.0, 10.0, 0.0, 179.99999], [1, 2, 3, 4, 5])
+
+    def test_radius_query(self):
+        queries, ids, distances = self.index.query([0.0001, 10.001, 0.0], [0.0, 10.0, 0.0], radius=60, neighbours=2)
+
+        # Testing
+        self.assertTrue(queries.tolist() == [0, 0, 2, 2])
+        self.assertTrue(ids.tolist() == [1, 2, 1, 2])  # Nearest first, the point 111m away is outside the radius
+        self.assertTrue(np.allclose(distances, [11.12, 22.24, 0.0, 33.36], atol=0.01))
+
+    def test_neighbour_limit(self):
+        queries, ids, _ = self.index.query([0.0002], [0.0], radius=60, neighbours=1)
+
+        # Testing
+        self.assertTrue(ids.tolist() == [2])
+
+    def test_poles_and_antimeridian(self):
+        queries, ids, distances = self.index.query([89.99999, 0.0], [90.0, -179.99999], radius=10)
+
+        # Testing
+        self.assertTrue(ids.tolist() == [4, 5])
+        self.assertTrue(np.all(distances < 3))
+
+    def test_radius_beyond_cell_size(self):
+        queries, ids, _ = self.index.query([0.0], [0.0], radius=120, neighbours=5)
+
+        # Testing
+        self.assertTrue(ids.tolist() == [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
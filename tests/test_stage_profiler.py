@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from src.visualization.StageProfiler import StageProfiler
+
+
+class TestStageProfiler(unittest.TestCase):
+    def test_stage_samples(self):
+        now = [0.0]
+        profiler = StageProfiler(clock=lambda: now[0])
+        rows = [100]
+
+        for batch in range(2):
+            profiler.next_batch()
+            with profiler.stage('filter', rows=lambda: rows[0]):
+                now[0] = now[0] + 2.0
+                rows[0] = rows[0] - 10
+            with profiler.stage('write'):
+                now[0] = now[0] + 1.0
+        summary = profiler.summary()
+
+        # Testing
+        self.assertTrue(profiler.samples[0] == {'batch': 0, 'stage': 'filter', 'seconds': 2.0, 'rows_in': 100,
+                                                'rows_out': 90, 'peak_memory': None})
+        self.assertTrue(summary.index.tolist() == ['filter', 'write'])
+        self.assertTrue(summary.loc['filter', 'samples'] == 2 and summary.loc['filter', 'seconds'] == 4.0)
+        self.assertTrue(summary.loc['filter', 'rows_in'] == 190 and summary.loc['filter', 'rows_out'] == 170)
+        self.assertTrue(summary.loc['filter', 'rows_per_second'] == 47.5)
+        self.assertTrue(np.isclose(summary.loc['write', 'share'], 1 / 3))
+        self.assertTrue('filter' in profiler.report())
+
+    def test_iterate(self):
+        profiler = StageProfiler()
+        chunks = list(profiler.iterate('read', [[1, 2, 3], [4]]))
+
+        # Testing
+        self.assertTrue(chunks == [[1, 2, 3], [4]])
+        self.assertTrue([sample['rows_out'] for sample in profiler.samples] == [3, 1])
+        self.assertTrue([sample['batch'] for sample in profiler.samples] == [None, None])
+
+    def test_peak_memory(self):
+        profiler = StageProfiler(trace_memory=True)
+        with profiler.stage('allocate'):
+            np.ones(1000000).sum()  # 8MB released before the stage ends
+        with profiler.stage('idle'):
+            pass
+        profiler.stop()
+
+        # Testing
+        self.assertTrue(profiler.samples[0]['peak_memory'] >= 8000000)
+        self.assertTrue(profiler.samples[1]['peak_memory'] < 1000000)
+
+    def test_worker_samples_and_export(self):
+        worker_profiler = StageProfiler()
+        worker_profiler.next_batch()
+        with worker_profiler.stage('clean'):
+            pass
+
+        profiler = StageProfiler()
+        for _ in range(3):
+            profiler.next_batch()
+        profiler.add_samples(worker_profiler.pop_samples())
+
+        with tempfile.TemporaryDirectory() as directory:
+            profile_file = os.path.join(directory, 'stage_profile.csv')
+            profiler.export(profile_file)
+            samples = pd.read_csv(profile_file)
+
+        # Testing (worker samples are attributed to the batch of the writer)
+        self.assertTrue(worker_profiler.samples == [])
+        self.assertTrue(samples.columns.tolist() == StageProfiler.sample_columns)
+        self.assertTrue(samples['batch'].tolist() == [2] and samples['stage'].tolist() == ['clean'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from src.data.Storage import CsvStorage, ParquetStorage
+from src.data.TimeModel import from_text
+
+interim_columns = ['observed_on', 'local_time_observed_at', 'latitude', 'longitude', 'positional_accuracy',
+                   'public_positional_accuracy', 'image_url', 'license', 'geoprivacy', 'taxon_geoprivacy',
+                   'scientific_name', 'common_name', 'taxon_id']
+interim_data = [[128984633, '2022-08-02', '2022-08-02 00:40:00+10:00', -30.4900714453, 151.6392706226, 11, 11,
+                 'https://static.inaturalist.org/photos/219142197/medium.jpeg', None, None, 'open',
+                 'Phascolarctos cinereus', 'Koala', 42983],
+                [129107609, '2022-08-02', '2022-08-02 01:14:59-06:00', 43.952764223, -110.6115040714, 11690, 27411,
+                 'https://inaturalist-open-data.s3.amazonaws.com/photos/219366763/medium.jpg', 'CC-BY-NC', 'obscured',
+                 None, 'Ovis canadensis', 'Bighorn Sheep', '42391']]
+interim_df = from_text(pd.DataFrame(interim_data, columns=['id'] + interim_columns).set_index('id'))
+
+
+class TestStorage(unittest.TestCase):
+    def check_backend(self, backend):
+        with tempfile.TemporaryDirectory() as directory:
+            storage = backend(directory + '/')
+            self.assertFalse(storage.exists('interim_observations'))
+            written_ids = storage.append('interim_observations', interim_df.iloc[:1]).tolist()
+            written_ids = written_ids + storage.append('interim_observations', interim_df.iloc[1:]).tolist()
+            written_ids = written_ids + storage.flush('interim_observations').tolist()
+            df = storage.read('interim_observations')
+            if backend is CsvStorage:
+                with open(storage.location('interim_observations')) as f:
+                    text = f.read()
+                # Testing (time columns are exported as text)
+                self.assertTrue('2022-08-02,2022-08-02 01:14:59-06:00,' in text and 'utc_offset' not in text)
+            coordinates = storage.read('interim_observations', columns=['latitude', 'longitude'])
+
+            # Testing
+            self.assertTrue(storage.exists('interim_observations'))
+            self.assertTrue(written_ids == interim_df.index.tolist())  # Each row is reported written once
+            self.assertTrue(df.index.tolist() == interim_df.index.tolist())
+            self.assertTrue(set(df.columns) == set(interim_columns + ['utc_offset']))
+            self.assertTrue(str(df['observed_on'].dtype) == 'datetime64[ns]')  # Time columns are typed
+            self.assertTrue(df['local_time_observed_at'].equals(interim_df['local_time_observed_at']))
+            self.assertTrue(df['utc_offset'].tolist() == [600, -360])
+            self.assertTrue(coordinates.columns.tolist() == ['latitude', 'longitude'])
+            self.assertTrue(coordinates['latitude'].tolist() == interim_df['latitude'].tolist())
+            return df
+
+    def test_csv_storage(self):
+        self.check_backend(CsvStorage)
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'Parquet storage requires pyarrow')
+    def test_parquet_storage(self):
+        df = self.check_backend(ParquetStorage)
+
+        # Testing
+        self.assertTrue(df['license'].dtype == 'category')
+        self.assertTrue(df['taxon_id'].tolist() == [42983, 42391])
+        self.assertTrue(df['positional_accuracy'].dtype == 'Int32')  # Consistent with the ingestion schema
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = ParquetStorage(directory + '/', partition_rows=3)
+            buffered_ids = [storage.append('interim_observations', interim_df).tolist() for _ in range(2)]
+            flushed_ids = storage.flush('interim_observations').tolist()
+            parts = sorted(os.listdir(storage.location('interim_observations')))
+            next_storage = ParquetStorage(directory + '/')  # Numbering continues after existing partitions
+            next_storage.write('bad_quality', interim_df[['image_url']])
+            next_storage.append('interim_observations', interim_df)
+            next_storage.flush('interim_observations')
+
+            # Testing (batches are buffered into partitions of at least partition_rows rows)
+            self.assertTrue(buffered_ids == [[], interim_df.index.tolist() * 2] and flushed_ids == [])
+            self.assertTrue(parts == ['part-0000000000.parquet'])
+            self.assertTrue(sorted(os.listdir(storage.location('interim_observations')))[-1] ==
+                            'part-0000000001.parquet')
+            self.assertTrue(len(next_storage.read('interim_observations').index) == 6)
+            self.assertTrue(next_storage.read('bad_quality').index.tolist() == interim_df.index.tolist())
+
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), 'Parquet storage requires pyarrow')
+    def test_parquet_chunk_categories(self):
+        # Batches of streamed chunks, with categorical columns of differing categories
+        batches = [interim_df.iloc[positions].astype({'scientific_name': 'category', 'common_name': 'category'})
+                   for positions in [[0, 1], [0], [1]]]
+        batches = [batch.rename(index=lambda observation_id: observation_id + number)
+                   for number, batch in enumerate(batches)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = ParquetStorage(directory + '/', partition_rows=2)
+            for batch in batches:
+                storage.append('interim_observations', batch)
+            storage.flush('interim_observations')  # Partitions of a single batch, and of two concatenated batches
+            parts = os.listdir(storage.location('interim_observations'))
+            df = storage.read('interim_observations')
+
+        # Testing
+        self.assertTrue(len(parts) == 2)
+        self.assertTrue(df['scientific_name'].tolist() == ['Phascolarctos cinereus', 'Ovis canadensis'] * 2)
+        self.assertTrue(df['common_name'].dtype == 'string')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+import pandas as pd
+
+from src.data.TimeModel import format_local_times, from_text, localize, parse_dates, parse_utc_times, to_text
+
+utc_times = pd.Series(['2022-08-01 14:40:00 UTC', '2022-08-02 07:14:59 UTC', '2022-08-02 07:14:59 UTC',
+                       '2020-03-01 00:00:00 UTC'])
+time_zones = pd.Series(['Australia/Sydney', 'America/Denver', None, 'Asia/Kolkata'])
+
+
+class TestTimeModel(unittest.TestCase):
+    def test_localize(self):
+        local_times, offsets = localize(parse_utc_times(utc_times), time_zones)
+        text = format_local_times(local_times, offsets)
+        apply_text = [str(pd.Timestamp(time).tz_convert(zone)) for time, zone in zip(utc_times, time_zones) if zone]
+
+        # Testing
+        self.assertTrue(str(local_times.dtype) == 'datetime64[ns]' and offsets.dtype == 'Int16')
+        self.assertTrue(offsets.tolist()[:2] == [600, -360] and offsets.isna().tolist() == [False, False, True, False])
+        self.assertTrue(text.dropna().tolist() == apply_text)  # Identical to tz-aware Timestamp strings
+        self.assertTrue(local_times.isna().tolist() == text.isna().tolist())
+
+    def test_dates(self):
+        dates = parse_dates(pd.Series(['2022-08-02', '202g-08-02', '2022-08-32', None]))
+
+        # Testing
+        self.assertTrue(str(dates.dtype) == 'datetime64[ns]')
+        self.assertTrue(dates.notna().tolist() == [True, False, False, False])
+
+    def test_text_round_trip(self):
+        local_times, offsets = localize(parse_utc_times(utc_times), time_zones)
+        df = pd.DataFrame({'observed_on': parse_dates(pd.Series(['2022-08-02', None, '2022-08-02', '2020-03-01'])),
+                           'local_time_observed_at': local_times, 'utc_offset': offsets, 'latitude': 1.5})
+        text_df = to_text(df)
+
+        # Testing
+        self.assertTrue(text_df.columns.tolist() == ['observed_on', 'local_time_observed_at', 'latitude'])
+        self.assertTrue(text_df['observed_on'].tolist()[0] == '2022-08-02')
+        self.assertTrue(text_df['local_time_observed_at'].tolist()[3] == '2020-03-01 05:30:00+05:30')
+        self.assertTrue(from_text(text_df).equals(df))
+        self.assertTrue(to_text(text_df) is text_df and from_text(df) is df)  # Converted frames are left as is
+
+
+if __name__ == '__main__':
+    unittest.main()
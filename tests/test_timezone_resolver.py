@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+from timezonefinder import TimezoneFinder
+
+from src.data.TimezoneResolver import TimezoneResolver
+
+# Test coordinates retrieved from the cleaning pipeline test data
+latitudes = [-30.4900714453, 43.1196234274, 50.6864393301, -40.9498116654, 43.952764223, -18.83915, -38.1974245434]
+longitudes = [151.6392706226, -7.6788841188, 7.1697807312, 174.9710916171, -110.6115040714, 16.9536, 145.4793232007]
+
+
+class TestTimezoneResolver(unittest.TestCase):
+    def test_resolution(self):
+        resolver = TimezoneResolver()
+        time_zones = resolver.resolve(latitudes, longitudes).tolist()
+
+        # Testing
+        finder = TimezoneFinder()
+        correct_time_zones = [finder.timezone_at(lat=lat, lng=lng) for lat, lng in zip(latitudes, longitudes)]
+        self.assertTrue(time_zones == correct_time_zones)
+
+    def test_duplicate_coordinates(self):
+        resolver = TimezoneResolver()
+        time_zones = resolver.resolve(np.repeat(latitudes, 3), np.repeat(longitudes, 3))
+
+        # Testing
+        self.assertTrue(len(time_zones) == 3 * len(latitudes))
+        self.assertTrue(len(resolver.cells) <= len(latitudes))
+
+    def test_cache_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, 'timezone_cache.json')
+            resolver = TimezoneResolver(cache_file=cache_file)
+            time_zones = resolver.resolve(latitudes, longitudes).tolist()
+            resolver.save_cache()
+
+            reloaded_resolver = TimezoneResolver(cache_file=cache_file)
+
+            # Testing
+            self.assertTrue(reloaded_resolver.cells == resolver.cells)
+            self.assertTrue(reloaded_resolver.resolve(latitudes, longitudes).tolist() == time_zones)
+
+
+    def test_zones_between_samples(self):
+        resolver = TimezoneResolver(grid_size=3.0)  # Bermuda lies between the sample points of its (large) cell
+        time_zones = resolver.resolve([32.3328734074, 32.0946179961], [-65.0649519980, -64.8477600946]).tolist()
+
+        # Testing
+        self.assertTrue(time_zones == ['Atlantic/Bermuda', 'Atlantic/Bermuda'])
+
+    def test_cache_version(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, 'timezone_cache.json')
+            resolver = TimezoneResolver(cache_file=cache_file)
+            resolver.resolve(latitudes, longitudes)
+            resolver.cache_version = TimezoneResolver.cache_version - 1  # Cache of an earlier classification
+            resolver.save_cache()
+
+            reloaded_resolver = TimezoneResolver(cache_file=cache_file)
+
+            # Testing (cells are classified again, while resolved points are reused)
+            self.assertTrue(reloaded_resolver.cells == {} and reloaded_resolver.points == resolver.points)
+
+
+if __name__ == '__main__':
+    unittest.main()